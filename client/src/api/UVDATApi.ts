@@ -26,6 +26,7 @@ import {
   RasterData,
   RasterMapLayer,
   SearchableVectorDataRequest,
+  SearchableVectorFeaturePage,
   SearchableVectorFeatureResponse,
   SimulationType,
   TableSummary,
@@ -324,6 +325,30 @@ export default class UVdatApi {
     return (await UVdatApi.apiClient.get(`vectors/${layerId}/property-summary`)).data;
   }
 
+  public static async getLayerClassification(
+    layerId: number,
+    key: string,
+    method: 'quantile' | 'equal_interval' | 'jenks' = 'quantile',
+    classes = 5,
+  ): Promise<{ key: string; method: string; classes: number; count: number; breaks: number[] }> {
+    return (await UVdatApi.apiClient.get(
+      `vectors/${layerId}/classification/`,
+      { params: { key, method, classes } },
+    )).data;
+  }
+
+  public static async getLayerPropertyValues(
+    layerId: number,
+    key: string,
+    search?: string,
+    limit = 20,
+  ): Promise<{ value: string; count: number }[]> {
+    return (await UVdatApi.apiClient.get(
+      `vectors/${layerId}/property-values/`,
+      { params: { key, search, limit } },
+    )).data;
+  }
+
   public static async getRasterMetadata(layerId: number): Promise<MetadataResponse> {
     return (await UVdatApi.apiClient.get(`/rasters/${layerId}/info/metadata/`)).data;
   }
@@ -394,10 +419,28 @@ export default class UVdatApi {
     return response.data;
   }
 
-  public static async getPropertyStatistics(mapLayerId: number, property_keys: string, bbox?: string, bins?: number) {
+  public static async getPropertyStatistics(
+    mapLayerId: number,
+    property_keys: string,
+    bbox?: string,
+    bins?: number,
+    approximate?: boolean,
+  ) {
     return (await UVdatApi.apiClient.get(
       `/vectors/${mapLayerId}/property-statistics/`,
-      { params: { property_keys, bbox, bins } },
+      { params: { property_keys, bbox, bins, approximate } },
+    )).data;
+  }
+
+  public static async requestExactPropertyStatistics(
+    mapLayerId: number,
+    property_keys: string,
+    bbox?: string,
+    bins?: number,
+  ): Promise<{ message: string; taskId: string }> {
+    return (await UVdatApi.apiClient.post(
+      `/vectors/${mapLayerId}/property-statistics/exact/`,
+      { property_keys, bbox, bins },
     )).data;
   }
 
@@ -643,6 +686,12 @@ export default class UVdatApi {
     return (await UVdatApi.apiClient.post('/map-layers/search-features/', requestData)).data;
   }
 
+  public static async searchVectorFeaturesPage(
+    requestData: SearchableVectorDataRequest & { limit: number },
+  ): Promise<SearchableVectorFeaturePage> {
+    return (await UVdatApi.apiClient.post('/map-layers/search-features/', requestData)).data;
+  }
+
   public static async getDisplayConfiguration(): Promise<DisplayConfiguration> {
     const response = await UVdatApi.apiClient.get('display-configuration/');
     return response.data;
@@ -178,7 +178,7 @@ const toggleVectorMapLayers = (map: maplibregl.Map) => {
       return;
     }
     map.addSource(`VectorTile_${layer.id}`, {
-      tiles: [`${baseVectorSource}/vectors/${layer.id}/tiles/{z}/{x}/{y}/`],
+      tiles: [`${baseVectorSource}/async/vectors/${layer.id}/tiles/{z}/{x}/{y}/`],
       type: 'vector',
     });
     map.addLayer({
@@ -911,6 +911,9 @@ export interface SearchableVectorDataRequest {
   filters?: Record<string, { type: 'bool' | 'number' | 'string', value: string | number | boolean | [number, number] }>;
   bbox?: string;
   sortKey?: string;
+  // Page size, results are returned with a cursor to the next page
+  limit?: number;
+  cursor?: string;
   titleKey: SearchableVectorDisplayItem;
   subtitleKeys: SearchableVectorDisplayItem[]; // Allows zero or multiple subtitles that will be in a single line
   detailStrings: SearchableVectorDisplayItem[];
@@ -924,6 +927,11 @@ export interface SearchableVectorFeatureResponse {
   center: { lat: number, lon: number };
 }
 
+export interface SearchableVectorFeaturePage {
+  results: SearchableVectorFeatureResponse[];
+  next: string | null;
+}
+
 export interface DisplayConfiguration {
   enabled_ui: ('Scenarios' | 'Collections' | 'Datasets' | 'Metadata')[];
   default_tab: 'Scenarios' | 'Collections' | 'Datasets' | 'Metadata';
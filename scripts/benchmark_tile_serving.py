@@ -0,0 +1,122 @@
+"""Benchmark tile and metadata requests under concurrent map panning.
+
+Simulates clients panning a map: each client walks across neighbouring tiles at a zoom
+level and requests every tile of its viewport at once, like MapLibre does. The same
+sequence is replayed against the synchronous DRF endpoints and the async endpoints so
+the two serving paths can be compared, e.g.
+
+    # WSGI
+    gunicorn --workers 8 uvdat.wsgi
+    # ASGI, serves both paths
+    gunicorn --workers 8 -k uvicorn.workers.UvicornWorker uvdat.asgi
+
+    python benchmark_tile_serving.py --token <token> --layer-id 3 --center -85.3,35.0
+
+Requires the benchmark extra, `pip install -e .[benchmark]`.
+"""
+
+import asyncio
+import math
+import statistics
+import time
+
+import click
+import httpx
+
+
+def lonlat_to_tile(lon, lat, zoom):
+    n = 2**zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return x, y
+
+
+def panning_viewports(center, zoom, steps, viewport, client_index):
+    """Yield the tiles of each viewport while panning east, offset rows per client."""
+    x0, y0 = lonlat_to_tile(center[0], center[1], zoom)
+    y0 += client_index % 3 - 1
+    n = 2**zoom
+    for step in range(steps):
+        yield [
+            (zoom, (x0 + step + dx) % n, min(max(y0 + dy, 0), n - 1))
+            for dx in range(viewport)
+            for dy in range(viewport)
+        ]
+
+
+async def run_client(client, paths, center, zoom, steps, viewport, client_index, latencies, codes):
+    for tiles in panning_viewports(center, zoom, steps, viewport, client_index):
+        requests = [path.format(z=z, x=x, y=y) for (z, x, y) in tiles for path in paths]
+
+        async def fetch(url):
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            codes[response.status_code] = codes.get(response.status_code, 0) + 1
+
+        await asyncio.gather(*[fetch(url) for url in requests])
+
+
+async def benchmark(base_url, token, paths, center, zoom, steps, viewport, clients):
+    latencies = []
+    codes = {}
+    limits = httpx.Limits(max_connections=clients * viewport * viewport)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip, br'},
+        limits=limits,
+        timeout=60,
+    ) as client:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[
+                run_client(client, paths, center, zoom, steps, viewport, i, latencies, codes)
+                for i in range(clients)
+            ]
+        )
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'status_codes': codes,
+    }
+
+
+@click.command()
+@click.option('--base-url', default='http://localhost:8000/api/v1', help='API root')
+@click.option('--token', required=True, help='OAuth2 access token')
+@click.option('--layer-id', type=int, required=True, help='VectorMapLayer to request tiles of')
+@click.option('--center', default='-85.3,35.0', help='lon,lat the panning starts at')
+@click.option('--zoom', type=int, default=10)
+@click.option('--steps', type=int, default=20, help='Pan steps per client')
+@click.option('--viewport', type=int, default=4, help='Viewport width/height in tiles')
+@click.option('--clients', type=int, default=16, help='Concurrent panning clients')
+@click.option('--with-metadata', is_flag=True, help='Also request the bbox with every tile')
+def main(base_url, token, layer_id, center, zoom, steps, viewport, clients, with_metadata):
+    center = [float(value) for value in center.split(',')]
+    serving_paths = {
+        'sync': '/vectors/{layer_id}/',
+        'async': '/async/vectors/{layer_id}/',
+    }
+    for name, prefix in serving_paths.items():
+        prefix = prefix.format(layer_id=layer_id)
+        paths = [prefix + 'tiles/{z}/{x}/{y}/']
+        if with_metadata:
+            paths.append(prefix + 'bbox/')
+        result = asyncio.run(
+            benchmark(base_url, token, paths, center, zoom, steps, viewport, clients)
+        )
+        click.echo(
+            f"{name:>5}: {result['requests']} requests, "
+            f"{result['requests_per_second']:.1f} req/s, "
+            f"p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+            f"status {result['status_codes']}"
+        )
+
+
+if __name__ == '__main__':
+    main()
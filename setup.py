@@ -37,6 +37,8 @@ setup(
     include_package_data=True,
     install_requires=[
         # Pinned August 2024
+        'asyncpg==0.29.0',
+        'brotli==1.1.0',
         'celery==5.4.0',
         'django==5.0.7',
         'django-configurations[database,email]==2.5.1',
@@ -47,9 +49,14 @@ setup(
         'django-large-image==0.10.0',
         'drf-yasg==1.21.7',
         'fiona==1.10.0',
+        'fsspec[http]==2024.6.1',
         'osmnx==1.9.4',
         'geopandas==0.14.4',
+        'ijson==3.3.0',
         'networkx==3.3',
+        'pmtiles==3.4.1',
+        'pyogrio==0.9.0',
+        'pyarrow==17.0.0',
         'pyshp==2.3.1',
         'rasterio==1.3.10',
         'urllib3==1.26.15',
@@ -67,6 +74,7 @@ setup(
         'django-composed-configuration[prod]==0.25.0',
         'django-s3-file-field[boto3]==1.0.1',
         'gunicorn==22.0.0',
+        'uvicorn[standard]==0.30.6',
     ],
     extras_require={
         'dev': [
@@ -76,5 +84,9 @@ setup(
             'ipython==8.26.0',
             'tox==4.16.0',
         ],
+        # scripts/benchmark_tile_serving.py
+        'benchmark': [
+            'httpx==0.27.2',
+        ],
     },
 )
@@ -57,7 +57,7 @@ class RasterMapLayerAdmin(admin.ModelAdmin):
 
 
 class VectorMapLayerAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'get_dataset_name', 'index', 'geojson_file', 'bounds']
+    list_display = ['id', 'name', 'get_dataset_name', 'index', 'geodata_file', 'bounds']
 
     def get_dataset_name(self, obj):
         return obj.dataset.name
@@ -202,6 +202,7 @@ class VectorFeatureTableDataAdmin(admin.ModelAdmin):
         'type',
         'description',
         'columns',
+        'x_column',
         'summary',
     ]
 
@@ -210,7 +211,7 @@ class VectorFeatureTableDataAdmin(admin.ModelAdmin):
 
 
 class VectorFeatureRowDataAdmin(admin.ModelAdmin):
-    list_display = ['id', 'vector_feature_table', 'row_data']
+    list_display = ['id', 'vector_feature_table', 'x_value', 'row_data']
 
 
 class DisplayConfigurationAdmin(admin.ModelAdmin):
@@ -0,0 +1,11 @@
+from .geojson_reader import GEOJSON_BATCH_SIZE, GEOJSON_SEQ_EXTS, GeoJSONFeatureReader
+from .geoparquet import GeoParquetReader, GeoParquetWriter, write_geoparquet
+
+__all__ = [
+    GEOJSON_BATCH_SIZE,
+    GEOJSON_SEQ_EXTS,
+    GeoJSONFeatureReader,
+    GeoParquetReader,
+    GeoParquetWriter,
+    write_geoparquet,
+]
@@ -0,0 +1,140 @@
+import codecs
+import json
+from typing import BinaryIO, Iterator
+
+import geopandas
+import ijson
+
+# Features are parsed and reprojected in frames of this many features
+GEOJSON_BATCH_SIZE = 10_000
+# The start of a stream read to tell a GeoJSONSeq from a FeatureCollection
+GEOJSON_SNIFF_BYTES = 1 << 20
+GEOJSON_SEQ_EXTS = ['.geojsonl', '.geojsons']
+# Record separator prefixing each text of a GeoJSON text sequence (RFC 8142)
+RECORD_SEPARATOR = b'\x1e'
+
+
+class _PrefixedStream:
+    """A readable stream of some already read bytes followed by the rest of a stream."""
+
+    def __init__(self, head: bytes, stream: BinaryIO, strip_separators: bool = False):
+        self.head = head
+        self.stream = stream
+        self.strip_separators = strip_separators
+
+    def read(self, size: int = -1) -> bytes:
+        if self.head:
+            if size < 0:
+                data, self.head = self.head + self.stream.read(), b''
+            else:
+                data, self.head = self.head[:size], self.head[size:]
+        else:
+            data = self.stream.read(size)
+        if self.strip_separators:
+            data = data.replace(RECORD_SEPARATOR, b'\n')
+        return data
+
+
+class GeoJSONFeatureReader:
+    """Incrementally read the features of a GeoJSON FeatureCollection or GeoJSONSeq stream.
+
+    Only the features of a batch are held in memory. The projection of a FeatureCollection
+    is read from its `crs` member, which must precede its features, as written by GDAL,
+    unless they fit in a single batch.
+    """
+
+    def __init__(self, stream: BinaryIO, encoding: str = 'utf-8', sequence: bool | None = None):
+        if codecs.lookup(encoding).name != 'utf-8':
+            # The parser reads UTF-8
+            stream = codecs.EncodedFile(stream, 'utf-8', encoding)
+        head = stream.read(GEOJSON_SNIFF_BYTES)
+        if not head.strip():
+            raise ValueError('GeoJSON is empty')
+        if sequence is None:
+            sequence = self.is_sequence(head)
+        self.sequence = sequence
+        self.stream = _PrefixedStream(head, stream, strip_separators=sequence)
+        self.crs_builder = ijson.ObjectBuilder()
+        self.read_crs = False
+        self.read_features = False
+        self.crs_after_features = False
+
+    @staticmethod
+    def is_sequence(head: bytes) -> bool:
+        """Whether the start of a stream is a GeoJSONSeq, by its first line being a Feature."""
+        head = head.lstrip()
+        if head.startswith(RECORD_SEPARATOR):
+            return True
+        first_line, newline, _ = head.partition(b'\n')
+        if not newline:
+            return False
+        try:
+            first_value = json.loads(first_line)
+        except ValueError:
+            return False
+        return isinstance(first_value, dict) and first_value.get('type') == 'Feature'
+
+    @property
+    def crs(self) -> str | None:
+        if not self.read_crs:
+            return None
+        return (self.crs_builder.value or {}).get('properties', {}).get('name')
+
+    def _watch_crs(self, events):
+        for prefix, event, value in events:
+            if prefix == 'crs' or prefix.startswith('crs.'):
+                self.crs_builder.event(event, value)
+                self.read_crs = True
+                self.crs_after_features = self.crs_after_features or self.read_features
+            elif prefix == 'features.item':
+                self.read_features = True
+            yield prefix, event, value
+
+    def __iter__(self) -> Iterator[dict]:
+        if self.sequence:
+            for value in ijson.items(self.stream, '', multiple_values=True, use_float=True):
+                if isinstance(value, dict) and value.get('type') == 'Feature':
+                    yield value
+        else:
+            events = self._watch_crs(ijson.parse(self.stream, use_float=True))
+            yield from ijson.items(events, 'features.item')
+
+    def _frame(self, features: list[dict], offset: int) -> geopandas.GeoDataFrame:
+        if not features:
+            return geopandas.GeoDataFrame(geometry=geopandas.GeoSeries([]), crs=4326)
+        frame = geopandas.GeoDataFrame.from_features(features)
+        # Feature ids of the stored file continue across batches
+        frame.index = range(offset, offset + len(frame))
+        if self.crs:
+            frame = frame.set_crs(self.crs, allow_override=True).to_crs(4326)
+        return frame
+
+    def batches(self, size: int = GEOJSON_BATCH_SIZE) -> Iterator[geopandas.GeoDataFrame]:
+        """Yield the features in frames of up to `size` features, in EPSG:4326.
+
+        Nothing is yielded when there are no features.
+        """
+        features = []
+        offset = 0
+        for feature in self:
+            self._check_crs_order(offset)
+            features.append(feature)
+            if len(features) == size:
+                yield self._frame(features, offset)
+                offset += len(features)
+                features = []
+        self._check_crs_order(offset)
+        if features:
+            yield self._frame(features, offset)
+
+    def _check_crs_order(self, yielded: int):
+        if yielded and self.crs_after_features:
+            # The frames already yielded were not reprojected
+            raise ValueError(
+                'The crs member of the GeoJSON FeatureCollection follows its features, '
+                'move it before the features or convert the file to EPSG:4326'
+            )
+
+    def read_frame(self) -> geopandas.GeoDataFrame:
+        """Read all features into a single frame, in EPSG:4326."""
+        return self._frame(list(self), 0)
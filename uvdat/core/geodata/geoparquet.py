@@ -0,0 +1,274 @@
+import json
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+import geopandas
+import pandas
+import pyarrow
+import pyarrow.compute as pc
+import pyarrow.ipc
+import pyarrow.parquet as pq
+from pyproj import CRS
+import shapely
+
+GEOPARQUET_VERSION = '1.1.0'
+# Row groups are the unit skipped by bounding box reads
+GEOPARQUET_ROW_GROUP_SIZE = 10_000
+GEOMETRY_COLUMN = 'geometry'
+# Per-feature bounding boxes, a GeoParquet covering of the geometry column
+BBOX_COLUMN = 'geometry_bbox'
+BBOX_FIELDS = ['xmin', 'ymin', 'xmax', 'ymax']
+# Schema metadata listing the property columns stored as JSON text
+JSON_COLUMNS_KEY = b'uvdat:json_columns'
+
+
+def is_text_column(column: pandas.Series) -> bool:
+    return bool(column[column.notna()].map(lambda value: isinstance(value, str)).all())
+
+
+def geodata_to_table(geodata: geopandas.GeoDataFrame) -> tuple[pyarrow.Table, list[str]]:
+    """Convert a GeoDataFrame to an Arrow table of properties, WKB geometries and bboxes.
+
+    Object columns holding values other than strings, such as nested GeoJSON properties,
+    are stored as JSON text. Returns the table and the names of those columns.
+    """
+    properties = pandas.DataFrame(geodata.drop(columns=geodata.geometry.name))
+    properties.columns = [str(column) for column in properties.columns]
+    json_columns = []
+    for column in properties.columns:
+        values = properties[column]
+        if values.dtype == object and not is_text_column(values):
+            properties[column] = [
+                None if missing else json.dumps(value, default=str)
+                for value, missing in zip(values, values.isna())
+            ]
+            json_columns.append(column)
+
+    geometries = geodata.geometry.to_numpy()
+    bounds = shapely.bounds(geometries)
+    properties_table = pyarrow.Table.from_pandas(properties, preserve_index=False)
+    table = pyarrow.table(
+        {
+            # Built from the columns, since a table without columns has no rows
+            **{name: properties_table.column(name) for name in properties_table.column_names},
+            GEOMETRY_COLUMN: pyarrow.array(shapely.to_wkb(geometries), type=pyarrow.binary()),
+            BBOX_COLUMN: pyarrow.StructArray.from_arrays(
+                [pyarrow.array(bounds[:, index]) for index in range(4)], names=BBOX_FIELDS
+            ),
+        }
+    )
+    return table, json_columns
+
+
+def unified_column_type(types: list[pyarrow.DataType]) -> pyarrow.DataType | None:
+    """Get the type of a column holding values of all types, or None if there is none."""
+    types = [column_type for column_type in types if not pyarrow.types.is_null(column_type)]
+    if not types:
+        return pyarrow.string()
+    if all(column_type == types[0] for column_type in types):
+        return types[0]
+    if all(
+        pyarrow.types.is_integer(column_type) or pyarrow.types.is_floating(column_type)
+        for column_type in types
+    ):
+        return pyarrow.float64()
+    return None
+
+
+def to_json_text(column: pyarrow.ChunkedArray) -> pyarrow.Array:
+    return pyarrow.array(
+        [None if value is None else json.dumps(value, default=str) for value in column.to_pylist()],
+        type=pyarrow.string(),
+    )
+
+
+class GeoParquetWriter:
+    """Write GeoDataFrames in EPSG:4326 to a GeoParquet file, unifying their properties.
+
+    Batches may have different property columns and types. They are held as temporary Arrow
+    files until the writer is closed, then written one at a time with the unified schema, so
+    memory is proportional to the batch size. Properties of conflicting types are stored as
+    JSON text.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.parts = []
+        self.geometry_types = set()
+
+    def write(self, geodata: geopandas.GeoDataFrame):
+        if not len(geodata):
+            return
+        # Spatially ordered rows make the bounding boxes of row groups small
+        present = geodata.geometry.notna() & ~geodata.geometry.is_empty
+        if present.all():
+            geodata = geodata.iloc[geodata.geometry.hilbert_distance().argsort()]
+        table, json_columns = geodata_to_table(geodata)
+        part_path = self.path.with_name(f'{self.path.stem}.{len(self.parts)}.arrow')
+        with pyarrow.OSFile(str(part_path), 'wb') as sink:
+            with pyarrow.ipc.new_file(sink, table.schema) as part_writer:
+                part_writer.write_table(table)
+        self.parts.append((part_path, table.schema, json_columns))
+        self.geometry_types.update(geodata.geom_type.dropna().unique())
+
+    def unified_schema(self) -> tuple[pyarrow.Schema, list[str]]:
+        columns = {}
+        json_columns = set()
+        for _path, schema, part_json_columns in self.parts:
+            json_columns.update(part_json_columns)
+            for field in schema:
+                if field.name not in (GEOMETRY_COLUMN, BBOX_COLUMN):
+                    columns.setdefault(field.name, []).append(field.type)
+
+        fields = []
+        for name, types in columns.items():
+            column_type = None if name in json_columns else unified_column_type(types)
+            if column_type is None:
+                json_columns.add(name)
+                column_type = pyarrow.string()
+            fields.append(pyarrow.field(name, column_type))
+        bbox_type = pyarrow.struct([(field, pyarrow.float64()) for field in BBOX_FIELDS])
+        fields += [
+            pyarrow.field(GEOMETRY_COLUMN, pyarrow.binary()),
+            pyarrow.field(BBOX_COLUMN, bbox_type),
+        ]
+        return pyarrow.schema(fields), sorted(json_columns)
+
+    def geo_metadata(self) -> dict:
+        return {
+            'version': GEOPARQUET_VERSION,
+            'primary_column': GEOMETRY_COLUMN,
+            'columns': {
+                GEOMETRY_COLUMN: {
+                    'encoding': 'WKB',
+                    'geometry_types': sorted(self.geometry_types),
+                    'crs': CRS.from_epsg(4326).to_json_dict(),
+                    'covering': {
+                        'bbox': {field: [BBOX_COLUMN, field] for field in BBOX_FIELDS},
+                    },
+                }
+            },
+        }
+
+    def close(self):
+        schema, json_columns = self.unified_schema()
+        schema = schema.with_metadata(
+            {b'geo': json.dumps(self.geo_metadata()), JSON_COLUMNS_KEY: json.dumps(json_columns)}
+        )
+        with pq.ParquetWriter(str(self.path), schema) as writer:
+            for part_path, _schema, part_json_columns in self.parts:
+                with pyarrow.memory_map(str(part_path)) as source:
+                    part = pyarrow.ipc.open_file(source).read_all()
+                columns = []
+                for field in schema:
+                    if field.name not in part.column_names:
+                        columns.append(pyarrow.nulls(len(part), field.type))
+                    elif field.name in json_columns and field.name not in part_json_columns:
+                        columns.append(to_json_text(part.column(field.name)))
+                    else:
+                        columns.append(part.column(field.name).cast(field.type))
+                writer.write_table(
+                    pyarrow.Table.from_arrays(columns, schema=schema),
+                    row_group_size=GEOPARQUET_ROW_GROUP_SIZE,
+                )
+                part_path.unlink()
+        self.parts = []
+
+
+def write_geoparquet(geodata: geopandas.GeoDataFrame, path: str | Path):
+    writer = GeoParquetWriter(path)
+    writer.write(geodata)
+    writer.close()
+
+
+def table_to_geodata(table: pyarrow.Table, json_columns: list[str]) -> geopandas.GeoDataFrame:
+    geometries = shapely.from_wkb(table.column(GEOMETRY_COLUMN).to_numpy(zero_copy_only=False))
+    properties = table.drop_columns(
+        [name for name in (GEOMETRY_COLUMN, BBOX_COLUMN) if name in table.column_names]
+    ).to_pandas()
+    for column in json_columns:
+        if column in properties.columns:
+            properties[column] = properties[column].map(json.loads, na_action='ignore')
+    return geopandas.GeoDataFrame(properties, geometry=geometries, crs=4326)
+
+
+def row_group_intersects(row_group: pq.RowGroupMetaData, bbox) -> bool:
+    """Whether the feature bounding boxes of a row group may intersect a bounding box."""
+    statistics = {}
+    for index in range(row_group.num_columns):
+        column = row_group.column(index)
+        path = column.path_in_schema.split('.')
+        if path[0] == BBOX_COLUMN and column.is_stats_set and column.statistics.has_min_max:
+            statistics[path[-1]] = column.statistics
+    if len(statistics) < len(BBOX_FIELDS):
+        return True
+    xmin, ymin, xmax, ymax = bbox
+    return (
+        statistics['xmin'].min <= xmax
+        and statistics['xmax'].max >= xmin
+        and statistics['ymin'].min <= ymax
+        and statistics['ymax'].max >= ymin
+    )
+
+
+class GeoParquetReader:
+    """Read the features of a GeoParquet file written by GeoParquetWriter."""
+
+    def __init__(self, source: str | Path | BinaryIO):
+        self.file = pq.ParquetFile(source)
+        metadata = self.file.schema_arrow.metadata or {}
+        self.json_columns = json.loads(metadata.get(JSON_COLUMNS_KEY, b'[]'))
+        self.property_columns = [
+            name
+            for name in self.file.schema_arrow.names
+            if name not in (GEOMETRY_COLUMN, BBOX_COLUMN)
+        ]
+
+    def columns(self, columns: list[str] | None) -> list[str]:
+        if columns is None:
+            return self.property_columns
+        return [column for column in columns if column in self.property_columns]
+
+    def read(self, columns: list[str] | None = None, bbox=None) -> geopandas.GeoDataFrame:
+        """Read the features, optionally of some property columns and intersecting a bbox.
+
+        Only row groups whose features may intersect the (xmin, ymin, xmax, ymax) bbox are
+        read, and the features are then filtered by their bounding boxes.
+        """
+        read_columns = [*self.columns(columns), GEOMETRY_COLUMN]
+        if bbox is None:
+            return table_to_geodata(self.file.read(columns=read_columns), self.json_columns)
+
+        row_groups = [
+            index
+            for index in range(self.file.num_row_groups)
+            if row_group_intersects(self.file.metadata.row_group(index), bbox)
+        ]
+        if not row_groups:
+            table = self.file.schema_arrow.empty_table().select(read_columns)
+            return table_to_geodata(table, self.json_columns)
+        table = self.file.read_row_groups(row_groups, columns=[*read_columns, BBOX_COLUMN])
+        xmin, ymin, xmax, ymax = bbox
+        feature_bbox = table.column(BBOX_COLUMN)
+        table = table.filter(
+            pc.and_(
+                pc.and_(
+                    pc.less_equal(pc.struct_field(feature_bbox, 'xmin'), xmax),
+                    pc.greater_equal(pc.struct_field(feature_bbox, 'xmax'), xmin),
+                ),
+                pc.and_(
+                    pc.less_equal(pc.struct_field(feature_bbox, 'ymin'), ymax),
+                    pc.greater_equal(pc.struct_field(feature_bbox, 'ymax'), ymin),
+                ),
+            )
+        )
+        return table_to_geodata(table, self.json_columns)
+
+    def batches(
+        self, size: int = GEOPARQUET_ROW_GROUP_SIZE, columns: list[str] | None = None
+    ) -> Iterator[geopandas.GeoDataFrame]:
+        """Yield the features in frames of up to `size` features."""
+        for batch in self.file.iter_batches(
+            batch_size=size, columns=[*self.columns(columns), GEOMETRY_COLUMN]
+        ):
+            yield table_to_geodata(pyarrow.Table.from_batches([batch]), self.json_columns)
@@ -1,4 +1,5 @@
 # flake8: noqa: E501
+from contextlib import nullcontext
 from datetime import datetime
 import json
 import os
@@ -12,6 +13,7 @@ from django.core.management.base import BaseCommand
 import requests
 
 from uvdat.core.models import Context, Dataset, FileItem
+from uvdat.core.tasks.map_layers import deferred_vector_feature_indexes
 
 DATA_FOLDER = Path(os.environ.get('NZ_INGEST_BIND_MOUNT_POINT', 'sample_data'))
 
@@ -31,6 +33,13 @@ class Command(BaseCommand):
             action='store_true',
             help='Replace ALL data in the current database.',
         )
+        parser.add_argument(
+            '--defer-indexes',
+            action='store_true',
+            help='Build the spatial and search indexes of vector features after ingesting, '
+            'which is faster for large initial loads. The whole ingest runs in one transaction '
+            'and other queries of features wait for it.',
+        )
 
     def handle(self, *args: Any, **options: Dict[str, Any]) -> None:
         file_path = Path(DATA_FOLDER, options['file_path'])
@@ -56,15 +65,16 @@ class Command(BaseCommand):
         with file_path.open('r') as f:
             data = json.load(f)
 
-        for entry in data:
-            if entry['type'] == 'Context':
-                self.create_or_update_context(entry, replace)
-            elif entry['type'] == 'Dataset':
-                self.create_or_update_dataset(entry, None, replace)
-            else:
-                self.stderr.write(
-                    self.style.WARNING(f'Unknown type {entry["type"]} in the dataset.')
-                )
+        with deferred_vector_feature_indexes() if options['defer_indexes'] else nullcontext():
+            for entry in data:
+                if entry['type'] == 'Context':
+                    self.create_or_update_context(entry, replace)
+                elif entry['type'] == 'Dataset':
+                    self.create_or_update_dataset(entry, None, replace)
+                else:
+                    self.stderr.write(
+                        self.style.WARNING(f'Unknown type {entry["type"]} in the dataset.')
+                    )
 
     def create_or_update_context(self, context_data: Dict[str, Any], replace: bool) -> None:
         context_name = context_data['name']
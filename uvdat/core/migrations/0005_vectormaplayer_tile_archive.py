@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:02
+
+from django.db import migrations, models
+import s3_file_field.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_displayconfiguration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectormaplayer',
+            name='tile_archive',
+            field=s3_file_field.fields.S3FileField(
+                blank=True,
+                help_text='Pre-rendered MBTiles/PMTiles archive of the layer',
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name='vectormaplayer',
+            name='tile_archive_metadata',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:10
+
+from datetime import datetime, timezone
+import re
+
+from django.db import migrations, models
+
+# Copies of the model helpers as of this migration, later changes to them do not apply
+X_COLUMN_CANDIDATES = ['index', 'time', 'date', 'year']
+FRACTIONAL_SECONDS = re.compile(r'\.(\d+)')
+
+
+def default_x_column(columns) -> str:
+    if not columns:
+        return ''
+    for candidate in X_COLUMN_CANDIDATES:
+        if candidate in columns:
+            return candidate
+    return columns[0]
+
+
+def to_step_value(value) -> float | None:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    text = str(value).strip()
+    if text[-1:] in ('Z', 'z'):
+        text = f'{text[:-1]}+00:00'
+    text = FRACTIONAL_SECONDS.sub(lambda match: '.' + match[1][:6].ljust(6, '0'), text)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def populate_x_values(apps, schema_editor):
+    table_model = apps.get_model('core', 'VectorFeatureTableData')
+    row_model = apps.get_model('core', 'VectorFeatureRowData')
+    for table in table_model.objects.iterator():
+        columns = table.columns or []
+        table.x_column = default_x_column(columns)
+        table.save(update_fields=['x_column'])
+        if not table.x_column:
+            continue
+        x_index = columns.index(table.x_column)
+        rows = []
+        for row in row_model.objects.filter(vector_feature_table=table).iterator():
+            if isinstance(row.row_data, list) and len(row.row_data) > x_index:
+                row.x_value = to_step_value(row.row_data[x_index])
+                rows.append(row)
+        row_model.objects.bulk_update(rows, ['x_value'], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_vectormaplayer_tile_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectorfeaturetabledata',
+            name='x_column',
+            field=models.CharField(
+                blank=True,
+                default='',
+                help_text='Column indexing the rows of the table',
+                max_length=255,
+            ),
+        ),
+        migrations.AddField(
+            model_name='vectorfeaturerowdata',
+            name='x_value',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vectorfeaturetabledata',
+            index=models.Index(fields=['map_layer', 'type'], name='core_vector_map_lay_fe8fbb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vectorfeaturerowdata',
+            index=models.Index(
+                fields=['vector_feature_table', 'x_value'], name='core_vector_vector__2cda4e_idx'
+            ),
+        ),
+        migrations.RunPython(populate_x_values, migrations.RunPython.noop),
+    ]
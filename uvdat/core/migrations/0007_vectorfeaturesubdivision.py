@@ -0,0 +1,54 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:20
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_vectorfeaturerowdata_x_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorFeatureSubdivision',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                ('geometry', django.contrib.gis.db.models.fields.GeometryField(srid=4326)),
+                (
+                    'map_layer',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to='core.vectormaplayer'
+                    ),
+                ),
+                (
+                    'vector_feature',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='subdivisions',
+                        to='core.vectorfeature',
+                    ),
+                ),
+            ],
+        ),
+        # Subdivide the large features of existing layers
+        migrations.RunSQL(
+            """
+            INSERT INTO core_vectorfeaturesubdivision (vector_feature_id, map_layer_id, geometry)
+            SELECT id, map_layer_id, ST_Subdivide(geometry, 256)
+            FROM core_vectorfeature
+            WHERE GeometryType(geometry) IN (
+                'LINESTRING', 'MULTILINESTRING', 'POLYGON', 'MULTIPOLYGON'
+            )
+            AND ST_NPoints(geometry) > 1024
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_vectorfeaturesubdivision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectormaplayer',
+            name='property_summary',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
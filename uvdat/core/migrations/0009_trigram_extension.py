@@ -0,0 +1,16 @@
+# Generated by Django 5.0.7 on 2026-10-19 18:20
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_vectormaplayer_property_summary'),
+    ]
+
+    operations = [
+        # Trigram indexes of searched feature properties, see uvdat.core.tasks.search_indexes
+        TrigramExtension(),
+    ]
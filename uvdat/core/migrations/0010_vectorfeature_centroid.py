@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-19 18:45
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_trigram_extension'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectorfeature',
+            name='centroid',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, null=True, srid=4326),
+        ),
+        migrations.RunSQL(
+            'UPDATE core_vectorfeature SET centroid = ST_Centroid(geometry)',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
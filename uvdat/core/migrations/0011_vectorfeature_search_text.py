@@ -0,0 +1,74 @@
+# Generated by Django 5.0.7 on 2026-10-19 19:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# A copy of the model's search text update as of this migration, later changes do not apply
+UPDATE_FEATURE_SEARCH_TEXT_SQL = """
+    WITH search AS (
+        SELECT
+            id,
+            NULLIF(
+                array_to_string(
+                    ARRAY(SELECT properties ->> key FROM unnest(%(keys)s::text[]) AS key), ' '
+                ),
+                ''
+            ) AS text
+        FROM core_vectorfeature
+        WHERE map_layer_id = %(map_layer_id)s
+    )
+    UPDATE core_vectorfeature vf
+    SET search_text = search.text, search_vector = to_tsvector('simple', search.text)
+    FROM search
+    WHERE vf.id = search.id
+    AND vf.search_text IS DISTINCT FROM search.text
+"""
+
+
+def set_search_text(apps, schema_editor):
+    vector_map_layer_model = apps.get_model('core', 'VectorMapLayer')
+    for map_layer in vector_map_layer_model.objects.exclude(default_style=None):
+        config = map_layer.default_style.get('searchableVectorFeatureData') or {}
+        keys = [
+            field['value']
+            for field in config.get('mainTextSearchFields') or []
+            if isinstance(field, dict) and field.get('value')
+        ]
+        if keys:
+            schema_editor.execute(
+                UPDATE_FEATURE_SEARCH_TEXT_SQL, {'map_layer_id': map_layer.pk, 'keys': keys}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_vectorfeature_centroid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectorfeature',
+            name='search_text',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vectorfeature',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vectorfeature',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'], name='core_vf_text_vector_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='vectorfeature',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_text'], name='core_vf_text_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+        ),
+        migrations.RunPython(set_search_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.0.7 on 2026-10-19 19:40
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_vectorfeature_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorPropertyValue',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                ('key', models.TextField()),
+                ('value', models.TextField()),
+                ('count', models.IntegerField()),
+                (
+                    'map_layer',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to='core.vectormaplayer'
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        models.F('map_layer'),
+                        models.F('key'),
+                        django.contrib.postgres.indexes.OpClass(
+                            django.db.models.functions.text.Upper('value'),
+                            name='text_pattern_ops',
+                        ),
+                        name='core_vpv_prefix_idx',
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        django.contrib.postgres.indexes.OpClass(
+                            django.db.models.functions.text.Upper('value'), name='gin_trgm_ops'
+                        ),
+                        name='core_vpv_trgm_idx',
+                    ),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('map_layer', 'key', 'value'), name='unique-vector-property-value'
+                    )
+                ],
+            },
+        ),
+        # Count the values of existing layers
+        migrations.RunSQL(
+            """
+            INSERT INTO core_vectorpropertyvalue (map_layer_id, key, value, count)
+            SELECT vf.map_layer_id, p.key, p.value #>> '{}', count(*)
+            FROM core_vectorfeature vf
+            CROSS JOIN LATERAL jsonb_each(vf.properties) AS p
+            WHERE jsonb_typeof(vf.properties) = 'object'
+            AND jsonb_typeof(p.value) = 'string'
+            AND length(p.key) <= 256
+            AND length(p.value #>> '{}') <= 256
+            GROUP BY vf.map_layer_id, p.key, p.value #>> '{}'
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-19 21:15
+
+from django.db import migrations
+import s3_file_field.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_vectorpropertyvalue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectormaplayer',
+            name='geodata_file',
+            field=s3_file_field.fields.S3FileField(
+                blank=True,
+                help_text='GeoParquet file of the layer features in EPSG:4326',
+                null=True,
+            ),
+        ),
+    ]
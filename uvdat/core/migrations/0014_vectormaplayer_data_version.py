@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-20 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_vectormaplayer_geodata_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectormaplayer',
+            name='data_version',
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text='Incremented when the features or their row data change',
+            ),
+        ),
+    ]
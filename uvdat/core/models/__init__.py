@@ -5,7 +5,14 @@ from .display_configuration import DisplayConfiguration
 from .file_item import FileItem
 from .layer_collection import LayerCollection
 from .layer_representation import LayerRepresentation
-from .map_layers import AbstractMapLayer, RasterMapLayer, VectorFeature, VectorMapLayer
+from .map_layers import (
+    AbstractMapLayer,
+    RasterMapLayer,
+    VectorFeature,
+    VectorFeatureSubdivision,
+    VectorMapLayer,
+    VectorPropertyValue,
+)
 from .netcdf import NetCDFData, NetCDFImage, NetCDFLayer
 from .networks import Network, NetworkEdge, NetworkNode
 from .processing_task import ProcessingTask
@@ -22,6 +29,8 @@ __all__ = [
     RasterMapLayer,
     VectorMapLayer,
     VectorFeature,
+    VectorFeatureSubdivision,
+    VectorPropertyValue,
     SourceRegion,
     DerivedRegion,
     Network,
@@ -31,7 +31,9 @@ class Dataset(TimeStampedModel):
         if asynchronous:
             convert_dataset.delay(self.id, style_options, network_options, region_options)
         else:
-            convert_dataset(self.id, style_options, network_options, region_options)
+            convert_dataset(
+                self.id, style_options, network_options, region_options, asynchronous=False
+            )
 
     def get_size(self):
         from uvdat.core.models import FileItem
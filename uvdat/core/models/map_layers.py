@@ -3,18 +3,78 @@ from pathlib import Path
 import tempfile
 
 from django.contrib.gis.db import models as geomodels
+from django.contrib.gis.db.models import Extent
 from django.contrib.gis.geos import Polygon
-from django.core.files.base import ContentFile
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.core.files import File
+from django.db import connection, models
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.functions import Upper
 from django.dispatch import receiver
 from django_extensions.db.models import TimeStampedModel
+import fsspec
+import geopandas
 import large_image
+import rasterio
+from rasterio.errors import RasterioIOError
+from rasterio.warp import transform_bounds
 from s3_file_field import S3FileField
-from shapely.geometry import shape
-from shapely.ops import unary_union
+
+from uvdat.core.geodata import (
+    GEOJSON_BATCH_SIZE,
+    GeoJSONFeatureReader,
+    GeoParquetReader,
+    write_geoparquet,
+)
 
 from .dataset import Dataset
 
+# Line and polygon features with more vertices than this are also stored as pieces
+SUBDIVIDE_MIN_POINTS = 1024
+SUBDIVIDE_MAX_VERTICES = 256
+
+SUBDIVIDE_FEATURES_SQL = """
+    INSERT INTO core_vectorfeaturesubdivision (vector_feature_id, map_layer_id, geometry)
+    SELECT id, map_layer_id, ST_Subdivide(geometry, %(max_vertices)s)
+    FROM core_vectorfeature
+    WHERE map_layer_id = %(map_layer_id)s
+    AND GeometryType(geometry) IN ('LINESTRING', 'MULTILINESTRING', 'POLYGON', 'MULTIPOLYGON')
+    AND ST_NPoints(geometry) > %(min_points)s
+"""
+
+# Centroids of new features, search results are located by them without reading geometries
+UPDATE_FEATURE_CENTROIDS_SQL = """
+    UPDATE core_vectorfeature SET centroid = ST_Centroid(geometry)
+    WHERE map_layer_id = %(map_layer_id)s AND centroid IS NULL
+"""
+
+# Text of the layer's search fields, words are indexed for prefix search and trigrams for
+# typo tolerant matching
+UPDATE_FEATURE_SEARCH_TEXT_SQL = """
+    WITH search AS (
+        SELECT
+            id,
+            NULLIF(
+                array_to_string(
+                    ARRAY(SELECT properties ->> key FROM unnest(%(keys)s::text[]) AS key), ' '
+                ),
+                ''
+            ) AS text
+        FROM core_vectorfeature
+        WHERE map_layer_id = %(map_layer_id)s
+    )
+    UPDATE core_vectorfeature vf
+    SET search_text = search.text, search_vector = to_tsvector('simple', search.text)
+    FROM search
+    WHERE vf.id = search.id
+    AND vf.search_text IS DISTINCT FROM search.text
+"""
+
+# Partial indexes on the feature properties a layer's search uses, see
+# uvdat.core.tasks.search_indexes
+SEARCH_INDEX_PREFIX = 'core_vf_search_'
+
 
 class AbstractMapLayer(TimeStampedModel):
     dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, null=True)
@@ -40,20 +100,28 @@ class AbstractMapLayer(TimeStampedModel):
                     (bbox['xmin'], bbox['ymin'], bbox['xmax'], bbox['ymax'])
                 )
         elif isinstance(self, VectorMapLayer):
-            geojson_data = self.read_geojson_data()
-            if 'features' in geojson_data:
-                geometries = [shape(feature['geometry']) for feature in geojson_data['features']]
-                if geometries:
-                    combined = unary_union(geometries)  # Shapely Polygon
-                    self.bounds = Polygon(
-                        list(combined.envelope.exterior.coords)
-                    )  # Convert to GEOS Polygon
+            # The extent of the bounding boxes stored with the feature geometries
+            extent = self.vectorfeature_set.aggregate(extent=Extent('geometry'))['extent']
+            if extent:
+                self.bounds = Polygon.from_bbox(extent)
         self.save()
 
     class Meta:
         abstract = True
 
 
+def read_raster_bbox(path: str) -> dict | None:
+    # Only the header is read, without listing the storage for sidecar files
+    with rasterio.Env(GDAL_DISABLE_READDIR_ON_OPEN='EMPTY_DIR'):
+        with rasterio.open(path) as source:
+            if not source.crs:
+                return None
+            xmin, ymin, xmax, ymax = transform_bounds(
+                source.crs, 'EPSG:4326', *source.bounds, densify_pts=21
+            )
+    return {'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax}
+
+
 class RasterMapLayer(AbstractMapLayer):
     cloud_optimized_geotiff = S3FileField()
 
@@ -70,14 +138,24 @@ class RasterMapLayer(AbstractMapLayer):
                 data = data[::step][::step]
             return data.tolist()
 
+    def raster_path(self) -> str:
+        """Get a GDAL path of the COG, read with range requests when stored remotely."""
+        url = self.cloud_optimized_geotiff.url
+        if url.startswith(('http://', 'https://')):
+            return f'/vsicurl/{url}'
+        return self.cloud_optimized_geotiff.path
+
     def get_bbox(self):
-        with tempfile.TemporaryDirectory() as tmp:
-            raster_path = Path(tmp, 'raster')
-            with open(raster_path, 'wb') as raster_file:
-                raster_file.write(self.cloud_optimized_geotiff.read())
-            source = large_image.open(raster_path)
-            bounds = source.getBounds('epsg:4326')
-            return bounds
+        """Read the bounds of the raster in EPSG:4326 from the header of its COG."""
+        try:
+            return read_raster_bbox(self.raster_path())
+        except RasterioIOError:
+            # The storage URL may not be reachable from the server, so read a local copy
+            with tempfile.TemporaryDirectory() as tmp:
+                raster_path = Path(tmp, 'raster')
+                with open(raster_path, 'wb') as raster_file:
+                    raster_file.write(self.cloud_optimized_geotiff.read())
+                return read_raster_bbox(str(raster_path))
 
 
 @receiver(models.signals.pre_delete, sender=RasterMapLayer)
@@ -87,30 +165,265 @@ def delete_raster_content(sender, instance, **kwargs):
 
 
 class VectorMapLayer(AbstractMapLayer):
+    # Layers stored before geodata_file are read from their GeoJSON until rewritten
     geojson_file = S3FileField(null=True)
+    geodata_file = S3FileField(
+        null=True, blank=True, help_text='GeoParquet file of the layer features in EPSG:4326'
+    )
+    tile_archive = S3FileField(
+        null=True, blank=True, help_text='Pre-rendered MBTiles/PMTiles archive of the layer'
+    )
+    tile_archive_metadata = models.JSONField(blank=True, null=True)
+    # Aggregated property types and values, see uvdat.core.tasks.property_summary
+    property_summary = models.JSONField(blank=True, null=True)
+    # Identifies cached tiles and data derived from the features, with `modified`
+    data_version = models.PositiveIntegerField(
+        default=0, help_text='Incremented when the features or their row data change'
+    )
+
+    def features_changed(self):
+        """Record a change of the layer's features or their row data.
+
+        The data version is incremented in the database, so concurrent changes are all
+        counted, and read back into this instance. The tile archive rendered from the
+        previous features is deleted.
+        """
+        VectorMapLayer.objects.filter(pk=self.pk).update(data_version=F('data_version') + 1)
+        self.refresh_from_db(fields=['data_version', 'tile_archive', 'tile_archive_metadata'])
+        if self.tile_archive:
+            self.tile_archive.delete(save=False)
+            self.tile_archive_metadata = None
+            self.save(update_fields=['tile_archive', 'tile_archive_metadata'])
+
+    def write_geodata(self, geodata: geopandas.GeoDataFrame, save: bool = True):
+        """Store the features of a GeoDataFrame as the layer's GeoParquet file."""
+        if geodata.crs is not None:
+            geodata = geodata.to_crs(4326)
+        with tempfile.TemporaryDirectory() as tmp:
+            geodata_path = Path(tmp, 'vectordata.parquet')
+            write_geoparquet(geodata, geodata_path)
+            self.store_geodata_file(geodata_path, save=save)
 
-    def write_geojson_data(self, content: str | dict):
+    def store_geodata_file(self, path: str | Path, save: bool = True):
+        """Store a GeoParquet file as the layer's features, replacing any GeoJSON file."""
+        if self.geojson_file:
+            self.geojson_file.delete(save=False)
+        with open(path, 'rb') as geodata_file:
+            self.geodata_file.save('vectordata.parquet', File(geodata_file), save=save)
+
+    def write_geojson_data(self, content: str | dict, save: bool = True):
+        """Store a GeoJSON FeatureCollection, Feature or geometry in EPSG:4326."""
         if isinstance(content, str):
-            data = content
-        elif isinstance(content, dict):
-            data = json.dumps(content)
-        else:
+            content = json.loads(content)
+        elif not isinstance(content, dict):
             raise Exception(f'Invalid content type supplied: {type(content)}')
 
-        self.geojson_file.save('vectordata.geojson', ContentFile(data.encode()))
+        if content.get('type') == 'FeatureCollection':
+            features = content.get('features') or []
+        elif content.get('type') == 'Feature':
+            features = [content]
+        else:
+            features = [{'type': 'Feature', 'geometry': content, 'properties': {}}]
+        if features:
+            geodata = geopandas.GeoDataFrame.from_features(features, crs=4326)
+        else:
+            geodata = geopandas.GeoDataFrame(geometry=geopandas.GeoSeries([]), crs=4326)
+        self.write_geodata(geodata, save=save)
+
+    def open_geodata_file(self):
+        """Open the GeoParquet file, read with range requests when stored remotely.
+
+        Only the footer and the row groups and columns read are then downloaded.
+        """
+        url = self.geodata_file.url
+        if url.startswith(('http://', 'https://')):
+            try:
+                return fsspec.open(url, 'rb').open()
+            except OSError:
+                # The storage URL may not be reachable from the server
+                pass
+        return self.geodata_file.open('rb')
+
+    def read_geodata(
+        self, columns: list[str] | None = None, bbox: tuple | None = None
+    ) -> geopandas.GeoDataFrame:
+        """Read the features, optionally of some property columns and intersecting a bbox.
+
+        The bbox is (xmin, ymin, xmax, ymax) in EPSG:4326. Only the requested columns and
+        the row groups of the GeoParquet file near the bbox are read.
+        """
+        if self.geodata_file:
+            with self.open_geodata_file() as geodata_file:
+                return GeoParquetReader(geodata_file).read(columns, bbox)
+
+        with self.geojson_file.open('rb') as geojson_file:
+            geodata = GeoJSONFeatureReader(geojson_file).read_frame()
+        if geodata.crs is None:
+            geodata = geodata.set_crs(4326)
+        if columns is not None:
+            geodata = geodata[
+                [column for column in columns if column in geodata.columns]
+                + [geodata.geometry.name]
+            ]
+        if bbox is not None:
+            xmin, ymin, xmax, ymax = bbox
+            geodata = geodata.cx[xmin:xmax, ymin:ymax]
+        return geodata
+
+    def iter_geodata(self, batch_size: int = GEOJSON_BATCH_SIZE):
+        """Yield the features in frames of up to `batch_size` features, in EPSG:4326."""
+        if self.geodata_file:
+            with self.open_geodata_file() as geodata_file:
+                yield from GeoParquetReader(geodata_file).batches(batch_size)
+        else:
+            with self.geojson_file.open('rb') as geojson_file:
+                yield from GeoJSONFeatureReader(geojson_file).batches(batch_size)
 
     def read_geojson_data(self) -> dict:
-        """Read and load the data from geojson_file into a dict."""
-        return json.load(self.geojson_file.open())
+        """Read the features as a GeoJSON FeatureCollection dict."""
+        return json.loads(self.read_geodata().to_json(na='drop', default=str))
+
+    def subdivide_features(self) -> int:
+        """Rebuild the subdivided pieces of this layer's large line and polygon features."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM core_vectorfeaturesubdivision WHERE map_layer_id = %s', [self.pk]
+            )
+            cursor.execute(
+                SUBDIVIDE_FEATURES_SQL,
+                {
+                    'map_layer_id': self.pk,
+                    'min_points': SUBDIVIDE_MIN_POINTS,
+                    'max_vertices': SUBDIVIDE_MAX_VERTICES,
+                },
+            )
+            return cursor.rowcount
+
+    def update_feature_centroids(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(UPDATE_FEATURE_CENTROIDS_SQL, {'map_layer_id': self.pk})
+            return cursor.rowcount
+
+    @property
+    def search_fields(self) -> list[str]:
+        """Property keys the text search of the layer's search configuration matches."""
+        config = (self.default_style or {}).get('searchableVectorFeatureData') or {}
+        return [
+            field['value']
+            for field in config.get('mainTextSearchFields') or []
+            if isinstance(field, dict) and field.get('value')
+        ]
+
+    def update_search_text(self) -> int:
+        """Set the feature search text from the current search fields."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                UPDATE_FEATURE_SEARCH_TEXT_SQL,
+                {'map_layer_id': self.pk, 'keys': self.search_fields},
+            )
+            return cursor.rowcount
+
+    def search_index_names(self) -> list[str]:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT indexname FROM pg_indexes
+                WHERE tablename = 'core_vectorfeature' AND starts_with(indexname, %s)
+                """,
+                [f'{SEARCH_INDEX_PREFIX}{self.pk}_'],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def drop_search_indexes(self, names: list[str] | None = None):
+        if names is None:
+            names = self.search_index_names()
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
 
 
 @receiver(models.signals.pre_delete, sender=VectorMapLayer)
 def delete__vectorcontent(sender, instance, **kwargs):
     if instance.geojson_file:
         instance.geojson_file.delete(save=False)
+    if instance.geodata_file:
+        instance.geodata_file.delete(save=False)
+    if instance.tile_archive:
+        instance.tile_archive.delete(save=False)
+    # Partial indexes of the layer would be left empty
+    instance.drop_search_indexes()
+
+
+class VectorFeatureQuerySet(models.QuerySet):
+    def intersecting(self, geometry):
+        """Filter to features intersecting a geometry.
+
+        Large features are tested through their subdivided pieces, so the exact test only
+        touches the vertices near the geometry.
+        """
+        pieces = VectorFeatureSubdivision.objects.filter(vector_feature=OuterRef('pk'))
+        return self.filter(geometry__bboverlaps=geometry).filter(
+            Q(~Exists(pieces), geometry__intersects=geometry)
+            | Exists(pieces.filter(geometry__intersects=geometry))
+        )
 
 
 class VectorFeature(models.Model):
     map_layer = models.ForeignKey(VectorMapLayer, on_delete=models.CASCADE)
     geometry = geomodels.GeometryField()
     properties = models.JSONField()
+    # Set at ingest by VectorMapLayer.update_feature_centroids
+    centroid = geomodels.PointField(null=True, blank=True)
+    # Set by VectorMapLayer.update_search_text
+    search_text = models.TextField(null=True, blank=True)
+    search_vector = SearchVectorField(null=True, blank=True)
+
+    objects = VectorFeatureQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='core_vf_text_vector_idx'),
+            GinIndex(
+                fields=['search_text'], name='core_vf_text_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+        ]
+
+
+class VectorFeatureSubdivision(models.Model):
+    """A piece of a large VectorFeature's geometry with at most SUBDIVIDE_MAX_VERTICES."""
+
+    vector_feature = models.ForeignKey(
+        VectorFeature, on_delete=models.CASCADE, related_name='subdivisions'
+    )
+    map_layer = models.ForeignKey(VectorMapLayer, on_delete=models.CASCADE)
+    geometry = geomodels.GeometryField()
+
+
+class VectorPropertyValue(models.Model):
+    """A distinct string value of a property of a layer's features, with its feature count.
+
+    Filled by uvdat.core.tasks.property_summary along with the layer's property summary.
+    """
+
+    map_layer = models.ForeignKey(VectorMapLayer, on_delete=models.CASCADE)
+    key = models.TextField()
+    value = models.TextField()
+    count = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='unique-vector-property-value', fields=['map_layer', 'key', 'value']
+            )
+        ]
+        indexes = [
+            # Case insensitive prefix matches within a key
+            models.Index(
+                F('map_layer'),
+                F('key'),
+                OpClass(Upper('value'), name='text_pattern_ops'),
+                name='core_vpv_prefix_idx',
+            ),
+            # Case insensitive substring matches
+            GinIndex(OpClass(Upper('value'), name='gin_trgm_ops'), name='core_vpv_trgm_idx'),
+        ]
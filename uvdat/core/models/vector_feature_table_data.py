@@ -1,7 +1,49 @@
+from datetime import datetime, timezone
+import re
+
 from django.db import models
 
 from uvdat.core.models import VectorFeature, VectorMapLayer
 
+# Preferred names for the column indexing rows, e.g. the time axis of a series
+X_COLUMN_CANDIDATES = ['index', 'time', 'date', 'year']
+# Python 3.10 only parses fractional seconds of 3 or 6 digits
+FRACTIONAL_SECONDS = re.compile(r'\.(\d+)')
+
+
+def default_x_column(columns) -> str:
+    """Pick the column that indexes the rows of a table."""
+    if not columns:
+        return ''
+    for candidate in X_COLUMN_CANDIDATES:
+        if candidate in columns:
+            return candidate
+    return columns[0]
+
+
+def to_step_value(value) -> float | None:
+    """Convert an x column value to a sortable number, ISO dates become epoch seconds.
+
+    Dates with a UTC offset are converted to UTC, and dates without one are taken as UTC.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    text = str(value).strip()
+    if text[-1:] in ('Z', 'z'):
+        text = f'{text[:-1]}+00:00'
+    text = FRACTIONAL_SECONDS.sub(lambda match: '.' + match[1][:6].ljust(6, '0'), text)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
 
 class VectorFeatureTableData(models.Model):
     vector_feature = models.ForeignKey(VectorFeature, on_delete=models.CASCADE)
@@ -11,8 +53,19 @@ class VectorFeatureTableData(models.Model):
     description = models.TextField(blank=True, null=True)
     columns = models.JSONField(blank=True, null=True)
     summary = models.JSONField(blank=True, null=True)
+    x_column = models.CharField(
+        max_length=255, blank=True, default='', help_text='Column indexing the rows of the table'
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=['map_layer', 'type'])]
 
 
 class VectorFeatureRowData(models.Model):
     vector_feature_table = models.ForeignKey(VectorFeatureTableData, on_delete=models.CASCADE)
     row_data = models.JSONField(blank=True, null=True)
+    # The row's x column value as a number so a single step can be looked up by index
+    x_value = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['vector_feature_table', 'x_value'])]
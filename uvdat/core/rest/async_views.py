@@ -0,0 +1,341 @@
+# Async read endpoints for tiles and layer metadata. They run natively on the ASGI entry
+# point and query PostGIS through an asyncpg pool, so no worker thread is held while waiting
+# on the database. Responses mirror the matching DRF endpoints.
+import asyncio
+import json
+import re
+import time
+
+from asgiref.sync import sync_to_async
+import asyncpg
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from uvdat.core.models import RasterMapLayer, VectorMapLayer
+from uvdat.core.rest.caching import (
+    MVT_CONTENT_TYPE,
+    compressed_response,
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_cache_headers,
+)
+from uvdat.core.rest.map_layers import parse_sampling, parse_tile_filters
+from uvdat.core.rest.netcdf import IMAGE_LISTING_CACHE_WINDOW, get_sliding_data
+from uvdat.core.rest.permissions import DefaultPermission
+from uvdat.core.tasks.property_summary import (
+    SUMMARY_VALUE_LIMIT,
+    format_property_summary,
+    get_property_summary,
+    is_current_summary,
+)
+from uvdat.core.tasks.vector_tiles import (
+    VECTOR_TILE_SQL,
+    compile_feature_filters,
+    read_archived_tile,
+    vector_tile_sql,
+)
+
+NAMED_PARAMETER = re.compile(r'%\((\w+)\)s')
+
+# One pool per event loop, asyncpg connections cannot be shared across loops
+_pools: dict[asyncio.AbstractEventLoop, asyncio.Future] = {}
+
+
+async def _init_connection(connection: asyncpg.Connection):
+    for json_type in ['json', 'jsonb']:
+        await connection.set_type_codec(
+            json_type, encoder=json.dumps, decoder=json.loads, schema='pg_catalog'
+        )
+
+
+async def get_pool() -> asyncpg.Pool:
+    loop = asyncio.get_running_loop()
+    if loop not in _pools:
+        database = settings.DATABASES['default']
+        _pools[loop] = asyncio.ensure_future(
+            asyncpg.create_pool(
+                host=database['HOST'],
+                port=database['PORT'],
+                user=database['USER'],
+                password=database['PASSWORD'],
+                database=database['NAME'],
+                min_size=settings.UVDAT_ASYNC_DB_POOL_MIN_SIZE,
+                max_size=settings.UVDAT_ASYNC_DB_POOL_MAX_SIZE,
+                init=_init_connection,
+            )
+        )
+    return await _pools[loop]
+
+
+def to_positional(sql: str, params: dict) -> tuple[str, list]:
+    """Rewrite %(name)s placeholders used with Django cursors to asyncpg's $n form."""
+    names = []
+
+    def replace(match):
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f'${names.index(name) + 1}'
+
+    return NAMED_PARAMETER.sub(replace, sql), [params[name] for name in names]
+
+
+def is_authorized(request) -> bool:
+    """Check a request with the authentication classes and permission of the DRF endpoints."""
+    drf_request = Request(
+        request,
+        authenticators=[
+            authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    )
+    try:
+        return DefaultPermission().has_permission(drf_request, None)
+    except APIException:
+        return False
+
+
+def async_read_endpoint(view):
+    async def wrapped(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse({'detail': 'Method not allowed.'}, status=405)
+        # Every request is checked, so session logouts and revoked tokens apply at once
+        if not await sync_to_async(is_authorized)(request):
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'}, status=401
+            )
+        return await view(request, *args, **kwargs)
+
+    return wrapped
+
+
+def bbox_response(row) -> dict:
+    return {'xmin': row['xmin'], 'ymin': row['ymin'], 'xmax': row['xmax'], 'ymax': row['ymax']}
+
+
+@async_read_endpoint
+async def vector_tile(request, pk: int, z: int, x: int, y: int):
+    try:
+        filters, filters_key = parse_tile_filters(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    pool = await get_pool()
+    map_layer = await pool.fetchrow(
+        """
+        SELECT modified, data_version, tile_archive, tile_archive_metadata
+        FROM core_vectormaplayer WHERE id = $1
+        """,
+        pk,
+    )
+    if not map_layer:
+        return HttpResponse(status=204, content_type=MVT_CONTENT_TYPE)
+
+    etag = make_etag(
+        'tile', pk, map_layer['modified'], map_layer['data_version'], z, x, y, filters_key
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if map_layer['tile_archive'] and not filters:
+        # Archive reads are local file access, keep them off the event loop
+        layer = VectorMapLayer(
+            pk=pk,
+            data_version=map_layer['data_version'],
+            tile_archive=map_layer['tile_archive'],
+            tile_archive_metadata=map_layer['tile_archive_metadata'],
+        )
+        covered, archived_tile = await sync_to_async(read_archived_tile, thread_sensitive=False)(
+            layer, z, x, y
+        )
+        if covered:
+            if not archived_tile:
+                response = HttpResponse(status=204, content_type=MVT_CONTENT_TYPE)
+            else:
+                response = compressed_response(
+                    request, archived_tile, MVT_CONTENT_TYPE, gzipped=True
+                )
+            return set_cache_headers(response, etag)
+
+    filter_sql, filter_params = compile_feature_filters(filters)
+    sql, args = to_positional(
+        vector_tile_sql(filter_sql) if filter_sql else VECTOR_TILE_SQL,
+        {'z': z, 'x': x, 'y': y, 'map_layer_id': pk, **filter_params},
+    )
+    tile = await pool.fetchval(sql, *args)
+    tile = bytes(tile) if tile else b''
+    response = compressed_response(request, tile, MVT_CONTENT_TYPE, status=200 if tile else 204)
+    return set_cache_headers(response, etag)
+
+
+@async_read_endpoint
+async def vector_bbox(request, pk: int):
+    pool = await get_pool()
+    map_layer = await pool.fetchrow(
+        """
+        SELECT
+            modified,
+            ST_XMin(bounds) as xmin,
+            ST_YMin(bounds) as ymin,
+            ST_XMax(bounds) as xmax,
+            ST_YMax(bounds) as ymax
+        FROM core_vectormaplayer WHERE id = $1
+        """,
+        pk,
+    )
+    if not map_layer:
+        return JsonResponse({'error': 'Map layer not found.'}, status=404)
+
+    etag = make_etag('vector-bbox', pk, map_layer['modified'])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if map_layer['xmin'] is not None:
+        return set_cache_headers(JsonResponse(bbox_response(map_layer)), etag)
+
+    extent = await pool.fetchrow(
+        """
+        WITH extent AS (
+            SELECT ST_Extent(geometry) as box FROM core_vectorfeature WHERE map_layer_id = $1
+        )
+        SELECT
+            ST_XMin(box) as xmin,
+            ST_YMin(box) as ymin,
+            ST_XMax(box) as xmax,
+            ST_YMax(box) as ymax
+        FROM extent
+        """,
+        pk,
+    )
+    if extent['xmin'] is None:
+        return JsonResponse(
+            {'error': 'No bounding box found for this vector map layer.'}, status=404
+        )
+    return set_cache_headers(JsonResponse(bbox_response(extent)), etag)
+
+
+@async_read_endpoint
+async def raster_bbox(request, pk: int):
+    pool = await get_pool()
+    map_layer = await pool.fetchrow(
+        """
+        SELECT
+            modified,
+            ST_XMin(bounds) as xmin,
+            ST_YMin(bounds) as ymin,
+            ST_XMax(bounds) as xmax,
+            ST_YMax(bounds) as ymax
+        FROM core_rastermaplayer WHERE id = $1
+        """,
+        pk,
+    )
+    if not map_layer:
+        return JsonResponse({'error': 'Map layer not found.'}, status=404)
+
+    etag = make_etag('raster-bbox', pk, map_layer['modified'])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if map_layer['xmin'] is not None:
+        return set_cache_headers(JsonResponse(bbox_response(map_layer)), etag)
+
+    # Layers ingested before bounds were stored need to read the raster itself
+    raster_map_layer = await RasterMapLayer.objects.aget(pk=pk)
+    data = await sync_to_async(raster_map_layer.get_bbox, thread_sensitive=False)()
+    return set_cache_headers(JsonResponse(data, safe=False), etag)
+
+
+@async_read_endpoint
+async def property_summary(request, pk: int):
+    limit = int(request.GET.get('limit', 100))
+    try:
+        sampling = parse_sampling(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    pool = await get_pool()
+    stored = await pool.fetchrow(
+        'SELECT property_summary, data_version FROM core_vectormaplayer WHERE id = $1', pk
+    )
+    if (
+        stored
+        and is_current_summary(stored['property_summary'], stored['data_version'])
+        and limit <= SUMMARY_VALUE_LIMIT
+    ):
+        return JsonResponse(format_property_summary(stored['property_summary'], limit), safe=False)
+
+    # The summary is not stored for the current features yet, they or a sample of them are
+    # aggregated
+    map_layer = await VectorMapLayer.objects.filter(pk=pk).afirst()
+    if not map_layer:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    final_output = await sync_to_async(get_property_summary, thread_sensitive=False)(
+        map_layer, limit, **sampling
+    )
+    return JsonResponse(final_output, safe=False)
+
+
+@async_read_endpoint
+async def netcdf_images(request, netcdf_layer_id: int):
+    details = request.GET.get('details', 'false').lower() == 'true'
+    pool = await get_pool()
+    netcdf_layer = await pool.fetchrow(
+        """
+        SELECT
+            modified,
+            parameters,
+            ST_AsGeoJSON(ST_Envelope(bounds))::json as envelope
+        FROM core_netcdflayer WHERE id = $1
+        """,
+        netcdf_layer_id,
+    )
+    if not netcdf_layer:
+        return JsonResponse(
+            {'error': f'NetCDFLayer with ID {netcdf_layer_id} not found.'}, status=404
+        )
+
+    images = await pool.fetch(
+        """
+        SELECT image, modified, ST_AsGeoJSON(ST_Envelope(bounds))::json as envelope
+        FROM core_netcdfimage
+        WHERE netcdf_layer_id = $1
+        ORDER BY slider_index
+        """,
+        netcdf_layer_id,
+    )
+    etag = make_etag(
+        'netcdf-images',
+        netcdf_layer_id,
+        netcdf_layer['modified'],
+        {
+            'modified__max': max((image['modified'] for image in images), default=None),
+            'id__count': len(images),
+        },
+        details,
+        int(time.time() // IMAGE_LISTING_CACHE_WINDOW),
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag, max_age=IMAGE_LISTING_CACHE_WINDOW // 2)
+
+    envelope = netcdf_layer['envelope']
+    response_data = {
+        'netCDFLayer': netcdf_layer_id,
+        'parent_bounds': envelope['coordinates'] if envelope else None,
+        'sliding': get_sliding_data(netcdf_layer['parameters']),
+        # Presigning URLs is computed locally and does not call S3
+        'images': [default_storage.url(image['image']) for image in images],
+    }
+    if details:
+        response_data['images'] = [
+            {
+                'url': url,
+                'bounds': image['envelope']['coordinates'] if image['envelope'] else None,
+            }
+            for url, image in zip(response_data['images'], images)
+        ]
+    return set_cache_headers(
+        JsonResponse(response_data), etag, max_age=IMAGE_LISTING_CACHE_WINDOW // 2
+    )
@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+
+import brotli
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+# Compressing tiny responses costs more than it saves
+MIN_COMPRESS_SIZE = 512
+
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from the parts identifying a version of a resource."""
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Weakly compare an ETag against the request's If-None-Match header."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    requested = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return etag.removeprefix('W/') in requested
+
+
+def set_cache_headers(response, etag: str, max_age: int | None = None):
+    if max_age is None:
+        max_age = settings.UVDAT_CACHE_MAX_AGE
+    response['ETag'] = etag
+    if settings.UVDAT_PUBLIC_CACHE:
+        patch_cache_control(response, public=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, max_age=max_age)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def not_modified(etag: str, max_age: int | None = None):
+    return set_cache_headers(HttpResponseNotModified(), etag, max_age)
+
+
+def accepted_encodings(request) -> set[str]:
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    encodings = set()
+    for item in accept_encoding.split(','):
+        encoding, _, params = item.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            encodings.add(encoding.strip().lower())
+    return encodings
+
+
+def compressed_response(
+    request, content: bytes, content_type: str, status: int = 200, gzipped: bool = False
+):
+    """Build a response compressed with the best encoding the client accepts.
+
+    Set `gzipped` when the content is already gzip compressed, e.g. tiles from an archive.
+    """
+    encodings = accepted_encodings(request)
+    encoding = None
+    if gzipped:
+        if 'gzip' in encodings:
+            encoding = 'gzip'
+        else:
+            content = gzip.decompress(content)
+    elif len(content) >= MIN_COMPRESS_SIZE:
+        if 'br' in encodings:
+            content = brotli.compress(content, quality=5)
+            encoding = 'br'
+        elif 'gzip' in encodings:
+            content = gzip.compress(content, compresslevel=6)
+            encoding = 'gzip'
+
+    response = HttpResponse(content, content_type=content_type, status=status)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
@@ -10,7 +10,7 @@ from uvdat.core.tasks.dataset import process_file_item
 
 from .permissions import DefaultPermission
 
-VALID_FILE_TYPES = {'geojson', 'json', 'tiff', 'tif', 'zip', 'gpkg', 'nc'}
+VALID_FILE_TYPES = {'geojson', 'json', 'geojsonl', 'geojsons', 'tiff', 'tif', 'zip', 'gpkg', 'nc'}
 
 
 class FileItemViewSet(ModelViewSet):
@@ -42,7 +42,7 @@ class FileItemViewSet(ModelViewSet):
         extension = extension.lower().strip('.')
 
         if extension in VALID_FILE_TYPES:
-            if extension == 'json':
+            if extension in ('json', 'geojsonl', 'geojsons'):
                 file_type = 'geojson'
             elif extension == 'nc':
                 file_type = 'netcdf'
@@ -1,16 +1,21 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 import json
 import logging
+import re
+import time
 
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.gis.db.models import Extent
 from django.contrib.gis.geos import GEOSGeometry
-from django.db import connection
-from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, FloatField, Func, Max, Q
+from django.db.models.fields.json import KeyTextTransform, KeyTransform
+from django.db.models.functions import Upper
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django_large_image.rest import LargeImageFileDetailMixin
-import numpy as np
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
@@ -18,9 +23,19 @@ from uvdat.core.models import (
     LayerRepresentation,
     NetCDFData,
     NetCDFLayer,
+    ProcessingTask,
     RasterMapLayer,
     VectorFeature,
     VectorMapLayer,
+    VectorPropertyValue,
+)
+from uvdat.core.rest.caching import (
+    MVT_CONTENT_TYPE,
+    compressed_response,
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_cache_headers,
 )
 from uvdat.core.rest.serializers import (
     AbstractMapLayerSerializer,
@@ -29,59 +44,100 @@ from uvdat.core.rest.serializers import (
     VectorMapLayerDetailSerializer,
     VectorMapLayerSerializer,
 )
+from uvdat.core.tasks.classification import (
+    CLASSIFICATION_METHODS,
+    MAX_CLASSES,
+    get_classification,
+)
+from uvdat.core.tasks.property_statistics import (
+    APPROXIMATE_SAMPLE_SIZE,
+    MAX_APPROXIMATE_SAMPLE_SIZE,
+    compute_exact_property_statistics,
+    compute_property_statistics,
+)
+from uvdat.core.tasks.property_summary import get_property_summary
+from uvdat.core.tasks.search_indexes import sync_vector_search_indexes
+from uvdat.core.tasks.vector_tiles import (
+    MAX_COMPOSITE_LAYERS,
+    MAX_SEED_ZOOM,
+    TILE_ARCHIVE_FORMATS,
+    compile_feature_filters,
+    get_composite_vector_tile,
+    get_vector_tile,
+    parse_bool_filter,
+    read_archived_tile,
+    seed_vector_tiles,
+)
 
 from .permissions import DefaultPermission
 
 logger = logging.getLogger(__name__)
 
-VECTOR_TILE_SQL = """
- WITH tile_bounds AS (
-    SELECT ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4326) AS te
-),
-tilenvbounds as (
-    SELECT
-        ST_XMin(te) as xmin,
-        ST_YMin(te) as ymin,
-        ST_XMax(te) as xmax,
-        ST_YMax(te) as ymax,
-        (ST_XMax(te) - ST_XMin(te)) / 4 as segsize
-    FROM tile_bounds
-),
-env as (
-    SELECT ST_Segmentize(
-        ST_MakeEnvelope(
-            xmin,
-            ymin,
-            xmax,
-            ymax,
-            4326
-        ),
-        segsize
-    ) as seg
-    FROM tilenvbounds
-),
-bounds as (
-    SELECT
-        seg as geom,
-        seg::box2d as b2d
-    FROM env
-),
-vector_features AS (
-    SELECT
-        ST_AsMVTGeom(
-            ST_Transform(geometry, 3857),
-            ST_Transform((SELECT geom from bounds), 3857)
-        ) as geom,
-        map_layer_id,
-        Id as vectorfeatureid,
-        properties
-    FROM core_vectorfeature
-    WHERE ST_Intersects(geometry, (SELECT geom from bounds))
-    AND core_vectorfeature.map_layer_id = %(map_layer_id)s
-)
-SELECT ST_AsMVT(vector_features.*) AS mvt FROM vector_features
-;
-"""
+MAX_SEARCH_PAGE_SIZE = 1000
+MAX_PROPERTY_VALUES = 100
+SEARCH_WORD_PATTERN = re.compile(r'\w+')
+
+
+def parse_tile_filters(query_params):
+    """Read the JSON feature filters of a tile request, raising ValueError if invalid.
+
+    Returns the filters and their canonical form, which identifies the filtered tile.
+    """
+    filters = query_params.get('filters')
+    if not filters:
+        return None, ''
+    filters = json.loads(filters)
+    # Validates the filters before a query is made
+    compile_feature_filters(filters)
+    return filters, json.dumps(filters, sort_keys=True)
+
+
+def encode_search_cursor(sort_value, feature_id: int, missing: bool = False) -> str:
+    """Encode the position after a feature in the search ordering."""
+    return urlsafe_b64encode(json.dumps([sort_value, feature_id, missing]).encode()).decode()
+
+
+def decode_search_cursor(cursor: str):
+    try:
+        sort_value, feature_id, missing = json.loads(urlsafe_b64decode(cursor.encode()))
+        return sort_value, int(feature_id), bool(missing)
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError('Invalid cursor')
+
+
+def stream_search_results(results, map_layer_id, start):
+    """Yield search results as a JSON array, without holding all of them in memory."""
+    count = 0
+    yield '['
+    for result in results:
+        yield (',' if count else '') + json.dumps(result)
+        count += 1
+    yield ']'
+    logger.info(
+        f'Vector feature search of VectorMapLayer {map_layer_id} streamed '
+        f'{count} features in {(time.perf_counter() - start) * 1000:.1f}ms'
+    )
+
+
+def stream_geojson(batches):
+    """Yield a GeoJSON FeatureCollection of GeoDataFrame batches, a batch at a time."""
+    separator = ''
+    yield '{"type": "FeatureCollection", "features": ['
+    for batch in batches:
+        if len(batch):
+            features = json.dumps(list(batch.iterfeatures(na='drop', drop_id=True)), default=str)
+            yield separator + features[1:-1]
+            separator = ','
+    yield ']}'
+
+
+def parse_sampling(query_params):
+    """Read the approximate mode options, raising ValueError for invalid ones."""
+    approximate = query_params.get('approximate', '').lower() in ('true', '1')
+    sample_size = int(query_params.get('sampleSize', APPROXIMATE_SAMPLE_SIZE))
+    if not 0 < sample_size <= MAX_APPROXIMATE_SAMPLE_SIZE:
+        raise ValueError(f'sampleSize must be between 1 and {MAX_APPROXIMATE_SAMPLE_SIZE}')
+    return {'approximate': approximate, 'sample_size': sample_size}
 
 
 class RasterMapLayerViewSet(ModelViewSet, LargeImageFileDetailMixin):
@@ -98,8 +154,13 @@ class RasterMapLayerViewSet(ModelViewSet, LargeImageFileDetailMixin):
     )
     def get_raster_data(self, request, resolution: str = '1', **kwargs):
         raster_map_layer = self.get_object()
+        etag = make_etag('raster-data', raster_map_layer.pk, raster_map_layer.modified, resolution)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         data = raster_map_layer.get_image_data(float(resolution))
-        return HttpResponse(json.dumps(data), status=200)
+        response = compressed_response(request, json.dumps(data).encode(), 'application/json')
+        return set_cache_headers(response, etag)
 
     @action(
         detail=True,
@@ -109,14 +170,17 @@ class RasterMapLayerViewSet(ModelViewSet, LargeImageFileDetailMixin):
     )
     def get_raster_bbox(self, request, **kwargs):
         raster_map_layer = self.get_object()
+        etag = make_etag('raster-bbox', raster_map_layer.pk, raster_map_layer.modified)
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
         if raster_map_layer.bounds:
             bounds = raster_map_layer.bounds.extent
             bbox_dict = {'xmin': bounds[0], 'ymin': bounds[1], 'xmax': bounds[2], 'ymax': bounds[3]}
-            return JsonResponse(bbox_dict)
+            return set_cache_headers(JsonResponse(bbox_dict), etag)
 
         data = raster_map_layer.get_bbox()
-        return JsonResponse(data, status=200, safe=False)
+        return set_cache_headers(JsonResponse(data, status=200, safe=False), etag)
 
     @action(
         detail=True,
@@ -163,6 +227,22 @@ class VectorMapLayerViewSet(ModelViewSet):
         serializer = VectorMapLayerDetailSerializer(instance)
         return Response(serializer.data)
 
+    def perform_update(self, serializer):
+        previous_config = (serializer.instance.default_style or {}).get(
+            'searchableVectorFeatureData'
+        )
+        map_layer = serializer.save()
+        search_config = (map_layer.default_style or {}).get('searchableVectorFeatureData')
+        if search_config != previous_config:
+            # Index the properties the search configuration filters and sorts on
+            task = sync_vector_search_indexes.delay(map_layer.pk)
+            ProcessingTask.objects.create(
+                name=f'Indexing search properties for {map_layer.name}',
+                status=ProcessingTask.Status.QUEUED,
+                metadata={'type': 'vector search indexing', 'vector_map_layer': map_layer.pk},
+                celery_id=task.id,
+            )
+
     @action(
         detail=True,
         methods=['get'],
@@ -170,26 +250,151 @@ class VectorMapLayerViewSet(ModelViewSet):
         url_name='tiles',
     )
     def get_vector_tile(self, request, x: str, y: str, z: str, pk: str):
-        with connection.cursor() as cursor:
-            cursor.execute(
-                VECTOR_TILE_SQL,
-                {
-                    'z': z,
-                    'x': x,
-                    'y': y,
-                    'map_layer_id': pk,
-                },
+        try:
+            filters, filters_key = parse_tile_filters(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        map_layer = VectorMapLayer.objects.filter(pk=pk).first()
+        if not map_layer:
+            return HttpResponse(status=204, content_type=MVT_CONTENT_TYPE)
+
+        # The layer version identifies the tile, so revalidation skips the tile query
+        etag = make_etag(
+            'tile', map_layer.pk, map_layer.modified, map_layer.data_version, z, x, y, filters_key
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        # Archives hold unfiltered tiles
+        if map_layer.tile_archive and not filters:
+            # Serve pre-rendered tiles when the archive covers this tile
+            covered, archived_tile = read_archived_tile(map_layer, int(z), int(x), int(y))
+            if covered:
+                if not archived_tile:
+                    response = HttpResponse(status=204, content_type=MVT_CONTENT_TYPE)
+                else:
+                    response = compressed_response(
+                        request, archived_tile, MVT_CONTENT_TYPE, gzipped=True
+                    )
+                return set_cache_headers(response, etag)
+
+        tile = get_vector_tile(pk, z, x, y, filters)
+        response = compressed_response(request, tile, MVT_CONTENT_TYPE, status=200 if tile else 204)
+        return set_cache_headers(response, etag)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'composite-tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)',
+        url_name='composite_tiles',
+    )
+    def get_composite_vector_tile(self, request, x: str, y: str, z: str):
+        # Accept either repeated layerIds params or a single comma-separated list
+        layer_ids = []
+        for value in request.query_params.getlist('layerIds'):
+            layer_ids.extend(item for item in value.split(',') if item)
+        try:
+            layer_ids = [int(layer_id) for layer_id in layer_ids]
+        except ValueError:
+            return Response(
+                {'error': 'layerIds must be integers'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if not layer_ids or len(layer_ids) > MAX_COMPOSITE_LAYERS:
+            return Response(
+                {'error': f'Between 1 and {MAX_COMPOSITE_LAYERS} layerIds are required'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Optional per-layer property lists, e.g. properties_12=name,height
+        layers = []
+        for layer_id in layer_ids:
+            property_keys = request.query_params.get(f'properties_{layer_id}')
+            if property_keys is not None:
+                property_keys = [key for key in property_keys.split(',') if key]
+            layers.append((layer_id, property_keys))
+
+        versions = {
+            pk: (modified, data_version)
+            for pk, modified, data_version in VectorMapLayer.objects.filter(
+                pk__in=layer_ids
+            ).values_list('pk', 'modified', 'data_version')
+        }
+        missing_ids = [layer_id for layer_id in layer_ids if layer_id not in versions]
+        if missing_ids:
+            return Response(
+                {'error': f'Vector map layers not found: {missing_ids}'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        etag = make_etag(
+            'composite-tile', z, x, y, *[(pk, versions[pk], keys) for pk, keys in layers]
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        tile = get_composite_vector_tile(layers, z, x, y)
+        response = compressed_response(request, tile, MVT_CONTENT_TYPE, status=200 if tile else 204)
+        return set_cache_headers(response, etag)
+
+    @action(
+        detail=True,
+        methods=['post'],
+        url_path='seed-tiles',
+        url_name='seed_tiles',
+    )
+    def seed_tiles(self, request, pk=None):
+        map_layer = self.get_object()
+        try:
+            min_zoom = int(request.data.get('minZoom', 0))
+            max_zoom = int(request.data.get('maxZoom', 12))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'minZoom and maxZoom must be integers'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        archive_format = request.data.get('format', 'mbtiles')
+        bbox = request.data.get('bbox', None)
+        if archive_format not in TILE_ARCHIVE_FORMATS:
+            return Response(
+                {'error': f'format must be one of {TILE_ARCHIVE_FORMATS}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 0 <= min_zoom <= max_zoom <= MAX_SEED_ZOOM:
+            return Response(
+                {'error': f'Zooms must satisfy 0 <= minZoom <= maxZoom <= {MAX_SEED_ZOOM}'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            row = cursor.fetchone()
+        if bbox:
+            try:
+                if isinstance(bbox, str):
+                    bbox = bbox.split(',')
+                bbox = [float(val) for val in bbox]
+                if len(bbox) != 4:
+                    raise ValueError
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid bbox parameter. Must be in format xmin,ymin,xmax,ymax'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-        tile = row[0]
-        return HttpResponse(
-            tile,
-            content_type='application/octet-stream',
-            status=200 if tile else 204,
+        task = seed_vector_tiles.delay(
+            map_layer.pk,
+            min_zoom=min_zoom,
+            max_zoom=max_zoom,
+            bbox=bbox,
+            archive_format=archive_format,
+        )
+        ProcessingTask.objects.create(
+            name=f'Pre-rendering tiles for {map_layer.name}',
+            status=ProcessingTask.Status.QUEUED,
+            metadata={'type': 'vector tile seeding', 'vector_map_layer': map_layer.pk},
+            celery_id=task.id,
+        )
+        return Response(
+            {'message': 'Task created successfully.', 'taskId': task.id},
+            status=status.HTTP_201_CREATED,
         )
 
-    # TODO: For large map layers this could take long and may be better in a task
     @action(
         detail=True,
         methods=['get'],
@@ -198,85 +403,119 @@ class VectorMapLayerViewSet(ModelViewSet):
     )
     def property_summary(self, request, pk=None):
         limit = int(request.query_params.get('limit', 100))  # Default limit of 100
+        try:
+            sampling = parse_sampling(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        map_layer = self.get_object()
+        # Aggregated in the database and stored on the layer, usually a single row read
+        final_output = get_property_summary(map_layer, limit, **sampling)
+        return JsonResponse(final_output, safe=False)
 
-        # Get all VectorFeature properties for the specific map layer
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT properties
-                FROM core_vectorfeature
-                WHERE map_layer_id = %s;
-            """,
-                [pk],
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='classification',
+        url_name='classification',
+    )
+    def classification(self, request, pk=None):
+        # Class breaks of a numeric property for data driven styling
+        key = request.query_params.get('key')
+        method = request.query_params.get('method', 'quantile')
+        if not key:
+            return Response(
+                {'error': 'key parameter is required'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if method not in CLASSIFICATION_METHODS:
+            return Response(
+                {'error': f'method must be one of {CLASSIFICATION_METHODS}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            classes = int(request.query_params.get('classes', 5))
+        except ValueError:
+            classes = 0
+        if not 0 < classes <= MAX_CLASSES:
+            return Response(
+                {'error': f'classes must be between 1 and {MAX_CLASSES}'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            features = cursor.fetchall()
 
-        # Analyze properties
-        property_summary = {}
-        for feature in features:
-            properties = feature[0]
+        map_layer = self.get_object()
+        etag = make_etag(
+            'classification',
+            map_layer.pk,
+            map_layer.modified,
+            map_layer.data_version,
+            key,
+            method,
+            classes,
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
-            # Check if properties is a string, and parse it if necessary
-            if isinstance(properties, str):
-                try:
-                    properties = json.loads(properties)
-                except json.JSONDecodeError:
-                    continue  # Skip if it cannot be parsed as JSON
-
-            for key, value in properties.items():
-                if key not in property_summary:
-                    property_summary[key] = {'type': None, 'values': set(), 'value_count': 0}
-
-                if isinstance(value, bool):
-                    property_summary[key]['type'] = 'bool'
-                    property_summary[key]['value_count'] += 1
-                elif isinstance(value, (int, float)):
-                    property_summary[key]['type'] = 'number'
-                    property_summary[key]['value_count'] += 1
-                    if 'min' not in property_summary[key] or value < property_summary[key]['min']:
-                        property_summary[key]['min'] = value
-                    if 'max' not in property_summary[key] or value > property_summary[key]['max']:
-                        property_summary[key]['max'] = value
-                elif isinstance(value, str):
-                    if 'values' not in property_summary[key]:
-                        property_summary[key]['values'] = set()
-                    property_summary[key]['value_count'] += 1
-                    property_summary[key]['type'] = 'string'
-                    property_summary[key]['values'].add(value)
-
-        # Finalize property summary
-        final_output = {}
-        for key, summary in property_summary.items():
-            if summary['type'] is None:
-                continue
-            if summary['type'] == 'number':
-                if summary['value_count'] == 1:
-                    summary['values'] = summary.get('min', summary.get('max'))
-                    del summary['min']
-                    del summary['max']
-                elif summary['min'] == summary['max']:
-                    val = summary['min']
-                    del summary['values']
-                    del summary['min']
-                    del summary['max']
-                    summary['static'] = True
-                    summary['value'] = val
-                else:
-                    del summary['values']
-            elif (
-                summary['type'] == 'string'
-                and 'values' in summary
-                and not summary.get('searchable')
-            ):
-                summary['values'] = sorted(summary['values'])
-                if len(summary['values']) >= limit:
-                    summary['searchable'] = True
-                    summary['unique'] = len(summary['values'])
-                    del summary['values']
-            elif summary['type'] == 'bool':
-                del summary['values']
-            final_output[key] = summary
-        return JsonResponse(final_output, safe=False)
+        result = get_classification(map_layer, key, method, classes)
+        if result is None:
+            return JsonResponse(
+                {'error': f'No numeric values found for the property {key}'}, status=404
+            )
+        return set_cache_headers(JsonResponse(result), etag)
+
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='property-values',
+        url_name='property_values',
+    )
+    def property_values(self, request, pk=None):
+        # Autocomplete of a property's string values, most common first
+        key = request.query_params.get('key')
+        search = request.query_params.get('search', '')
+        match = request.query_params.get('match', 'prefix')
+        if not key:
+            return Response(
+                {'error': 'key parameter is required'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if match not in ('prefix', 'contains'):
+            return Response(
+                {'error': 'match must be prefix or contains'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= MAX_PROPERTY_VALUES:
+            return Response(
+                {'error': f'limit must be between 1 and {MAX_PROPERTY_VALUES}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        map_layer = self.get_object()
+        queryset = VectorPropertyValue.objects.filter(map_layer=map_layer, key=key)
+        if search:
+            queryset = queryset.alias(upper_value=Upper('value'))
+            if match == 'prefix':
+                queryset = queryset.filter(upper_value__startswith=search.upper())
+            else:
+                queryset = queryset.filter(upper_value__contains=search.upper())
+        values = queryset.order_by('-count', 'value').values('value', 'count')[:limit]
+        return Response(list(values), status=status.HTTP_200_OK)
+
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='geojson',
+        url_name='geojson',
+    )
+    def export_geojson(self, request, pk=None):
+        # Layers are stored as GeoParquet, GeoJSON is only produced for export
+        map_layer = self.get_object()
+        filename = re.sub(r'[^\w.-]+', '_', map_layer.name or f'layer_{map_layer.pk}')
+        response = StreamingHttpResponse(
+            stream_geojson(map_layer.iter_geodata()), content_type='application/geo+json'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.geojson"'
+        return response
 
     @action(
         detail=True,
@@ -289,10 +528,14 @@ class VectorMapLayerViewSet(ModelViewSet):
         if not map_layer:
             return JsonResponse({'error': 'Map layer not found.'}, status=404)
 
+        etag = make_etag('vector-bbox', map_layer.pk, map_layer.modified)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         if map_layer.bounds:
             bounds = map_layer.bounds.extent
             bbox_dict = {'xmin': bounds[0], 'ymin': bounds[1], 'xmax': bounds[2], 'ymax': bounds[3]}
-            return JsonResponse(bbox_dict)
+            return set_cache_headers(JsonResponse(bbox_dict), etag)
         try:
             bbox = VectorFeature.objects.filter(map_layer_id=pk).aggregate(Extent('geometry'))[
                 'geometry__extent'
@@ -304,7 +547,7 @@ class VectorMapLayerViewSet(ModelViewSet):
                 )
 
             bbox_dict = {'xmin': bbox[0], 'ymin': bbox[1], 'xmax': bbox[2], 'ymax': bbox[3]}
-            return JsonResponse(bbox_dict)
+            return set_cache_headers(JsonResponse(bbox_dict), etag)
 
         except Exception as e:
             logger.error(f'Error fetching bounding box for VectorMapLayer {pk}: {e}')
@@ -319,57 +562,14 @@ class VectorMapLayerViewSet(ModelViewSet):
         url_name='property_statistics',
     )
     def property_statistics(self, request, pk=None):
-        # Get the 'property_keys' from query parameters (comma-separated)
-        property_keys = request.query_params.get('property_keys')
-        if not property_keys:
-            return Response(
-                {'error': 'property_keys parameter is required'}, status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Split property keys into a list
-        property_keys = property_keys.split(',')
-
-        # Get the 'bins' parameter for histogram calculation, default to 10 bins
-        bins = int(request.query_params.get('bins', 10))
-
-        # Check for optional bounding box (xmin, ymin, xmax, ymax)
-        bbox = request.query_params.get('bbox')
-        if bbox:
-            try:
-                xmin, ymin, xmax, ymax = map(float, bbox.split(','))
-                bbox_condition = True
-            except ValueError:
-                return Response(
-                    {'error': 'Invalid bbox parameter. Must be in format xmin,ymin,xmax,ymax'},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-        else:
-            bbox_condition = False
-
-        # Query the database for property values
-        property_statements = ', '.join([f'properties ->> %s as "{key}"' for key in property_keys])
-        sql_query = f"""
-            SELECT {property_statements}, ST_AsText(geometry)
-            FROM core_vectorfeature
-            WHERE map_layer_id = %s
-        """
-
-        query_params = property_keys + [pk]
-
-        if bbox_condition:
-            sql_query += """
-                AND ST_Intersects(
-                    geometry,
-                    ST_MakeEnvelope(%s, %s, %s, %s, 4326)
-                )
-            """
-            query_params.extend([xmin, ymin, xmax, ymax])
-
-        with connection.cursor() as cursor:
-            cursor.execute(sql_query, query_params)
-            rows = cursor.fetchall()
+        try:
+            property_keys, bins, bbox = self.parse_statistics_parameters(request.query_params)
+            sampling = parse_sampling(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not rows:
+        final_result = compute_property_statistics(pk, property_keys, bins, bbox, **sampling)
+        if final_result is None:
             return JsonResponse(
                 {
                     'error': 'No values found for the specified property keys or within the bounding box'
@@ -377,73 +577,63 @@ class VectorMapLayerViewSet(ModelViewSet):
                 status=404,
             )
 
-        # Initialize result dictionary for each property key
-        result = {key: {'type': None, 'values': [], 'numerical_stats': {}} for key in property_keys}
+        return JsonResponse(final_result, safe=False)
 
-        # Process the results
-        for row in rows:
-            for idx, key in enumerate(property_keys):
-                value = row[idx]
-                # Attempt to treat value as a float to check if it's numerical
-                if value is None:
-                    continue
-                try:
-                    numerical_value = float(value)
-                    result[key]['values'].append(numerical_value)
-                    result[key]['type'] = 'number'
-                except (ValueError, TypeError):
-                    # Handle string values
-                    result[key]['values'].append(value)
-                    if result[key]['type'] is None:
-                        result[key]['type'] = 'string'
-
-        # Generate statistics for each property key
-        final_result = {}
-        for key, data in result.items():
-            if data['type'] == 'number':
-                # Handle numerical data
-                numerical_values = np.array(data['values'])
-
-                min = np.min(numerical_values)
-                max = np.max(numerical_values)
-                mean = np.mean(numerical_values)
-                median = np.median(numerical_values)
-                std_dev = np.std(numerical_values)
-
-                # Create a histogram with the specified number of bins
-                hist, bin_edges = np.histogram(numerical_values, bins=bins)
-
-                final_result[key] = {
-                    'type': 'number',
-                    'mean': mean,
-                    'min': min,
-                    'max': max,
-                    'median': median,
-                    'std_dev': std_dev,
-                    'histogram': {
-                        'bins': bins,
-                        'bin_edges': bin_edges.tolist(),
-                        'counts': hist.tolist(),
-                    },
-                }
-            elif data['type'] == 'string':
-                # Handle string data
-                value_counts = {}
-                for value in data['values']:
-                    if value in value_counts:
-                        value_counts[value] += 1
-                    else:
-                        value_counts[value] = 1
+    @action(
+        detail=True,
+        methods=['post'],
+        url_path='property-statistics/exact',
+        url_name='exact_property_statistics',
+        # Any user who can read the statistics may compute them exactly
+        permission_classes=[IsAuthenticated],
+    )
+    def exact_property_statistics(self, request, pk=None):
+        # Upgrades approximate statistics, the result is stored in the task's output_metadata
+        map_layer = self.get_object()
+        try:
+            property_keys, bins, bbox = self.parse_statistics_parameters(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        task = compute_exact_property_statistics.delay(map_layer.pk, property_keys, bins, bbox)
+        ProcessingTask.objects.create(
+            name=f'Computing property statistics for {map_layer.name}',
+            status=ProcessingTask.Status.QUEUED,
+            metadata={'type': 'property statistics', 'vector_map_layer': map_layer.pk},
+            celery_id=task.id,
+        )
+        return Response(
+            {'message': 'Task created successfully.', 'taskId': task.id},
+            status=status.HTTP_201_CREATED,
+        )
 
-                final_result[key] = {
-                    'type': 'string',
-                    'unique_values': len(value_counts),
-                    'values': [
-                        {'value': key, 'count': count} for key, count in value_counts.items()
-                    ],
-                }
+    @staticmethod
+    def parse_statistics_parameters(params):
+        # Get the 'property_keys' (comma-separated)
+        property_keys = params.get('property_keys')
+        if not property_keys:
+            raise ValueError('property_keys parameter is required')
 
-        return JsonResponse(final_result, safe=False)
+        # Split property keys into a list
+        property_keys = property_keys.split(',')
+
+        # Get the 'bins' parameter for histogram calculation, default to 10 bins
+        bins = int(params.get('bins', 10))
+        if bins < 1:
+            raise ValueError('bins must be a positive integer')
+
+        # Check for optional bounding box (xmin, ymin, xmax, ymax)
+        bbox = params.get('bbox')
+        if bbox:
+            try:
+                if isinstance(bbox, str):
+                    bbox = bbox.split(',')
+                bbox = [float(value) for value in bbox]
+                if len(bbox) != 4:
+                    raise ValueError
+            except ValueError:
+                raise ValueError('Invalid bbox parameter. Must be in format xmin,ymin,xmax,ymax')
+        return property_keys, bins, bbox or None
 
 
 class MapLayerViewSet(GenericViewSet):
@@ -620,6 +810,18 @@ class MapLayerViewSet(GenericViewSet):
         vector_map_layer_ids = request.query_params.getlist('vectorMapLayerIds')
         netcdf_map_layer_ids = request.query_params.getlist('netCDFMapLayerIds')
 
+        # The combined bbox only changes when one of the requested layers changes
+        versions = [
+            RasterMapLayer.objects.filter(id__in=raster_map_layer_ids).aggregate(Max('modified')),
+            VectorMapLayer.objects.filter(id__in=vector_map_layer_ids).aggregate(Max('modified')),
+            NetCDFLayer.objects.filter(id__in=netcdf_map_layer_ids).aggregate(Max('modified')),
+        ]
+        etag = make_etag(
+            'bbox', raster_map_layer_ids, vector_map_layer_ids, netcdf_map_layer_ids, *versions
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         # Initialize variables to track the overall bounding box
         overall_bbox = {
             'xmin': float('inf'),
@@ -634,7 +836,11 @@ class MapLayerViewSet(GenericViewSet):
                 raster_layer = RasterMapLayer.objects.filter(id=raster_layer_id).first()
                 if raster_layer:
                     # Get the bounding box for the current raster layer
-                    raster_bbox = raster_layer.get_bbox()
+                    if raster_layer.bounds:
+                        xmin, ymin, xmax, ymax = raster_layer.bounds.extent
+                        raster_bbox = {'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax}
+                    else:
+                        raster_bbox = raster_layer.get_bbox()
                     if raster_bbox:
                         # Update the overall bounding box
                         overall_bbox['xmin'] = min(overall_bbox['xmin'], raster_bbox['xmin'])
@@ -670,7 +876,7 @@ class MapLayerViewSet(GenericViewSet):
             )
 
         # Return the overall bounding box
-        return JsonResponse(overall_bbox)
+        return set_cache_headers(JsonResponse(overall_bbox), etag)
 
     @action(
         detail=False,
@@ -732,6 +938,8 @@ class MapLayerViewSet(GenericViewSet):
         filters = data.get('filters', {})
         bbox = data.get('bbox', None)
         sort_key = data.get('sortKey', None)
+        cursor = data.get('cursor', None)
+        limit = data.get('limit', None)
         title_key = data.get('titleKey', '')
         subtitle_keys = [item.get('key') for item in data.get('subtitleKeys', [])]
         detail_keys = [item.get('key') for item in data.get('detailStrings', [])]
@@ -741,14 +949,59 @@ class MapLayerViewSet(GenericViewSet):
                 {'error': 'mapLayerId and titleKey are required.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if limit is not None:
+            try:
+                limit = int(limit)
+                if not 0 < limit <= MAX_SEARCH_PAGE_SIZE:
+                    raise ValueError
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': f'limit must be between 1 and {MAX_SEARCH_PAGE_SIZE}'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
         queryset = VectorFeature.objects.filter(map_layer_id=map_layer_id)
+        # Searches of the layer's configured text fields match the features' indexed search
+        # text, ranked by prefix and word similarity
+        map_layer = VectorMapLayer.objects.filter(pk=map_layer_id).first()
+        search_words = SEARCH_WORD_PATTERN.findall(search_query.lower())
+        ranked = bool(
+            search_words
+            and map_layer
+            and set(main_text_search_fields) == set(map_layer.search_fields)
+        )
+
+        # Filters use the expressions of the layer's search indexes, see
+        # uvdat.core.tasks.search_indexes
+        text_keys = [
+            *(main_text_search_fields if search_query and not ranked else []),
+            *[key for key, item in filters.items() if item.get('type') == 'string'],
+        ]
+        text_aliases = {key: f'search_text_{index}' for index, key in enumerate(text_keys)}
+        queryset = queryset.alias(
+            **{
+                alias: Upper(KeyTextTransform(key, 'properties'))
+                for key, alias in text_aliases.items()
+            }
+        )
 
         # Apply text search
-        if search_query and main_text_search_fields:
+        if ranked:
+            prefix_query = SearchQuery(
+                ' & '.join(f'{word}:*' for word in search_words),
+                search_type='raw',
+                config='simple',
+            )
+            queryset = queryset.filter(
+                Q(search_vector=prefix_query) | Q(search_text__trigram_word_similar=search_query)
+            ).annotate(
+                search_rank=SearchRank(F('search_vector'), prefix_query)
+                + TrigramWordSimilarity(search_query, 'search_text')
+            )
+        elif search_query and main_text_search_fields:
             search_conditions = Q()
             for field in main_text_search_fields:
-                search_conditions |= Q(**{f'properties__{field}__icontains': search_query})
+                search_conditions |= Q(**{f'{text_aliases[field]}__contains': search_query.upper()})
             queryset = queryset.filter(search_conditions)
 
         # Apply filters
@@ -757,16 +1010,20 @@ class MapLayerViewSet(GenericViewSet):
             value = filter_data.get('value')
 
             if filter_type == 'bool':
-                queryset = queryset.filter(**{f'properties__{key}': bool(value)})
+                try:
+                    value = parse_bool_filter(key, value)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                queryset = queryset.filter(properties__contains={key: value})
             elif filter_type == 'number':
                 if isinstance(value, list) and len(value) == 2:  # Range filter
                     queryset = queryset.filter(
                         **{f'properties__{key}__gte': value[0], f'properties__{key}__lte': value[1]}
                     )
                 else:
-                    queryset = queryset.filter(**{f'properties__{key}': value})
+                    queryset = queryset.filter(properties__contains={key: value})
             elif filter_type == 'string':
-                queryset = queryset.filter(**{f'properties__{key}__icontains': value})
+                queryset = queryset.filter(**{f'{text_aliases[key]}__contains': str(value).upper()})
 
         # Apply bounding box filter
         if bbox:
@@ -775,37 +1032,100 @@ class MapLayerViewSet(GenericViewSet):
                 bbox_geom = GEOSGeometry(
                     f'POLYGON(({min_x} {min_y}, {min_x} {max_y}, {max_x} {max_y}, {max_x} {min_y}, {min_x} {min_y}))'
                 )
-                queryset = queryset.filter(geometry__intersects=bbox_geom)
+                queryset = queryset.intersecting(bbox_geom)
             except ValueError:
                 return Response(
                     {'error': 'Invalid BBOX format'}, status=status.HTTP_400_BAD_REQUEST
                 )
 
-        # Apply sorting
+        # Apply sorting, ties and unsorted results are ordered by id for keyset pagination
         if sort_key:
-            queryset = queryset.order_by(f'properties__{sort_key}')
+            queryset = queryset.alias(sort_value=KeyTransform(sort_key, 'properties'))
+            queryset = queryset.order_by('sort_value', 'id')
+        elif ranked:
+            queryset = queryset.order_by('-search_rank', 'id')
+        else:
+            queryset = queryset.order_by('id')
+
+        if cursor:
+            try:
+                sort_value, last_id, missing = decode_search_cursor(cursor)
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            if ranked and not sort_key:
+                queryset = queryset.filter(
+                    Q(search_rank__lt=sort_value) | Q(search_rank=sort_value, id__gt=last_id)
+                )
+            elif not sort_key:
+                queryset = queryset.filter(id__gt=last_id)
+            elif missing:
+                # Features without the sort key are ordered last
+                queryset = queryset.filter(sort_value__isnull=True, id__gt=last_id)
+            elif sort_value is None:
+                # JSON null values are ordered first, before every other value
+                queryset = queryset.filter(
+                    Q(sort_value=None, id__gt=last_id)
+                    | ~Q(sort_value=None)
+                    | Q(sort_value__isnull=True)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(sort_value__gt=sort_value)
+                    | Q(sort_value=sort_value, id__gt=last_id)
+                    | Q(sort_value__isnull=True)
+                )
 
-        # Serialize response
-        response_data = [
-            {
-                'id': feature.id,
-                'title': feature.properties.get(title_key, ''),
+        # Centroids are stored at ingest, geometries are not read
+        queryset = queryset.annotate(
+            lon=Func('centroid', function='ST_X', output_field=FloatField()),
+            lat=Func('centroid', function='ST_Y', output_field=FloatField()),
+        ).values('id', 'properties', 'lon', 'lat', *(['search_rank'] if ranked else []))
+
+        def serialize(feature):
+            properties = feature['properties']
+            return {
+                'id': feature['id'],
+                'title': properties.get(title_key, ''),
                 'subtitles': [
-                    {'key': key, 'value': feature.properties.get(key, '')} for key in subtitle_keys
-                ],
-                'details': [
-                    {'key': key, 'value': feature.properties.get(key, '')} for key in detail_keys
+                    {'key': key, 'value': properties.get(key, '')} for key in subtitle_keys
                 ],
+                'details': [{'key': key, 'value': properties.get(key, '')} for key in detail_keys],
                 'center': (
-                    {
-                        'lat': feature.geometry.centroid.y,
-                        'lon': feature.geometry.centroid.x,
-                    }
-                    if feature.geometry
+                    {'lat': feature['lat'], 'lon': feature['lon']}
+                    if feature['lon'] is not None
                     else None
                 ),
             }
-            for feature in queryset
-        ]
 
-        return Response(response_data, status=status.HTTP_200_OK)
+        start = time.perf_counter()
+        if limit is None and not cursor:
+            return StreamingHttpResponse(
+                stream_search_results(
+                    (serialize(feature) for feature in queryset.iterator(chunk_size=2000)),
+                    map_layer_id,
+                    start,
+                ),
+                content_type='application/json',
+            )
+
+        # Pages are requested with a limit, or a cursor of the previous page
+        limit = limit or MAX_SEARCH_PAGE_SIZE
+        features = list(queryset[: limit + 1])
+        response_data = [serialize(feature) for feature in features[:limit]]
+        next_cursor = None
+        if len(features) > limit:
+            last = features[limit - 1]
+            if sort_key:
+                next_cursor = encode_search_cursor(
+                    last['properties'].get(sort_key),
+                    last['id'],
+                    sort_key not in last['properties'],
+                )
+            else:
+                next_cursor = encode_search_cursor(last.get('search_rank'), last['id'])
+        logger.info(
+            f'Vector feature search of VectorMapLayer {map_layer_id} returned '
+            f'{len(response_data)} features in {(time.perf_counter() - start) * 1000:.1f}ms'
+        )
+
+        return Response({'results': response_data, 'next': next_cursor}, status=status.HTTP_200_OK)
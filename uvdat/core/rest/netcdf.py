@@ -1,5 +1,7 @@
 from datetime import datetime
+import time
 
+from django.db.models import Count, Max
 from rest_framework import mixins, status
 from rest_framework.decorators import action, permission_classes
 from rest_framework.exceptions import PermissionDenied
@@ -9,8 +11,39 @@ from rest_framework.viewsets import GenericViewSet
 
 from uvdat.core.models.netcdf import NetCDFData, NetCDFImage, NetCDFLayer
 from uvdat.core.models.processing_task import ProcessingTask
+from uvdat.core.rest.caching import etag_matches, make_etag, not_modified, set_cache_headers
 from uvdat.core.tasks.netcdf import create_netcdf_slices, preview_netcdf_slice
 
+# Image URLs are presigned and expire, so listings are only cached for a window
+# well within the URL lifetime
+IMAGE_LISTING_CACHE_WINDOW = 600
+
+
+def get_sliding_data(parameters: dict):
+    """Describe the slider range and step of a NetCDFLayer from its parameters."""
+    sliding_dim = parameters.get('sliding_dimension', None)
+    step_count = parameters.get('stepCount', None)
+    if not sliding_dim or not step_count:
+        return None
+    if sliding_dim.get('startDate', False) and sliding_dim.get('endDate', False):
+        start_date = sliding_dim.get('startDate')
+        end_date = sliding_dim.get('endDate')
+        min = datetime.fromisoformat(start_date[:26]).timestamp()
+        max = datetime.fromisoformat(end_date[:26]).timestamp()
+        sliding_data = {
+            'min': min,
+            'max': max,
+            'variable': sliding_dim.get('variable', 'time'),
+        }
+    else:
+        sliding_data = {
+            'min': sliding_dim.get('min', 0),
+            'max': sliding_dim.get('max', step_count),
+            'variable': sliding_dim.get('variable', 'time'),
+        }
+    sliding_data['step'] = (sliding_data['max'] - sliding_data['min']) / (step_count - 1)
+    return sliding_data
+
 
 class NetCDFDataView(GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
 
@@ -81,42 +114,40 @@ class NetCDFDataView(GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMi
                 'slider_index'
             )
 
-            # Prepare the response data with image URLs and parent bounds
-            sliding_dim = netcdf_layer.parameters.get('sliding_dimension', None)
-            step_count = netcdf_layer.parameters.get('stepCount', None)
-            if sliding_dim and step_count:
-                if sliding_dim.get('startDate', False) and sliding_dim.get('endDate', False):
-                    start_date = sliding_dim.get('startDate')
-                    end_date = sliding_dim.get('endDate')
-                    min = datetime.fromisoformat(start_date[:26]).timestamp()
-                    max = datetime.fromisoformat(end_date[:26]).timestamp()
-                    sliding_data = {
-                        'min': min,
-                        'max': max,
-                        'variable': sliding_dim.get('variable', 'time'),
-                    }
-                else:
-                    sliding_data = {
-                        'min': sliding_dim.get('min', 0),
-                        'max': sliding_dim.get('max', step_count),
-                        'variable': sliding_dim.get('variable', 'time'),
-                    }
-                sliding_data['step'] = (sliding_data['max'] - sliding_data['min']) / (
-                    step_count - 1
-                )
+            image_version = netcdf_images.aggregate(Max('modified'), Count('id'))
+            etag = make_etag(
+                'netcdf-images',
+                netcdf_layer.pk,
+                netcdf_layer.modified,
+                image_version,
+                details,
+                int(time.time() // IMAGE_LISTING_CACHE_WINDOW),
+            )
+            if etag_matches(request, etag):
+                return not_modified(etag, max_age=IMAGE_LISTING_CACHE_WINDOW // 2)
+
             response_data = {
                 'netCDFLayer': int(netcdf_layer_id),
                 'parent_bounds': netcdf_layer.bounds.envelope.coords,  # 4-tuple for the parent layer bounds
-                'sliding': sliding_data,
+                'sliding': get_sliding_data(netcdf_layer.parameters),
                 'images': [image.image.url for image in netcdf_images],  # Only return the image URL
             }
 
             # If 'details' is true, include the bounds for each image
             if details:
-                for image_data, image in zip(response_data['images'], netcdf_images):
-                    image_data['bounds'] = image.bounds.envelope.coords
+                response_data['images'] = [
+                    {
+                        'url': url,
+                        'bounds': image.bounds.envelope.coords if image.bounds else None,
+                    }
+                    for url, image in zip(response_data['images'], netcdf_images)
+                ]
 
-            return Response(response_data, status=status.HTTP_200_OK)
+            return set_cache_headers(
+                Response(response_data, status=status.HTTP_200_OK),
+                etag,
+                max_age=IMAGE_LISTING_CACHE_WINDOW // 2,
+            )
 
         except NetCDFLayer.DoesNotExist:
             return Response(
@@ -185,7 +185,7 @@ class RasterMapLayerSerializer(serializers.ModelSerializer, AbstractMapLayerSeri
 class VectorMapLayerSerializer(serializers.ModelSerializer, AbstractMapLayerSerializer):
     class Meta:
         model = VectorMapLayer
-        exclude = ['geojson_file']
+        exclude = ['geojson_file', 'tile_archive', 'property_summary']
 
 
 class NetCDFLayerSerializer(serializers.ModelSerializer):
@@ -231,7 +231,7 @@ class VectorMapLayerDetailSerializer(serializers.ModelSerializer, AbstractMapLay
 
     class Meta:
         model = VectorMapLayer
-        exclude = ['geojson_file']
+        exclude = ['geojson_file', 'tile_archive', 'property_summary']
 
 
 class LayerCollectionSerializer(serializers.ModelSerializer):
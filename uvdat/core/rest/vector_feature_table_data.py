@@ -2,73 +2,31 @@ from collections import defaultdict
 import logging
 
 from django.contrib.gis.geos import Polygon
-from django.db import connection
-from django.http import HttpResponse
 import numpy as np
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 import scipy.stats as stats
 
-from uvdat.core.models import VectorFeature, VectorFeatureRowData, VectorFeatureTableData
+from uvdat.core.models import (
+    VectorFeature,
+    VectorFeatureRowData,
+    VectorFeatureTableData,
+    VectorMapLayer,
+)
+from uvdat.core.models.vector_feature_table_data import to_step_value
+from uvdat.core.rest.caching import (
+    MVT_CONTENT_TYPE,
+    compressed_response,
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_cache_headers,
+)
 from uvdat.core.rest.serializers import VectorFeatureTableDataSerializer
+from uvdat.core.tasks.vector_tiles import get_table_step_vector_tile
 
 logger = logging.getLogger(__name__)
-# TODO THIS IS INCOMPLETE
-VECTOR_TILE_DYNAMIC_SQL = """
-    WITH tile_bounds AS (
-        SELECT ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4326) AS te
-    ),
-    tilenvbounds AS (
-        SELECT
-            ST_XMin(te) as xmin,
-            ST_YMin(te) as ymin,
-            ST_XMax(te) as xmax,
-            ST_YMax(te) as ymax,
-            (ST_XMax(te) - ST_XMin(te)) / 4 as segsize
-        FROM tile_bounds
-    ),
-    env AS (
-        SELECT ST_Segmentize(
-            ST_MakeEnvelope(
-                xmin,
-                ymin,
-                xmax,
-                ymax,
-                4326
-            ),
-            segsize
-        ) as seg
-        FROM tilenvbounds
-    ),
-    bounds AS (
-        SELECT
-            seg as geom,
-            seg::box2d as b2d
-        FROM env
-    ),
-    vector_features AS (
-        SELECT
-            ST_AsMVTGeom(
-                ST_Transform(geometry, 3857),
-                ST_Transform((SELECT geom from bounds), 3857)
-            ) as geom,
-            map_layer_id,
-            Id as vectorfeatureid,
-            vf.properties,
-            vfrd.row_data
-        FROM core_vectorfeature vf
-        LEFT JOIN core_vectorfeaturerowdata vfrd ON vf.vector_feature_id = vfrd.vector_feature_table_id
-        WHERE ST_Intersects(vf.geometry, (SELECT geom from bounds))
-        AND vf.map_layer_id = %(map_layer_id)s
-        {% if sliding_value %}
-            AND vfrd.row_data->>%(sliding_value)s IS NOT NULL
-        {% endif %}
-    )
-    SELECT
-        ST_AsMVT(vector_features.*) AS mvt
-    FROM vector_features;
-"""
 
 
 class VectorFeatureTableDataViewSet(
@@ -88,6 +46,7 @@ class VectorFeatureTableDataViewSet(
 
         type_columns_map = defaultdict(set)
         table_count_map = defaultdict(int)
+        x_column_map = {}
         column_summaries = defaultdict(lambda: defaultdict(dict))
 
         # Iterate over tables to collect type-based column definitions and summary stats
@@ -102,6 +61,7 @@ class VectorFeatureTableDataViewSet(
                 type_columns_map[table_type].add(column)
 
             table_count_map[table_type] += 1
+            x_column_map.setdefault(table_type, table.x_column)
 
             # Aggregate summary statistics per column
             for column, stats_col in table_summary.items():
@@ -142,6 +102,7 @@ class VectorFeatureTableDataViewSet(
                 'type': table_type,
                 'tableCount': table_count_map[table_type],
                 'columns': list(type_columns_map[table_type]),
+                'xColumn': x_column_map.get(table_type, ''),
                 'summary': column_summaries[table_type],
             }
 
@@ -389,9 +350,11 @@ class VectorFeatureTableDataViewSet(
                 {'error': 'Invalid bbox format. Expected format: xmin,ymin,xmax,ymax'}, status=400
             )
 
-        vector_features = VectorFeature.objects.filter(
-            geometry__intersects=bbox_polygon, map_layer=map_layer_id
-        ).values_list('id', flat=True)
+        vector_features = (
+            VectorFeature.objects.filter(map_layer=map_layer_id)
+            .intersecting(bbox_polygon)
+            .values_list('id', flat=True)
+        )
         if not table_type:
             return Response({'error': 'tableType is required'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -421,35 +384,43 @@ class VectorFeatureTableDataViewSet(
         # Layer generation logic would go here...
         return Response({'message': 'Layer generated successfully'}, status=status.HTTP_201_CREATED)
 
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'vector-tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)',
+        url_name='vector_tiles',
+    )
+    def table_step_vector_tile(self, request, x: str, y: str, z: str):
+        map_layer_id = request.query_params.get('mapLayerId')
+        table_type = request.query_params.get('tableType')
+        value_column = request.query_params.get('valueColumn')
+        # A number for the table's x column, or an ISO date for time indexed tables
+        step = to_step_value(request.query_params.get('step'))
+        if not map_layer_id or not table_type or not value_column or step is None:
+            return Response(
+                {'error': 'mapLayerId, tableType, valueColumn and a valid step are required'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-@action(detail=False, methods=['get'], url_path='vector-tile-tab')
-def get_vector_tile_tab(self, request, x: str, y: str, z: str, pk: str):
-    table_id = request.query_params.get('table_id')
-    sliding_value = request.query_params.get(
-        'sliding_value'
-    )  # Column name to split vector features by
-
-    if not table_id or not sliding_value:
-        return Response(
-            {'error': 'table_id and sliding_value are required'}, status=status.HTTP_400_BAD_REQUEST
-        )
+        map_layer = VectorMapLayer.objects.filter(pk=map_layer_id).first()
+        if not map_layer:
+            return Response({'error': 'Map layer not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    with connection.cursor() as cursor:
-        cursor.execute(
-            VECTOR_TILE_DYNAMIC_SQL,
-            {
-                'z': z,
-                'x': x,
-                'y': y,
-                'map_layer_id': pk,
-                'sliding_value': sliding_value,  # Add the sliding_value to SQL execution parameters
-            },
+        etag = make_etag(
+            'table-step-tile',
+            map_layer.pk,
+            map_layer.modified,
+            map_layer.data_version,
+            table_type,
+            value_column,
+            step,
+            z,
+            x,
+            y,
         )
-        row = cursor.fetchone()
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
-    tile = row[0]
-    return HttpResponse(
-        tile,
-        content_type='application/octet-stream',
-        status=200 if tile else 204,
-    )
+        tile = get_table_step_vector_tile(map_layer.pk, table_type, value_column, step, z, x, y)
+        response = compressed_response(request, tile, MVT_CONTENT_TYPE, status=200 if tile else 204)
+        return set_cache_headers(response, etag)
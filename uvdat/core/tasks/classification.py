@@ -0,0 +1,159 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import connection
+import numpy as np
+
+from uvdat.core.models import VectorMapLayer
+from uvdat.core.tasks.property_statistics import (
+    NUMERIC_PATTERN,
+    SAMPLE_SEED,
+    property_values_sql,
+    sample_feature_ids,
+)
+
+CLASSIFICATION_METHODS = ['quantile', 'equal_interval', 'jenks']
+MAX_CLASSES = 20
+# Jenks breaks are computed on a sample of about this many values
+JENKS_SAMPLE_SIZE = 2000
+# Breaks are cached by layer version, so they only expire to free the cache
+CLASSIFICATION_CACHE_SECONDS = 7 * 24 * 60 * 60
+
+NUMBER_RANGE_SQL = """
+    WITH {property_values}
+    SELECT count(number), min(number), max(number)
+    FROM property_values
+"""
+
+QUANTILE_BREAKS_SQL = """
+    WITH {property_values}
+    SELECT percentile_disc(%(fractions)s::double precision[]) WITHIN GROUP (ORDER BY number)
+    FROM property_values
+    WHERE number IS NOT NULL
+"""
+
+NUMBERS_SQL = """
+    WITH {property_values}
+    SELECT number
+    FROM property_values
+    WHERE number IS NOT NULL
+"""
+
+
+def jenks_breaks(values, classes: int) -> list[float]:
+    """Jenks natural breaks, minimizing the squared deviations of values within classes.
+
+    Fisher's exact dynamic program over the sorted values, vectorized over the start of
+    each class. Returns the minimum, the upper bound of each class but the last, and the
+    maximum.
+    """
+    values = np.sort(np.asarray(values, dtype=float))
+    count = len(values)
+    if not count:
+        return []
+    classes = max(1, min(classes, count))
+    sums = np.concatenate([[0.0], np.cumsum(values)])
+    squares = np.concatenate([[0.0], np.cumsum(values**2)])
+
+    def deviations(start, end):
+        # Sum of squared deviations of values[start:end]
+        size = end - start
+        total = sums[end] - sums[start]
+        return squares[end] - squares[start] - total**2 / size
+
+    # cost[end] is the least deviation of values[:end] split into the classes so far
+    cost = np.full(count + 1, np.inf)
+    cost[1:] = deviations(0, np.arange(1, count + 1))
+    class_starts = np.zeros((classes, count + 1), dtype=int)
+    for class_index in range(1, classes):
+        next_cost = np.full(count + 1, np.inf)
+        for end in range(class_index + 1, count + 1):
+            starts = np.arange(class_index, end)
+            candidates = cost[starts] + deviations(starts, end)
+            best = np.argmin(candidates)
+            next_cost[end] = candidates[best]
+            class_starts[class_index, end] = starts[best]
+        cost = next_cost
+
+    breaks = [values[-1]]
+    end = count
+    for class_index in range(classes - 1, 0, -1):
+        end = class_starts[class_index, end]
+        breaks.append(values[end - 1])
+    breaks.append(values[0])
+    return [float(value) for value in reversed(breaks)]
+
+
+def compute_classification(map_layer_id, key: str, method: str, classes: int) -> dict | None:
+    """Class breaks of a numeric property, computed in the database where possible.
+
+    Returns None when the property has no numeric values. Jenks breaks are computed on a
+    sample of the values, read from all of them when the sampled features hold none.
+    """
+    params = {
+        'map_layer_id': map_layer_id,
+        'property_keys': [key],
+        'numeric_pattern': NUMERIC_PATTERN,
+    }
+    sql = property_values_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(NUMBER_RANGE_SQL.format(property_values=sql), params)
+        count, min_value, max_value = cursor.fetchone()
+        if not count:
+            return None
+
+        result = {'key': key, 'method': method, 'classes': classes, 'count': count}
+        if method == 'equal_interval':
+            breaks = np.linspace(min_value, max_value, classes + 1).tolist()
+        elif method == 'quantile':
+            cursor.execute(
+                QUANTILE_BREAKS_SQL.format(property_values=sql),
+                {**params, 'fractions': np.linspace(0, 1, classes + 1).tolist()},
+            )
+            breaks = cursor.fetchone()[0]
+        else:
+            sample_ids, _ = sample_feature_ids(map_layer_id, JENKS_SAMPLE_SIZE)
+            values = []
+            if sample_ids is not None:
+                cursor.execute(
+                    NUMBERS_SQL.format(property_values=property_values_sql(sample=True)),
+                    {**params, 'sample_ids': sample_ids},
+                )
+                values = [row[0] for row in cursor.fetchall()]
+            if len(values) < min(classes, count):
+                # Sparse properties can be missing from the sample, their values are read whole
+                cursor.execute(NUMBERS_SQL.format(property_values=sql), params)
+                values = [row[0] for row in cursor.fetchall()]
+            if not values:
+                # The features changed since they were counted
+                return None
+            values = np.array(values, dtype=float)
+            if len(values) > JENKS_SAMPLE_SIZE:
+                values = np.random.default_rng(SAMPLE_SEED).choice(
+                    values, JENKS_SAMPLE_SIZE, replace=False
+                )
+            breaks = jenks_breaks(values, classes)
+            # The sample does not hold the layer's extreme values
+            breaks[0], breaks[-1] = min_value, max_value
+            result['sample_size'] = len(values)
+
+    result['breaks'] = breaks
+    return result
+
+
+def get_classification(map_layer: VectorMapLayer, key: str, method: str, classes: int):
+    """Class breaks, cached per layer version, property key, method and class count."""
+    cache_key = 'classification:{}:{}:{}:{}:{}:{}'.format(
+        map_layer.pk,
+        map_layer.modified.timestamp(),
+        map_layer.data_version,
+        hashlib.md5(key.encode()).hexdigest(),
+        method,
+        classes,
+    )
+    result = cache.get(cache_key)
+    if result is None:
+        result = compute_classification(map_layer.pk, key, method, classes)
+        # Properties without numeric values are cached as well, as they were counted whole
+        cache.set(cache_key, result or {}, CLASSIFICATION_CACHE_SECONDS)
+    return result or None
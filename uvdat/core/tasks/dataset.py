@@ -1,14 +1,19 @@
+from collections import defaultdict
 import json
 import logging
 
-from celery import shared_task
+from celery import chain, group, shared_task
+from celery.utils import uuid
+from django.db import transaction
 
 from uvdat.celery import app
+from uvdat.core.geodata import GEOJSON_SEQ_EXTS
 from uvdat.core.models import Dataset, FileItem, ProcessingTask
 from uvdat.core.tasks.map_layers import save_vector_features
 
 from .csv_to_heatmap import process_file_item_to_heatmap
 from .map_layers import (
+    IngestProfile,
     create_raster_map_layer,
     create_vector_map_layer,
     process_geopackage,
@@ -21,44 +26,42 @@ from .regions import create_source_regions
 logger = logging.getLogger(__name__)
 
 
-@shared_task
-def convert_dataset(
-    dataset_id,
-    style_options=None,
+def convert_file_item(
+    file_to_convert,
+    base_style_options=None,
     network_options=None,
     region_options=None,
-):
-    dataset = Dataset.objects.get(id=dataset_id)
-    dataset.processing = True
-    dataset.save()
-    base_style_options = style_options
-    for file_to_convert in FileItem.objects.filter(dataset=dataset):
-        file_name = file_to_convert.file.name.lower()
-        file_metadata = file_to_convert.metadata
-        style_options = file_metadata.get('default_style', base_style_options)
-        if file_name.endswith('.gpkg'):
-            raster_map_layers, vector_map_layers = process_geopackage(
-                file_to_convert, style_options
-            )
-            for item in raster_map_layers:
-                item.set_bounds()
-        elif file_name.endswith(('.zip', '.geojson', '.json', '.csv')):
-            if file_metadata.get('processing', False) == 'csvToHeatmap' and file_name.endswith(
-                '.csv'
-            ):
-                process_file_item_to_heatmap(file_to_convert, style_options)
-                continue
-
+    profile: IngestProfile | None = None,
+) -> dict:
+    """Create the layers of a FileItem of a dataset, returning their ids by layer type."""
+    file_name = file_to_convert.file.name.lower()
+    file_metadata = file_to_convert.metadata or {}
+    style_options = file_metadata.get('default_style', base_style_options)
+    raster_map_layers = []
+    vector_map_layers = []
+    netcdf_map_layers = []
+    if file_name.endswith('.gpkg'):
+        raster_map_layers, vector_map_layers = process_geopackage(file_to_convert, style_options)
+        for item in raster_map_layers:
+            item.set_bounds()
+    elif file_name.endswith(('.zip', '.geojson', '.json', '.csv', *GEOJSON_SEQ_EXTS)):
+        if file_metadata.get('processing', False) == 'csvToHeatmap' and file_name.endswith('.csv'):
+            raster_map_layers.append(process_file_item_to_heatmap(file_to_convert, style_options))
+        else:
             # Handle Vector files
             tags = file_metadata.get('tags', False)
             metadata_modified = {}
             if tags:
                 metadata_modified = {'tags': tags}
+            # Networks and regions alter the stored geojson_data before features are saved
+            save_features = not (network_options or region_options)
             vector_map_layers = create_vector_map_layer(
                 file_to_convert,
                 style_options=style_options,
                 name=file_to_convert.name,
                 metadata=metadata_modified,
+                save_features=save_features,
+                profile=profile,
             )
             for vector_map_layer in vector_map_layers:
                 if network_options:
@@ -67,7 +70,8 @@ def convert_dataset(
                     create_source_regions(vector_map_layer, region_options)
 
                 # Create vector tiles after geojson_data may have been altered
-                save_vector_features(vector_map_layer=vector_map_layer)
+                if not save_features:
+                    save_vector_features(vector_map_layer=vector_map_layer)
                 if 'tabular' in file_metadata.keys():  # Process additional metadata item
                     tabular_info = file_metadata.get('tabular', {})
                     tabular_file_item_id = tabular_info.get('fileItemId')
@@ -78,26 +82,218 @@ def convert_dataset(
                         process_tabular_vector_feature_data(
                             vector_map_layer.pk, tabular_geojson, tabular_matcher
                         )
-                vector_map_layer.set_bounds()
+                        # Saved below, without undoing the data version it incremented
+                        vector_map_layer.refresh_from_db(fields=['data_version'])
+                if not save_features:
+                    vector_map_layer.set_bounds()
 
-        elif file_name.endswith(('.tif', '.tiff')):
-            # Handle Raster files
-            raster_map_layer = create_raster_map_layer(
-                file_to_convert,
-                style_options=style_options,
-            )
-            raster_map_layer.set_bounds()
-        elif file_name.endswith('.nc'):  # convert netcdf into a netcdf Data model
-            create_netcdf_data_layer(
-                file_to_convert,
-                file_metadata,
-            )
-        else:
-            # Handle unsupported file types
-            print(f'Unsupported file type: {file_name}')
+    elif file_name.endswith(('.tif', '.tiff')):
+        # Handle Raster files
+        raster_map_layer = create_raster_map_layer(
+            file_to_convert,
+            style_options=style_options,
+        )
+        raster_map_layer.set_bounds()
+        raster_map_layers.append(raster_map_layer)
+    elif file_name.endswith('.nc'):  # convert netcdf into a netcdf Data model
+        netcdf_map_layers.append(create_netcdf_data_layer(file_to_convert, file_metadata))
+    else:
+        # Handle unsupported file types
+        raise ValueError(f'Unsupported file type: {file_name}')
+
+    return {
+        'raster_map_layers': [layer.id for layer in raster_map_layers],
+        'vector_map_layers': [layer.id for layer in vector_map_layers],
+        'net_cdf_map_layers': [layer.id for layer in netcdf_map_layers],
+    }
+
+
+@app.task(bind=True)
+def convert_dataset_file(
+    self,
+    file_item_id,
+    dataset_task_id,
+    style_options=None,
+    network_options=None,
+    region_options=None,
+):
+    """Convert a FileItem of a dataset, recording the outcome in its ProcessingTask.
+
+    Errors are recorded rather than raised, so the remaining files still run. The last file
+    of the dataset to finish completes the dataset's conversion.
+    """
+    processing_task = ProcessingTask.objects.filter(celery_id=self.request.id)
+    processing_task.update(status=ProcessingTask.Status.RUNNING)
+    ingest_profile = IngestProfile()
+    try:
+        file_item = FileItem.objects.get(id=file_item_id)
+        logger.info(f'Converting file: {file_item.file.name}')
+        output_layers = convert_file_item(
+            file_item, style_options, network_options, region_options, ingest_profile
+        )
+    except Exception as e:
+        logger.exception(f'Error converting FileItem {file_item_id}')
+        processing_task.update(status=ProcessingTask.Status.ERROR, error=str(e))
+    else:
+        processing_task.update(
+            status=ProcessingTask.Status.COMPLETE,
+            output_metadata={
+                'output_layers': output_layers,
+                'ingest_profile': ingest_profile.as_dict(),
+            },
+        )
+    finally:
+        finish_dataset_conversion(dataset_task_id)
+
+
+def finish_dataset_conversion(dataset_task_id):
+    """Aggregate the file conversions of a dataset into its ProcessingTask once all are done.
+
+    The dataset's task is locked, so only the last file conversion to finish aggregates.
+    """
+    with transaction.atomic():
+        dataset_task = (
+            ProcessingTask.objects.select_for_update()
+            .filter(id=dataset_task_id, status=ProcessingTask.Status.RUNNING)
+            .first()
+        )
+        if dataset_task is None:
+            return
+        file_tasks = ProcessingTask.objects.filter(
+            metadata__type='file conversion', metadata__dataset_task=dataset_task_id
+        )
+        if file_tasks.filter(
+            status__in=[ProcessingTask.Status.QUEUED, ProcessingTask.Status.RUNNING]
+        ).exists():
+            return
+
+        output_layers = defaultdict(list)
+        errors = {}
+        for file_task in file_tasks.prefetch_related('file_items'):
+            file_output = (file_task.output_metadata or {}).get('output_layers') or {}
+            for layer_type, layer_ids in file_output.items():
+                output_layers[layer_type] += layer_ids
+            if file_task.status != ProcessingTask.Status.COMPLETE:
+                for file_item in file_task.file_items.all():
+                    errors[file_item.id] = file_task.error or file_task.status
+
+        dataset_task.status = (
+            ProcessingTask.Status.ERROR if errors else ProcessingTask.Status.COMPLETE
+        )
+        dataset_task.error = '\n'.join(
+            f'FileItem {file_item_id}: {error}' for file_item_id, error in errors.items()
+        )
+        dataset_task.output_metadata = {'output_layers': output_layers, 'errors': errors}
+        dataset_task.save()
+        Dataset.objects.filter(id=dataset_task.metadata['dataset']).update(processing=False)
+
+
+def tabular_source_id(file_item) -> int | None:
+    """Get the id of the FileItem whose data a FileItem joins to its features, if any."""
+    return ((file_item.metadata or {}).get('tabular') or {}).get('fileItemId')
+
+
+def conversion_workflow(signatures: dict, file_items, sequential: bool = False):
+    """Combine the file conversion tasks of a dataset, each keyed by its FileItem's id.
 
-    dataset.processing = False
+    A file joining the data of another file of the dataset is converted after it, other
+    files are converted in parallel unless `sequential` is set.
+    """
+    if sequential:
+        return chain(*signatures.values())
+
+    dependents = defaultdict(list)
+    for file_item in file_items:
+        source_id = tabular_source_id(file_item)
+        if source_id in signatures and source_id != file_item.id:
+            dependents[source_id].append(file_item.id)
+
+    scheduled = set()
+
+    def with_dependents(file_item_id):
+        scheduled.add(file_item_id)
+        following = [
+            with_dependents(dependent_id)
+            for dependent_id in dependents[file_item_id]
+            if dependent_id not in scheduled
+        ]
+        if not following:
+            return signatures[file_item_id]
+        return chain(signatures[file_item_id], group(following))
+
+    dependent_ids = {file_item_id for ids in dependents.values() for file_item_id in ids}
+    workflows = [
+        with_dependents(file_item_id)
+        for file_item_id in signatures
+        if file_item_id not in dependent_ids
+    ]
+    # Files depending on each other in a cycle are started from any of them
+    for file_item_id in signatures:
+        if file_item_id not in scheduled:
+            workflows.append(with_dependents(file_item_id))
+    return group(workflows)
+
+
+@shared_task(bind=True)
+def convert_dataset(
+    self,
+    dataset_id,
+    style_options=None,
+    network_options=None,
+    region_options=None,
+    asynchronous=True,
+):
+    """Convert the FileItems of a dataset with a task per file.
+
+    The dataset and each file have a ProcessingTask tracking their status. Files are
+    converted in parallel by the workers, except with network options, which replace the
+    network of the whole dataset. Without `asynchronous`, the tasks run in this process.
+    """
+    dataset = Dataset.objects.get(id=dataset_id)
+    dataset.processing = True
     dataset.save()
+    # Previous conversions of the dataset that did not finish are superseded
+    ProcessingTask.objects.filter(
+        metadata__type='dataset conversion',
+        metadata__dataset=dataset.id,
+        status=ProcessingTask.Status.RUNNING,
+    ).update(status=ProcessingTask.Status.ERROR, error='Superseded by a later conversion')
+
+    file_items = list(FileItem.objects.filter(dataset=dataset).order_by('index', 'id'))
+    dataset_task = ProcessingTask.objects.create(
+        name=f'Converting {dataset.name}',
+        status=ProcessingTask.Status.RUNNING,
+        metadata={'type': 'dataset conversion', 'dataset': dataset.id},
+        celery_id=self.request.id or '',
+    )
+    dataset_task.file_items.set(file_items)
+
+    signatures = {}
+    for file_item in file_items:
+        task_id = uuid()
+        file_task = ProcessingTask.objects.create(
+            name=f'Converting {file_item.name}',
+            status=ProcessingTask.Status.QUEUED,
+            metadata={
+                'type': 'file conversion',
+                'dataset': dataset.id,
+                'dataset_task': dataset_task.id,
+            },
+            celery_id=task_id,
+        )
+        file_task.file_items.add(file_item)
+        signatures[file_item.id] = convert_dataset_file.si(
+            file_item.id, dataset_task.id, style_options, network_options, region_options
+        ).set(task_id=task_id)
+
+    if not signatures:
+        finish_dataset_conversion(dataset_task.id)
+        return
+    workflow = conversion_workflow(signatures, file_items, sequential=bool(network_options))
+    if asynchronous:
+        workflow.apply_async()
+    else:
+        workflow.apply()
 
 
 @app.task(bind=True)
@@ -117,6 +313,7 @@ def process_file_item(self, file_item_id):
     raster_map_layers = []
     vector_map_layers = []
     netcdf_map_layers = []
+    ingest_profile = IngestProfile()
     processing_task.update(status=ProcessingTask.Status.RUNNING)
     try:
         if file_name.endswith('.gpkg'):
@@ -125,7 +322,7 @@ def process_file_item(self, file_item_id):
             )
             raster_map_layers += gpkg_raster_map_layers
             vector_map_layers += gpkg_vector_map_layers
-        elif file_name.endswith(('.zip', '.geojson', '.json', '.csv')):
+        elif file_name.endswith(('.zip', '.geojson', '.json', '.csv', *GEOJSON_SEQ_EXTS)):
             if file_metadata.get('processing', False) == 'csvToHeatmap' and file_name.endswith(
                 '.csv'
             ):
@@ -133,13 +330,13 @@ def process_file_item(self, file_item_id):
                 raster_map_layers.append(raster_map_layer)
 
             # Handle Vector files
-            new_vector_map_layers = create_vector_map_layer(
-                file_item, style_options=style_options, name=file_item.name
+            vector_map_layers += create_vector_map_layer(
+                file_item,
+                style_options=style_options,
+                name=file_item.name,
+                save_features=True,
+                profile=ingest_profile,
             )
-            for vector_map_layer in new_vector_map_layers:
-                save_vector_features(vector_map_layer=vector_map_layer)
-                vector_map_layer.set_bounds()
-                vector_map_layers.append(vector_map_layer)
 
         elif file_name.endswith(('.tif', '.tiff')):
             # Handle Raster files
@@ -176,7 +373,8 @@ def process_file_item(self, file_item_id):
                     'raster_map_layers': [rml.id for rml in raster_map_layers],
                     'vector_map_layers': [vml.id for vml in vector_map_layers],
                     'net_cdf_map_layers': netcdf_map_layers,
-                }
+                },
+                'ingest_profile': ingest_profile.as_dict(),
             },
         )
     finally:
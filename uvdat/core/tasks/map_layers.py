@@ -1,51 +1,144 @@
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+import datetime
 from functools import partial
+import io
 import json
 import logging
 import os
 from pathlib import Path
+import resource
+import shutil
 import subprocess
 import tempfile
-import zipfile
+import time
+from typing import Iterator
 
-from django.contrib.gis.geos import GEOSGeometry, LineString, MultiLineString
-from django.core.files.base import ContentFile
-import fiona
+from django.contrib.gis.geos import Polygon
+from django.core.files import File
+from django.db import connection, transaction
 import geopandas
+import ijson
+import numpy
 import pandas
+import pyogrio
 import rasterio
 from rasterio.enums import ColorInterp  # Import ColorInterp from rasterio
-import shapefile
-from shapely.geometry import Point
-from shapely.wkt import loads as wkt_loads
+from rasterio.errors import RasterioIOError
+import shapely
 
+from uvdat.core.geodata import GEOJSON_SEQ_EXTS, GeoJSONFeatureReader, GeoParquetWriter
 from uvdat.core.models import (
     RasterMapLayer,
     VectorFeatureRowData,
     VectorFeatureTableData,
     VectorMapLayer,
 )
-from uvdat.core.models.map_layers import VectorFeature
+from uvdat.core.models.map_layers import SEARCH_INDEX_PREFIX, VectorFeature
+from uvdat.core.models.vector_feature_table_data import default_x_column, to_step_value
+from uvdat.core.tasks.property_summary import update_property_summary
+from uvdat.core.tasks.zip_reader import (
+    GEOJSON_ENCODINGS,
+    geojson_member_batches,
+    read_zip_members,
+    zip_layer_members,
+)
 
 logger = logging.getLogger(__name__)
 
 SHAPEFILE_EXTS = ['.shp', '.shx', '.dbf', '.prj']
+GEOJSON_FILE_TYPES = ['geojson', 'json', 'geojsonl', 'geojsons']
+# Layers of a GeoPackage are read and converted by up to this many threads
+GEOPACKAGE_WORKERS = min(os.cpu_count() or 1, 8)
+# Raster band statistics are read at no more than this many pixels per side
+STATISTICS_SAMPLE_SIZE = 1024
+# CSV files are read and parsed in chunks of this many rows
+CSV_CHUNK_SIZE = 100_000
+
+# Features are loaded with a COPY per this many features
+COPY_BATCH_SIZE = 50_000
+COPY_VECTOR_FEATURES_SQL = (
+    'COPY core_vectorfeature (map_layer_id, geometry, properties) FROM STDIN WITH (FORMAT csv)'
+)
+
+# Spatial and GIN indexes of features, except those of constraints and layer search indexes
+DEFERRED_INDEX_TABLES = ['core_vectorfeature', 'core_vectorfeaturesubdivision']
+DEFERRABLE_INDEXES_SQL = f"""
+    SELECT i.indexname, i.indexdef
+    FROM pg_indexes i
+    WHERE i.schemaname = current_schema()
+    AND i.tablename = ANY(%(tables)s)
+    AND i.indexdef ~ 'USING (gist|gin) '
+    AND NOT starts_with(i.indexname, '{SEARCH_INDEX_PREFIX}')
+    AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+"""
+
+
+class IngestProfile:
+    """Wall time and peak memory of the stages of an ingest.
+
+    Stages may overlap when they run in parallel, and repeated stages of a layer, such as
+    those of each batch, are accumulated. Peak memory is the resident set high-water mark of
+    the process when a stage ends, so the stage raising it can be identified.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = []
+
+    @staticmethod
+    def peak_memory_mb() -> float:
+        # ru_maxrss is in kilobytes on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    @contextmanager
+    def stage(self, name: str, layer: str | None = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, layer, time.perf_counter() - start)
+
+    def add(self, name: str, layer: str | None, seconds: float):
+        """Add the time of a run of a stage, such as one timed by another process."""
+        stage = next((s for s in self.stages if s['stage'] == name and s['layer'] == layer), None)
+        if stage is None:
+            stage = {'stage': name, 'layer': layer, 'seconds': 0, 'count': 0}
+            self.stages.append(stage)
+        stage['seconds'] = round(stage['seconds'] + seconds, 3)
+        stage['count'] += 1
+        stage['peak_memory_mb'] = self.peak_memory_mb()
+        logger.debug(
+            f'Ingest stage {name} of {layer or "file"}: {seconds:.3f}s, '
+            f'peak memory {stage["peak_memory_mb"]}MB'
+        )
+
+    def as_dict(self) -> dict:
+        for stage in self.stages:
+            logger.info(
+                f'Ingest stage {stage["stage"]} of {stage["layer"] or "file"}: '
+                f'{stage["seconds"]}s in {stage["count"]} runs, '
+                f'peak memory {stage["peak_memory_mb"]}MB'
+            )
+        return {
+            'stages': self.stages,
+            'seconds': round(time.perf_counter() - self.start, 3),
+            'peak_memory_mb': self.peak_memory_mb(),
+        }
 
 
 def calculate_styling(geojson_data, style_options):
     if style_options:
         return style_options
 
-    geometry_types = set()
-    has_render_height = False
-    for _index, feature in enumerate(geojson_data.iterfeatures()):
-        geometry_type = feature.get('geometry', {}).get('type', False)
-        render_height = feature.get('properties', {}).get('render_height', False)
-        if render_height is not False:
-            has_render_height = True
-        if geometry_type:
-            geometry_types.add(geometry_type)
+    # Features without the property have it as a missing value in the column
+    return default_styling(
+        set(geojson_data.geom_type.dropna().unique()),
+        'render_height' in geojson_data.columns,
+    )
+
 
+def default_styling(geometry_types: set[str], has_render_height: bool):
     updated_style_options = {
         'layers': {
             'circle': {'color': '#888888', 'enabled': False, 'size': 3},
@@ -90,43 +183,62 @@ def is_list_of_str(lst) -> bool:
     return all(isinstance(v, str) for v in lst)
 
 
-def filter_dict(row: dict, include: list[str] | str | None, exclude: list[str] | None) -> dict:
-    """Filter a dictionary according to the include/exclude spec.
+def filter_columns(
+    columns: list[str], include: list[str] | str | None, exclude: list[str] | None
+) -> list[str]:
+    """Filter column names according to the include/exclude spec.
 
-    If `include` is "*", then include all keys (except for those in `exclude`).
+    If `include` is "*", then include all columns (except for those in `exclude`).
     """
     if include is None:
-        return {}
+        return []
     exclude = exclude or []
 
-    def test_membership(key: str) -> bool:
-        return key not in exclude and (include == '*' or key in include)
+    def test_membership(column: str) -> bool:
+        return column not in exclude and (include == '*' or column in include)
 
-    return {key: value for key, value in row.items() if test_membership(key)}
+    return [column for column in columns if test_membership(column)]
 
 
-def wkt_geom_from_dict(wkt_col: str, metadata_cols: list[str] | str | None, row: dict):
-    """Parse a WKT column and metadata columns.
+def properties_from_frame(frame, metadata_cols: list[str] | str | None, exclude: list[str]):
+    properties = frame[filter_columns(list(frame.columns), metadata_cols, exclude)]
+    # Rename "geometry" property to avoid conflict with GeoDataFrame's "geometry" column
+    return properties.rename(columns={'geometry': 'geometry_property'})
 
-    Returns: (Geometry, metadata_dict)
+
+def wkt_geodata_from_frame(wkt_col: str, metadata_cols: list[str] | str | None, frame):
+    """Parse a WKT column and metadata columns of a whole frame.
+
+    Returns: GeoDataFrame
     """
-    return wkt_loads(row[wkt_col]), filter_dict(row, metadata_cols, [wkt_col])
+    wkt = frame[wkt_col].astype(object)
+    geometries = shapely.from_wkt(wkt.where(wkt.notna(), None).to_numpy())
+    return geopandas.GeoDataFrame(
+        properties_from_frame(frame, metadata_cols, [wkt_col]),
+        geometry=geometries,
+        crs='EPSG:4326',
+    )
 
 
-def point_geom_from_dict(
-    lon_col: str, lat_col: str, metadata_cols: list[str] | str | None, row: dict
+def point_geodata_from_frame(
+    lon_col: str, lat_col: str, metadata_cols: list[str] | str | None, frame
 ):
-    """Parse lon/lat columns and metadata columns.
+    """Parse lon/lat columns and metadata columns of a whole frame.
 
-    Returns: (Point Geometry, metadata_dict)
+    Returns: GeoDataFrame of Point Geometries
     """
-    return Point(float(row[lon_col]), float(row[lat_col])), filter_dict(
-        row, metadata_cols, [lon_col, lat_col]
+    geometries = geopandas.points_from_xy(
+        frame[lon_col].astype(float), frame[lat_col].astype(float)
+    )
+    return geopandas.GeoDataFrame(
+        properties_from_frame(frame, metadata_cols, [lon_col, lat_col]),
+        geometry=geometries,
+        crs='EPSG:4326',
     )
 
 
-def get_csv_row_parser(spec):
-    """Return a function that will parse a dict-like object given a spec.
+def get_csv_frame_parser(spec):
+    """Return a function that will parse a DataFrame into a GeoDataFrame given a spec.
 
     Parser spec:
     {
@@ -176,7 +288,7 @@ def get_csv_row_parser(spec):
             raise ValueError('"geometry_wkt" must be a string')
 
         return partial(
-            wkt_geom_from_dict,
+            wkt_geodata_from_frame,
             geometry_wkt,
             properties,
         )
@@ -189,7 +301,7 @@ def get_csv_row_parser(spec):
         if not isinstance(point_lon, str):
             raise ValueError('"point_lon" must be a string')
 
-        return partial(point_geom_from_dict, point_lon, point_lat, properties)
+        return partial(point_geodata_from_frame, point_lon, point_lat, properties)
 
 
 def create_raster_map_layer(file_item, style_options):
@@ -198,25 +310,80 @@ def create_raster_map_layer(file_item, style_options):
         raw_data_path = Path(temp_dir, 'raw_data.tiff')
         with open(raw_data_path, 'wb') as raw_data:
             with file_item.file.open('rb') as raw_data_archive:
-                raw_data.write(raw_data_archive.read())
+                shutil.copyfileobj(raw_data_archive, raw_data)
 
         # Pass the file path and map layer to the next function
         new_map_layer = create_raster_map_layer_from_file(file_item, raw_data_path, style_options)
         return new_map_layer
 
 
-def create_raster_map_layer_from_file(file_item, file_path, style_options, name='', index=None):
-    """Create a RasterMapLayer from a file's contents."""
+def is_cloud_optimized(file_path) -> bool:
+    """Whether a file is a GeoTIFF written by GDAL's COG driver, stored without conversion.
+
+    Tiled GeoTIFFs with overviews are not necessarily COGs, their headers and overviews may
+    follow the image data, so they are converted.
+    """
+    try:
+        with rasterio.open(file_path) as src:
+            return src.driver == 'GTiff' and src.tags(ns='IMAGE_STRUCTURE').get('LAYOUT') == 'COG'
+    except RasterioIOError:
+        return False
+
+
+def band_statistics(file_path) -> list[tuple[float, float] | None]:
+    """Get the minimum and maximum of each band of a raster, or None for bands without data.
+
+    Values are read at a resolution of at most STATISTICS_SAMPLE_SIZE pixels per side, which
+    GDAL reads from the overviews of a COG.
+    """
+    with rasterio.open(file_path) as src:
+        scale = max(src.width, src.height) / STATISTICS_SAMPLE_SIZE
+        out_shape = (src.count, src.height, src.width)
+        if scale > 1:
+            out_shape = (
+                src.count,
+                max(1, round(src.height / scale)),
+                max(1, round(src.width / scale)),
+            )
+        data = numpy.ma.masked_invalid(src.read(masked=True, out_shape=out_shape))
+    return [(float(band.min()), float(band.max())) if band.count() else None for band in data]
+
+
+def create_raster_map_layer_from_file(
+    file_item, file_path, style_options, name='', index=None, cloud_optimized=False
+):
+    """Create a RasterMapLayer from a file's contents.
+
+    The file is converted to a COG unless it already is one, see is_cloud_optimized.
+    Styling is derived from band statistics read from the COG's overviews, and the COG is
+    uploaded from disk.
+    """
     import large_image_converter
 
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cog_raster_path = Path(file_path)
+        if not (cloud_optimized or is_cloud_optimized(file_path)):
+            cog_raster_path = Path(temp_dir, 'cog_raster.tiff')
+            # _concurrent=None should use all logical CPUS
+            # https://github.com/girder/large_image/blob/master/utilities/converter/large_image_converter/__init__.py#L925
+            large_image_converter.convert(str(file_path), str(cog_raster_path), _concurrency=None)
+
+        new_map_layer = create_raster_map_layer_from_cog(
+            file_item, cog_raster_path, style_options, name, index
+        )
+    return new_map_layer
+
+
+def create_raster_map_layer_from_cog(file_item, cog_raster_path, style_options, name, index):
+    """Create a RasterMapLayer styled by the band statistics of a COG and upload the COG."""
     if not style_options:
         style_options = {}
-    with rasterio.open(file_path) as src:
+    statistics = band_statistics(cog_raster_path)
+    with rasterio.open(cog_raster_path) as src:
         bands = []
         for i in range(1, src.count + 1):
-            stats = src.statistics(i, approx=True)
-            band_min = stats.min
-            band_max = stats.max
+            # Bands without data are left disabled
+            band_min, band_max = statistics[i - 1] or (0, 255)
             minmax = style_options.get('minmax', None)
             # Check if the band's min/max values are not in the range of 0-255
             if int(band_min) != 0 or int(band_max) != 255 or (minmax):
@@ -283,55 +450,104 @@ def create_raster_map_layer_from_file(file_item, file_path, style_options, name=
         index=layer_index,
     )
 
-    # Convert the file to cloud-optimized geotiff and save it
-    with tempfile.TemporaryDirectory() as temp_dir:
-        cog_raster_path = Path(temp_dir, 'cog_raster.tiff')
-        # _concurrent=None should use all logical CPUS
-        # https://github.com/girder/large_image/blob/master/utilities/converter/large_image_converter/__init__.py#L925
-        large_image_converter.convert(str(file_path), str(cog_raster_path), _concurrency=None)
-        with open(cog_raster_path, 'rb') as cog_raster_file:
-            new_map_layer.cloud_optimized_geotiff.save(
-                cog_raster_path, ContentFile(cog_raster_file.read())
-            )
+    # Uploaded in chunks from disk
+    with open(cog_raster_path, 'rb') as cog_raster_file:
+        new_map_layer.cloud_optimized_geotiff.save('cog_raster.tiff', File(cog_raster_file))
 
     return new_map_layer
 
 
-def create_vector_map_layer(file_item, style_options, name='', index=None, metadata=None):
-    """Save a VectorMapLayer from a FileItem's contents."""
+def create_vector_map_layer(
+    file_item,
+    style_options,
+    name='',
+    index=None,
+    metadata=None,
+    save_features=False,
+    profile: IngestProfile | None = None,
+):
+    """Save a VectorMapLayer from a FileItem's contents.
+
+    With `save_features`, the features and bounds of each layer are saved from the parsed
+    data as well, see create_vector_map_from_json. GeoJSON and CSV files, and the GeoJSON
+    members of zip files, are then read and saved in batches, see
+    create_vector_map_from_stream.
+    """
+    profile = profile or IngestProfile()
+    if save_features and file_item.file_type == 'zip':
+        return create_vector_maps_from_zip(file_item, style_options, name, index, metadata, profile)
+    if save_features and file_item.file_type in [*GEOJSON_FILE_TYPES, 'csv']:
+        if file_item.file_type == 'csv':
+            batches = csv_batches(file_item)
+        else:
+            batches = open_geojson_reader(file_item).batches()
+        return [
+            create_vector_map_from_stream(
+                file_item, batches, style_options, name, index, metadata, profile
+            )
+        ]
+
     geojson_array = []
     if file_item.file_type == 'zip':
-        geojson_array = convert_zip_to_geojson(file_item)
-    elif file_item.file_type == 'csv':
-        geojson_array.append({'geojson': convert_csv_to_geojson(file_item), 'name': name})
-    elif file_item.file_type == 'geojson' or file_item.file_type == 'json':
-        logger.info(f'Processing geojson file: {file_item.name} with type: {file_item.file_type}')
-        source_data = json.load(file_item.file.open())
-        source_projection = source_data.get('crs', {}).get('properties', {}).get('name')
-        geojson_data = geopandas.GeoDataFrame.from_features(source_data.get('features'))
-        if source_projection:
-            geojson_data = geojson_data.set_crs(source_projection)
-            geojson_data = geojson_data.to_crs(4326)
-        geojson_array.append({'geojson': geojson_data, 'name': name})
+        # Layers are created while the remaining members of the archive are read
+        geojson_array = convert_zip_to_geojson(file_item, profile)
+    else:
+        with profile.stage('parse'):
+            if file_item.file_type == 'csv':
+                geojson_array.append({'geojson': convert_csv_to_geojson(file_item), 'name': name})
+            elif file_item.file_type in GEOJSON_FILE_TYPES:
+                geojson_array.append(
+                    {'geojson': open_geojson_reader(file_item).read_frame(), 'name': name}
+                )
     new_map_layers = []
     for data in geojson_array:
         geojson = data['geojson']
         layer_name = name
         # Use the layer names only if there is more than one layer created from the files
-        if len(geojson_array) > 1:
+        if data.get('layer_count', 1) > 1:
             layer_name = data['name']
         new_map_layer = create_vector_map_from_json(
-            file_item, geojson, style_options, layer_name, index, metadata
+            file_item,
+            geojson,
+            style_options,
+            layer_name,
+            index,
+            metadata,
+            save_features=save_features,
+            profile=profile,
         )
         new_map_layers.append(new_map_layer)
 
     return new_map_layers
 
 
+def open_geojson_reader(file_item) -> GeoJSONFeatureReader:
+    logger.info(f'Processing geojson file: {file_item.name} with type: {file_item.file_type}')
+    # GeoJSONSeq files are told apart by their content unless named as such
+    return GeoJSONFeatureReader(
+        file_item.file.open('rb'),
+        sequence=file_item.file.name.lower().endswith(tuple(GEOJSON_SEQ_EXTS)) or None,
+    )
+
+
 def create_vector_map_from_json(
-    file_item, geojson_data, style_options, name='', index=None, metadata=None
+    file_item,
+    geojson_data,
+    style_options,
+    name='',
+    index=None,
+    metadata=None,
+    save_features=False,
+    profile: IngestProfile | None = None,
 ):
-    updated_style_options = calculate_styling(geojson_data, style_options)
+    """Create a VectorMapLayer from a GeoDataFrame and store it as its GeoParquet file.
+
+    With `save_features`, the layer's features and bounds are saved from the same frame
+    while the file is written, instead of reading the stored file back.
+    """
+    profile = profile or IngestProfile()
+    with profile.stage('styling', name):
+        updated_style_options = calculate_styling(geojson_data, style_options)
     layer_index = file_item.index
     if index is not None:
         layer_index = index
@@ -343,292 +559,505 @@ def create_vector_map_from_json(
         index=layer_index,
     )
     print('\t', f'VectorMapLayer {new_map_layer.id} created with name: {name}')
-    new_map_layer.write_geojson_data(geojson_data.to_json())
+    if not save_features:
+        with profile.stage('store_file', name):
+            new_map_layer.write_geodata(geojson_data)
+        new_map_layer.save()
+        print('\t', 'Done Writing GeoParquet file to Map Layer')
+        return new_map_layer
+
+    def store_file():
+        # The file is saved without the model, which is only saved from this thread's caller
+        with profile.stage('store_file', name):
+            new_map_layer.write_geodata(geojson_data, save=False)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        stored_file = executor.submit(store_file)
+        save_vector_features(new_map_layer, geojson_data, profile)
+        stored_file.result()
+
+    with profile.stage('bounds', name):
+        set_bounds_from_geodata(new_map_layer, geojson_data)
     new_map_layer.save()
-    print('\t', 'Done Writing GeoJSON file to Map Layer')
+    print('\t', 'Done Writing GeoParquet file and features of Map Layer')
 
     return new_map_layer
 
 
-def convert_zip_to_geojson(file_item):
-    geodata_list = []
+def create_vector_map_from_stream(
+    file_item,
+    batches: Iterator[geopandas.GeoDataFrame],
+    style_options,
+    name='',
+    index=None,
+    metadata=None,
+    profile: IngestProfile | None = None,
+):
+    """Create a VectorMapLayer with its features and bounds from batches of a stream.
+
+    Memory is proportional to the batch size: each batch of features is saved and written
+    to a temporary GeoParquet file, which is stored once complete.
+    """
+    profile = profile or IngestProfile()
+    layer_index = file_item.index
+    if index is not None:
+        layer_index = index
+    new_map_layer = VectorMapLayer.objects.create(
+        dataset=file_item.dataset,
+        name=name,
+        metadata=metadata,
+        default_style=style_options or {},
+        index=layer_index,
+    )
+    print('\t', f'VectorMapLayer {new_map_layer.id} created with name: {name}')
+
+    geometry_types = set()
+    has_render_height = False
+    bounds = None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        geodata_path = Path(temp_dir, 'vectordata.parquet')
+        geodata_writer = GeoParquetWriter(geodata_path)
+        try:
+            while True:
+                with profile.stage('parse', name):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                with profile.stage('features', name):
+                    copy_vector_features(new_map_layer, batch)
+                with profile.stage('store_file', name):
+                    geodata_writer.write(batch)
+                geometry_types.update(batch.geom_type.dropna().unique())
+                has_render_height = has_render_height or 'render_height' in batch.columns
+                batch_bounds = geodata_bounds(batch)
+                if batch_bounds and bounds:
+                    bounds = (
+                        *map(min, bounds[:2], batch_bounds[:2]),
+                        *map(max, bounds[2:], batch_bounds[2:]),
+                    )
+                else:
+                    bounds = bounds or batch_bounds
+        except Exception:
+            # Features of a partly read stream are not kept
+            new_map_layer.delete()
+            raise
+
+        def store_file():
+            with profile.stage('store_file', name):
+                geodata_writer.close()
+                new_map_layer.store_geodata_file(geodata_path, save=False)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            stored_file = executor.submit(store_file)
+            save_derived_feature_data(new_map_layer, profile)
+            stored_file.result()
+
+    if not style_options:
+        new_map_layer.default_style = default_styling(geometry_types, has_render_height)
+    if bounds:
+        new_map_layer.bounds = Polygon.from_bbox(bounds)
+    new_map_layer.save()
+    print('\t', 'Done Writing GeoParquet file and features of Map Layer')
+
+    return new_map_layer
+
+
+def geodata_bounds(geodata) -> tuple[float, float, float, float] | None:
+    """Get the bounding box of the geometries of a GeoDataFrame, or None if it has none."""
+    geometries = geodata.geometry.dropna()
+    geometries = geometries[~geometries.is_empty]
+    if not len(geometries):
+        return None
+    return tuple(float(value) for value in geometries.total_bounds)
+
+
+def set_bounds_from_geodata(vector_map_layer: VectorMapLayer, geodata):
+    """Set the bounds of a layer to the bounding box of a GeoDataFrame, without saving."""
+    bounds = geodata_bounds(geodata)
+    if bounds:
+        vector_map_layer.bounds = Polygon.from_bbox(bounds)
+
+
+@contextmanager
+def open_zip_archive(file_item) -> Iterator[Path | None]:
+    """Copy a zip FileItem to a temporary file, yielding its path or None if it is invalid."""
     with tempfile.TemporaryDirectory() as temp_dir:
         archive_path = Path(temp_dir, 'archive.zip')
         logger.warning(f'Opening {file_item.file.name}')
 
         # Write the file content to a temp directory
-        with open(archive_path, 'wb') as archive_file:
-            content = file_item.file.open('rb').read()
-            archive_file.write(content)
+        with open(archive_path, 'wb') as archive_file, file_item.file.open('rb') as content:
+            shutil.copyfileobj(content, archive_file)
 
         # Check the written file size and file type
         if not archive_path.exists() or archive_path.stat().st_size == 0:
             logger.error(f'File {file_item.file.name} is empty or does not exist.')
-            return []
-
+            yield None
         # Ensure it's a valid ZIP file
-        if not file_item.file.name.endswith('.zip'):
+        elif not file_item.file.name.endswith('.zip'):
             logger.error(f'File {file_item.file.name} is not a zip file.')
-            return []
+            yield None
+        else:
+            yield archive_path
 
-        with zipfile.ZipFile(archive_path) as zip_archive:
-            filenames = zip_archive.namelist()
 
-            for filename in filenames:
-                if filename.endswith(('.geojson', '.json')):
-                    if filename.startswith('__MACOSX/') or Path(filename).name.startswith('._'):
-                        logger.info(f'Skipping macOS metadata file: {filename}')
-                        continue
+def read_zip_layers(archive_path, members: list[dict], profile: IngestProfile, layer_count: int):
+    """Yield members of a zip archive in EPSG:4326 as they are read, see read_zip_members."""
+    for member, geodata, seconds in read_zip_members(archive_path, members):
+        logger.info(f'Read {member["kind"]} {member["path"]} in {seconds:.3f}s')
+        profile.add('parse', member['name'], seconds)
+        if geodata is not None:
+            yield {'geojson': geodata, 'name': member['name'], 'layer_count': layer_count}
 
-                    logger.info(f'Processing GeoJSON file: {filename}')
-
-                    with zip_archive.open(filename) as geojson_file:
-                        raw_content = geojson_file.read()
-
-                        # Try decoding with UTF-8 first
-                        for encoding in ('utf-8', 'iso-8859-1', 'windows-1252'):
-                            try:
-                                content = raw_content.decode(encoding).strip()
-                                break  # Stop at the first successful decode
-                            except UnicodeDecodeError:
-                                logger.warning(
-                                    f'Failed to decode {filename} with {encoding}, trying next.'
-                                )
-                        else:
-                            logger.error(
-                                f'Could not decode {filename} with any common encoding, skipping.'
-                            )
-                            continue  # Skip the file if all decoding attempts fail
-
-                        if not content:
-                            logger.error(f'File {filename} is empty!')
-                            continue  # Skip empty files
-
-                        try:
-                            source_data = json.loads(content)
-                        except json.JSONDecodeError as e:
-                            logger.error(f'Error decoding JSON in {filename}: {e}')
-                            continue  # Skip invalid JSON files
-
-                        source_projection = (
-                            source_data.get('crs', {}).get('properties', {}).get('name')
-                        )
-                        geojson_data = geopandas.GeoDataFrame.from_features(
-                            source_data.get('features')
-                        )
-                        if source_projection:
-                            geojson_data = geojson_data.set_crs(
-                                source_projection, allow_override=True
-                            )
-                            geojson_data = geojson_data.to_crs(4326)
-                        geodata_list.append({'geojson': geojson_data, 'name': Path(filename).stem})
-
-            # Group shapefile components by basename
-            shapefile_groups = defaultdict(list)
-            for filename in filenames:
-                base_name = Path(filename).stem
-                for ext in SHAPEFILE_EXTS:
-                    if ext in filename:
-                        shapefile_groups[base_name].append(filename)
-
-            for base_name, files in shapefile_groups.items():
-                try:
-                    shp_file = next((f for f in files if f.endswith('.shp')), None)
-                    dbf_file = next((f for f in files if f.endswith('.dbf')), None)
-                    prj_file = next((f for f in files if f.endswith('.prj')), None)
 
-                    if not shp_file:
-                        logger.warning(f'Shapefile {base_name}.shp not found, skipping.')
-                        continue
-                    if not dbf_file:
-                        logger.warning(f'DBF file {base_name}.dbf is missing, skipping.')
-                        continue
-                    # Create file-like options that can be read
-                    shp_data = zip_archive.open(shp_file)
-                    dbf_data = zip_archive.open(dbf_file)
-                    if prj_file:
-                        prj_data = zip_archive.open(prj_file)
-                    sf = shapefile.Reader(shp=shp_data, dbf=dbf_data)
-                    features = sf.__geo_interface__['features']
-
-                    # Extract geometry and properties
-                    geometries = [
-                        feature['geometry'] for feature in features if feature['geometry']
-                    ]
-
-                    if not geometries:
-                        logger.warning(
-                            f'Shapefile {base_name}.shp has no valid geometries, skipping.'
-                        )
-                        continue
+def convert_zip_to_geojson(file_item, profile: IngestProfile | None = None):
+    """Yield the GeoJSON files and shapefiles of a zip FileItem in EPSG:4326 as they are read.
 
-                    # Create GeoDataFrame
-                    features = sf.__geo_interface__['features']
-                    geodata = geopandas.GeoDataFrame.from_features(features)
-                    if prj_data:
-                        source_projection = prj_data.read().decode('utf-8')
-                        geodata = geodata.set_crs(source_projection, allow_override=True)
+    Members are read in parallel, see uvdat.core.tasks.zip_reader, and yielded in the order
+    they complete. Each is yielded with the number of members of the archive read as layers.
+    """
+    profile = profile or IngestProfile()
+    with open_zip_archive(file_item) as archive_path:
+        if archive_path is None:
+            return
+        members = zip_layer_members(archive_path)
+        yield from read_zip_layers(archive_path, members, profile, len(members))
+
+
+def create_vector_maps_from_zip(
+    file_item,
+    style_options,
+    name='',
+    index=None,
+    metadata=None,
+    profile: IngestProfile | None = None,
+):
+    """Create the VectorMapLayers of a zip FileItem with their features and bounds.
+
+    GeoJSON members are streamed from the archive in batches, see
+    create_vector_map_from_zip_member, and shapefiles are read in parallel by GDAL.
+    """
+    profile = profile or IngestProfile()
+    new_map_layers = []
+    with open_zip_archive(file_item) as archive_path:
+        if archive_path is None:
+            return new_map_layers
+        members = zip_layer_members(archive_path)
+        # Use the member names only if there is more than one layer created from the archive
+        use_member_names = len(members) > 1
+        for member in members:
+            if member['kind'] == 'geojson':
+                new_map_layer = create_vector_map_from_zip_member(
+                    file_item,
+                    archive_path,
+                    member,
+                    style_options,
+                    member['name'] if use_member_names else name,
+                    index,
+                    metadata,
+                    profile,
+                )
+                if new_map_layer is not None:
+                    new_map_layers.append(new_map_layer)
+
+        shapefiles = [member for member in members if member['kind'] == 'shapefile']
+        for data in read_zip_layers(archive_path, shapefiles, profile, len(members)):
+            new_map_layers.append(
+                create_vector_map_from_json(
+                    file_item,
+                    data['geojson'],
+                    style_options,
+                    data['name'] if use_member_names else name,
+                    index,
+                    metadata,
+                    save_features=True,
+                    profile=profile,
+                )
+            )
+    return new_map_layers
 
-                    # Convert to WGS84
-                    geodata = geodata.to_crs(4326)
-                    shp_data.close()
-                    dbf_data.close()
-                    if prj_data:
-                        prj_data.close
-                    geodata_list.append({'geojson': geodata, 'name': base_name})
 
-                except Exception as e:
-                    logger.error(f'Error processing shapefile group {base_name}: {e}')
+def create_vector_map_from_zip_member(
+    file_item,
+    archive_path: Path,
+    member: dict,
+    style_options,
+    name='',
+    index=None,
+    metadata=None,
+    profile: IngestProfile | None = None,
+):
+    """Stream a GeoJSON member of a zip archive into a layer, see create_vector_map_from_stream.
 
-    return geodata_list
+    Encodings are tried in order, UTF-8 first. The layer of a member that fails to decode
+    is deleted before the next encoding is tried. Returns None if it cannot be read.
+    """
+    for encoding in GEOJSON_ENCODINGS:
+        batches = geojson_member_batches(archive_path, member['path'], encoding)
+        try:
+            return create_vector_map_from_stream(
+                file_item, batches, style_options, name, index, metadata, profile
+            )
+        except (UnicodeDecodeError, ijson.JSONError) as e:
+            logger.warning(f'Failed to parse {member["path"]} with {encoding}, trying next: {e}')
+        except ValueError as e:
+            logger.error(f'Error reading {member["path"]}: {e}')
+            return None
+    logger.error(f'Could not parse {member["path"]} with any common encoding, skipping.')
+    return None
 
 
-def convert_csv_to_geojson(file_item):
+def csv_batches(file_item, chunk_size: int = CSV_CHUNK_SIZE):
+    """Return an iterator of GeoDataFrames parsed from chunks of a CSV FileItem."""
     if not file_item.metadata:
         raise ValueError('CSV file does not have metadata to describe its contents')
 
-    file_metadata = file_item.metadata
-    parse_row = get_csv_row_parser(file_metadata)
+    parse_frame = get_csv_frame_parser(file_item.metadata)
 
-    frame_dict = defaultdict(list)
+    def parse_chunks():
+        with file_item.file.open('rb') as csv_file:
+            for chunk in pandas.read_csv(csv_file, chunksize=chunk_size):
+                yield parse_frame(chunk)
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        csv_path = Path(temp_dir, 'csv.csv')
-        with open(csv_path, 'wb') as csv_file:
-            content = file_item.file.open().read()
-            csv_file.write(content)
-
-        df = pandas.read_csv(csv_path)
-
-        for _, row in df.iterrows():
-            geom, properties = parse_row(row)
-            frame_dict['geometry'].append(geom)
-            for propkey, propval in properties.items():
-                # Rename "geometry" property to avoid conflict with GeoDataFrame's "geometry" column
-                if propkey == 'geometry':
-                    propkey = 'geometry_property'
-                frame_dict[propkey].append(propval)
-
-    return geopandas.GeoDataFrame(frame_dict, crs='EPSG:4326')
-
-
-def save_vector_features(vector_map_layer: VectorMapLayer):
-    features = vector_map_layer.read_geojson_data()['features']
-    vector_features = []
-    for feature in features:
-        geometry = GEOSGeometry(json.dumps(feature['geometry']))
-
-        # Check if the feature is a MultiLineString
-        if geometry.geom_type == 'MultiLineString':
-            # Check if the geometry is 3D (has Z-coordinates)
-            if geometry.hasz:
-                # Convert to 2D by flattening Z-coordinates
-                new_lines = []
-                for line in geometry:
-                    if isinstance(line, LineString) and line.hasz:
-                        new_lines.append(LineString([(x, y) for x, y, z in line.coords]))
-                    else:
-                        new_lines.append(line)  # Preserve 2D LineStrings
-
-                # Replace the geometry with the new 2D MultiLineString
-                geometry = MultiLineString(new_lines)
-        vector_features.append(
-            VectorFeature(
-                map_layer=vector_map_layer,
-                geometry=geometry,
-                properties=feature['properties'],
+    return parse_chunks()
+
+
+def convert_csv_to_geojson(file_item):
+    frames = list(csv_batches(file_item))
+    if not frames:
+        return geopandas.GeoDataFrame(geometry=geopandas.GeoSeries([]), crs='EPSG:4326')
+    return pandas.concat(frames)
+
+
+def json_property_value(value):
+    """Serialize property values json.dumps does not, dates as ISO strings."""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, numpy.generic):
+        return value.item()
+    return str(value)
+
+
+def feature_properties_json(geodata) -> list[str]:
+    """Serialize the properties of each feature of a GeoDataFrame as a JSON object.
+
+    Missing and infinite values become null. Floats keep their full precision, which
+    pandas' to_json rounds.
+    """
+    properties = pandas.DataFrame(geodata.drop(columns=geodata.geometry.name))
+    if not len(properties.columns):
+        return ['{}'] * len(properties)
+    present = properties.notna()
+    numbers = properties.select_dtypes('number')
+    present[numbers.columns] &= ~numbers.isin([numpy.inf, -numpy.inf])
+    records = properties.astype(object).where(present, None).to_dict('records')
+    return [json.dumps(record, default=json_property_value) for record in records]
+
+
+def copy_vector_features(vector_map_layer: VectorMapLayer, geodata) -> int:
+    """Load the features of a GeoDataFrame into the database with COPY, in batches.
+
+    Geometries are flattened to 2D and written as hex EWKB, and properties as JSON, each
+    serialized for a whole batch at once. Returns the number of features loaded.
+    """
+    geometries = geodata.geometry
+    present = geometries.notna() & ~geometries.is_empty
+    if not present.all():
+        logger.warning(f'Skipping {(~present).sum()} features without geometry')
+        geodata = geodata[present]
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(geodata), COPY_BATCH_SIZE):
+            batch = geodata.iloc[start : start + COPY_BATCH_SIZE]
+            geometry = shapely.set_srid(shapely.force_2d(batch.geometry.to_numpy()), 4326)
+            rows = pandas.DataFrame(
+                {
+                    'map_layer_id': vector_map_layer.pk,
+                    'geometry': shapely.to_wkb(geometry, hex=True, include_srid=True),
+                    'properties': feature_properties_json(batch),
+                }
             )
-        )
+            buffer = io.StringIO()
+            rows.to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            cursor.cursor.copy_expert(COPY_VECTOR_FEATURES_SQL, buffer)
+    return len(geodata)
+
 
-    created = VectorFeature.objects.bulk_create(vector_features)
+@contextmanager
+def deferred_vector_feature_indexes():
+    """Drop the spatial and GIN indexes of features, recreating them on exit.
 
-    return created
+    Building these indexes once is faster than maintaining them through a very large initial
+    load. The indexes are dropped and recreated in the transaction of the load, so a failed
+    load restores them along with the features, and other queries of features wait for the
+    load to complete. Search indexes of layers are kept.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(DEFERRABLE_INDEXES_SQL, {'tables': DEFERRED_INDEX_TABLES})
+            indexes = cursor.fetchall()
+            for name, definition in indexes:
+                logger.info(f'Deferring index {name}: {definition}')
+                cursor.execute(f'DROP INDEX IF EXISTS {connection.ops.quote_name(name)}')
+        yield
+        with connection.cursor() as cursor:
+            for name, definition in indexes:
+                logger.info(f'Building index {name}')
+                cursor.execute(definition)
+
+
+def save_vector_features(
+    vector_map_layer: VectorMapLayer, geodata=None, profile: IngestProfile | None = None
+) -> int:
+    """Save the features of a layer, from a GeoDataFrame if given or its stored file.
+
+    The stored file is read in batches. Returns the number of features saved.
+    """
+    profile = profile or IngestProfile()
+    batches = [geodata] if geodata is not None else vector_map_layer.iter_geodata()
+    count = 0
+    for batch in batches:
+        with profile.stage('features', vector_map_layer.name):
+            count += copy_vector_features(vector_map_layer, batch)
+    save_derived_feature_data(vector_map_layer, profile)
+
+    return count
+
+
+def save_derived_feature_data(
+    vector_map_layer: VectorMapLayer, profile: IngestProfile | None = None
+):
+    """Derive the centroids, search text, subdivisions and property summary of features."""
+    profile = profile or IngestProfile()
+    vector_map_layer.features_changed()
+    with profile.stage('derived_data', vector_map_layer.name):
+        vector_map_layer.update_feature_centroids()
+        if vector_map_layer.search_fields:
+            vector_map_layer.update_search_text()
+        vector_map_layer.subdivide_features()
+        update_property_summary(vector_map_layer)
+
+
+def list_geopackage_layers(gpkg_file) -> tuple[list[str], list[str]]:
+    """List the vector layers and raster subdatasets of a GeoPackage."""
+    vector_layers = []
+    raster_layers = []
+    try:
+        # Attribute tables without geometries are not map layers
+        vector_layers = [
+            layer for layer, geometry_type in pyogrio.list_layers(gpkg_file) if geometry_type
+        ]
+        logger.warning(f'Vector layers found: {vector_layers}')
+    except pyogrio.errors.DataSourceError as e:
+        logger.warning('GeoPackage file may not contain vector layers')
+        logger.warning(
+            'Logging information, if geopackage file does not contain vector layers this is not an error'
+        )
+        logger.warning(f'File Being Processed: {gpkg_file} - Returned Value: {e}')
+    try:
+        with rasterio.open(gpkg_file) as source:
+            raster_layers = list(source.subdatasets)
+    except RasterioIOError as e:
+        logger.warning('GeoPackage file may not contain raster layers')
+        logger.warning(
+            'Logging information, if geopackage file does not contain raster layers this is not an error'
+        )
+        logger.warning(f'File Being Processed: {gpkg_file} - Returned Value: {e}')
+    return vector_layers, raster_layers
+
+
+def read_geopackage_vector_layer(gpkg_file, layer: str) -> geopandas.GeoDataFrame:
+    # Read as Arrow columns, without building a feature per row
+    geodata = pyogrio.read_dataframe(gpkg_file, layer=layer, use_arrow=True)
+    if geodata.crs is not None:
+        geodata = geodata.to_crs(4326)
+    return geodata
+
+
+def convert_geopackage_raster(subdataset: str, output_tiff: Path) -> Path:
+    # Written straight to a tiled COG with overviews, in one pass
+    subprocess.run(
+        [
+            'gdal_translate',
+            '-of',
+            'COG',
+            '-co',
+            'COMPRESS=LZW',
+            '-co',
+            'BIGTIFF=IF_SAFER',
+            '-co',
+            'NUM_THREADS=ALL_CPUS',
+            subdataset,
+            str(output_tiff),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return output_tiff
 
 
 def process_geopackage(file_item, style_options):
+    """Create the vector and raster map layers of a GeoPackage FileItem.
+
+    Layers are read in parallel, vector layers into frames and raster subdatasets into
+    COGs, and their map layers are created in this thread as they complete.
+    """
     raster_map_layers = []
     vector_map_layers = []
     with tempfile.TemporaryDirectory() as temp_dir:
         gpkg_file = Path(temp_dir, 'raw.gpkg')
-        with open(gpkg_file, 'wb') as raw_data:
-            with file_item.file.open('rb') as raw_data_archive:
-                raw_data.write(raw_data_archive.read())
-        # Create a temporary directory to store the exported files
-        index = 0
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            try:
-                with fiona.Env():  # Context manager to handle GDAL and Fiona environment properly
-                    layers = fiona.listlayers(gpkg_file)
-                    logger.warning(f'Vector layers found: {layers}')
-                    for layer in layers:
-                        # Open each layer
-                        with fiona.open(gpkg_file, layer=layer) as layer_src:
-                            output_geojson = os.path.join(tmp_dir, f'{layer}.geojson')
-
-                            # Write layer to GeoJSON
-                            with fiona.open(
-                                output_geojson,
-                                'w',
-                                driver='GeoJSON',
-                                crs=layer_src.crs,
-                                schema=layer_src.schema,
-                            ) as dst:
-                                for feature in layer_src:
-                                    dst.write(feature)
-
-                            with open(output_geojson, 'r') as geojson_file:
-                                data = geojson_file.read()
-                                source_data = json.loads(data)
-                                source_projection = (
-                                    source_data.get('crs', {}).get('properties', {}).get('name')
-                                )
-                                geojson_data = geopandas.GeoDataFrame.from_features(
-                                    source_data.get('features')
-                                )
-                                if source_projection:
-                                    geojson_data = geojson_data.set_crs(source_projection)
-                                    geojson_data = geojson_data.to_crs(4326)
-                                new_vector_layer = create_vector_map_from_json(
-                                    file_item, geojson_data, style_options, layer, index
-                                )
-                                save_vector_features(new_vector_layer)
-                                vector_map_layers.append(new_vector_layer)
-                                index += 1
-            except fiona.errors.DriverError as e:
-                logger.warning('GeoPackage file may not contain vector layers')
-                logger.warning(
-                    'Logging information, if geopackage file does not contain vector layers this is not an error'
-                )
-                logger.warning(f'File Being Processed: {gpkg_file} - Returned Value: {e}')
-
-            # List the raster layers using gdalinfo
-            # sometimes gdalino will fail if the geopackage only contains vectors
-            try:
-                gdal_info_output = subprocess.check_output(['gdalinfo', gpkg_file]).decode()
-
-                for line in gdal_info_output.splitlines():
-                    if 'SUBDATASET_' in line and '_NAME=' in line:
-                        raster_layer = line.split('=')[-1]  # Get the full name of the raster layer
-                        base_layer_name = raster_layer.split(':')[-1]
-                        output_tiff = os.path.join(tmp_dir, f'{base_layer_name}.tif')
-
-                        # Convert raster layer to TIFF using gdal_translate
-                        subprocess.run(
-                            ['gdal_translate', '-of', 'GTiff', raster_layer, output_tiff]
-                        )
-
-                        # Save the TIFF content to the RasterMapLayer's cloud_optimized_geotiff
-                        raster_map_layer = create_raster_map_layer_from_file(
-                            file_item, output_tiff, style_options, base_layer_name, index
-                        )
-                        raster_map_layers.append(raster_map_layer)
-                        index += 1
-            except subprocess.CalledProcessError as e:
-                logger.warning('GeoPackage file may not contain raster layers')
-                logger.warning(
-                    'Logging information, if geopackage file does not contain raster layers this is not an error'
+        with open(gpkg_file, 'wb') as raw_data, file_item.file.open('rb') as raw_data_archive:
+            shutil.copyfileobj(raw_data_archive, raw_data)
+        vector_layers, raster_layers = list_geopackage_layers(gpkg_file)
+
+        with ThreadPoolExecutor(max_workers=GEOPACKAGE_WORKERS) as executor:
+            futures = {}
+            for index, layer in enumerate(vector_layers):
+                future = executor.submit(read_geopackage_vector_layer, gpkg_file, layer)
+                futures[future] = ('vector', layer, index)
+            for index, raster_layer in enumerate(raster_layers, start=len(vector_layers)):
+                # Layer names of subdatasets may repeat, so files are named by index
+                output_tiff = Path(temp_dir, f'{index}.tif')
+                future = executor.submit(convert_geopackage_raster, raster_layer, output_tiff)
+                futures[future] = ('raster', raster_layer.split(':')[-1], index)
+
+            for future in as_completed(futures):
+                layer_type, layer_name, index = futures[future]
+                if layer_type == 'vector':
+                    try:
+                        geodata = future.result()
+                    except Exception as e:
+                        # The file's other layers are still ingested
+                        logger.warning(f'Could not read vector layer {layer_name}: {e}')
+                        continue
+                    new_vector_layer = create_vector_map_from_json(
+                        file_item,
+                        geodata,
+                        style_options,
+                        layer_name,
+                        index,
+                        save_features=True,
+                    )
+                    vector_map_layers.append(new_vector_layer)
+                    continue
+                try:
+                    output_tiff = future.result()
+                except subprocess.CalledProcessError as e:
+                    logger.warning(f'Could not convert raster layer {layer_name}: {e.stderr}')
+                    continue
+                raster_map_layer = create_raster_map_layer_from_file(
+                    file_item,
+                    output_tiff,
+                    style_options,
+                    layer_name,
+                    index,
+                    cloud_optimized=True,
                 )
-                logger.warning(f'File Being Processed: {gpkg_file} - Returned Value: {e}')
+                raster_map_layers.append(raster_map_layer)
+
+    raster_map_layers.sort(key=lambda layer: layer.index)
+    vector_map_layers.sort(key=lambda layer: layer.index)
     return raster_map_layers, vector_map_layers
 
 
@@ -658,23 +1087,35 @@ def process_tabular_vector_feature_data(map_layer_id, json_data, matcher):
             )
         # Create a new VectorFeatureTableData object
         for table in table_list:
+            columns = table.get('header', [])  # Use 'header' for columns
+            x_column = table.get('xColumn') or default_x_column(columns)
             table_data = VectorFeatureTableData.objects.create(
                 vector_feature=feature,
                 map_layer=feature.map_layer,
                 name=table.get('name', 'Unnamed Table'),
                 type=table.get('type', 'Unknown'),
                 description=table.get('description', ''),
-                columns=table.get('header', []),  # Use 'header' for columns
+                columns=columns,
                 summary=table.get('summary', {}),
+                x_column=x_column,
             )
 
             # Process rows and create VectorFeatureRowData objects
             rows = table.get('rows', [])
+            x_index = columns.index(x_column) if x_column in columns else None
             VectorFeatureRowData.objects.bulk_create(
                 [
                     VectorFeatureRowData(
-                        vector_feature_table=table_data, row_data=row  # Store the row JSON data
+                        vector_feature_table=table_data,
+                        row_data=row,  # Store the row JSON data
+                        x_value=(
+                            to_step_value(row[x_index])
+                            if x_index is not None and len(row) > x_index
+                            else None
+                        ),
                     )
                     for row in rows
                 ]
             )
+    # Time-sliced tiles of the layer are drawn from its row data
+    VectorMapLayer.objects.get(pk=map_layer_id).features_changed()
@@ -4,7 +4,6 @@ from typing import List, Literal, Optional
 
 from celery import shared_task
 from django.core.files.base import ContentFile
-import geopandas as gpd
 import pandas as pd
 
 from uvdat.core.models import Dataset, FileItem, VectorMapLayer
@@ -53,17 +52,15 @@ def merge_vector_layer_data(
     try:
         # Load the base layer GeoDataFrame
         base_layer = VectorMapLayer.objects.get(id=base_layer_id)
-        base_gdf = gpd.GeoDataFrame.from_features(
-            base_layer.read_geojson_data().get('features', [])
-        )
+        base_gdf = base_layer.read_geodata()
+        # Only features within the extent of the base layer can overlap its features
+        base_bbox = tuple(base_gdf.total_bounds) if pd.notna(base_gdf.total_bounds).all() else None
 
         # Load the secondary layers and store their properties
         other_gdfs = []
         for layer_id in other_layer_ids:
             layer = VectorMapLayer.objects.get(id=layer_id)
-            layer_gdf = gpd.GeoDataFrame.from_features(
-                layer.read_geojson_data().get('features', [])
-            )
+            layer_gdf = layer.read_geodata(bbox=base_bbox)
             other_gdfs.append(layer_gdf)
 
         if not other_gdfs:
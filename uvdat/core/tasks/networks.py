@@ -7,6 +7,7 @@ import numpy
 import shapely
 
 from uvdat.core.models import Network, NetworkEdge, NetworkNode, VectorFeature, VectorMapLayer
+from uvdat.core.tasks.map_layers import save_derived_feature_data
 
 NODE_RECOVERY_MODES = [
     'random',
@@ -32,8 +33,7 @@ def create_network(vector_map_layer, network_options):
     connection_column_delimiter = network_options.get('connection_column_delimiter')
     node_id_column = network_options.get('node_id_column')
 
-    source_data = vector_map_layer.read_geojson_data()
-    geodata = geopandas.GeoDataFrame.from_features(source_data.get('features')).set_crs(4326)
+    geodata = vector_map_layer.read_geodata()
     geodata[connection_column].fillna('', inplace=True)
     edge_set = geodata[geodata.geom_type != 'Point']
     node_set = geodata[geodata.geom_type == 'Point']
@@ -240,6 +240,7 @@ def create_vector_features_from_network(network):
             for edge in network.edges.all()
         ]
     )
+    save_derived_feature_data(map_layer)
 
 
 def get_network_graph(network):
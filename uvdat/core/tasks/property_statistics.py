@@ -0,0 +1,321 @@
+import math
+
+from django.db import connection
+import numpy as np
+
+from uvdat.celery import app
+from uvdat.core.models import ProcessingTask
+
+# Values Python's float() accepts, other than nan/inf spellings. Exponents are bounded so
+# the values can be cast to numeric, values out of the double precision range are then left
+# out as non-numeric
+NUMERIC_PATTERN = r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d{1,3})?\s*$'
+
+# Approximate statistics aggregate a sample of about this many features
+APPROXIMATE_SAMPLE_SIZE = 100_000
+MAX_APPROXIMATE_SAMPLE_SIZE = 1_000_000
+# Sampled ids are looked up in the primary key index, at most this many per query
+MAX_SAMPLE_IDS = 2_000_000
+# A fixed seed keeps repeated approximate requests consistent
+SAMPLE_SEED = 0
+SAMPLE_SQL = 'AND vf.id = ANY(%(sample_ids)s)'
+
+# The layer's id range, from its summary while that is current
+LAYER_ID_RANGE_SQL = """
+    SELECT
+        (property_summary ->> 'feature_count')::bigint,
+        (property_summary ->> 'min_feature_id')::bigint,
+        (property_summary ->> 'max_feature_id')::bigint
+    FROM core_vectormaplayer
+    WHERE id = %(map_layer_id)s
+    AND (property_summary ->> 'data_version')::integer = data_version
+"""
+FEATURE_ID_RANGE_SQL = """
+    SELECT count(*), min(id), max(id)
+    FROM core_vectorfeature
+    WHERE map_layer_id = %(map_layer_id)s
+"""
+
+# Features of a layer, optionally within a bbox. Large features are tested through their
+# subdivided pieces, and the && test lets the GIST index select candidates first
+FEATURES_SQL = """
+    SELECT vf.properties
+    FROM core_vectorfeature vf
+    WHERE vf.map_layer_id = %(map_layer_id)s
+    {sample}
+"""
+FEATURES_BBOX_SQL = """
+    AND vf.geometry && ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 4326)
+    AND CASE
+        WHEN EXISTS (
+            SELECT 1 FROM core_vectorfeaturesubdivision piece
+            WHERE piece.vector_feature_id = vf.id
+        ) THEN EXISTS (
+            SELECT 1 FROM core_vectorfeaturesubdivision piece
+            WHERE piece.vector_feature_id = vf.id
+            AND ST_Intersects(
+                piece.geometry, ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 4326)
+            )
+        )
+        ELSE ST_Intersects(
+            vf.geometry, ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 4326)
+        )
+    END
+"""
+
+PROPERTY_VALUES_SQL = """
+    features AS ({features}),
+    property_values AS (
+        SELECT
+            keys.key,
+            property.value,
+            CASE
+                WHEN abs(property.number) < 1e308
+                AND (property.number = 0 OR abs(property.number) > 1e-307)
+                THEN property.number::double precision
+            END AS number
+        FROM features
+        CROSS JOIN unnest(%(property_keys)s::text[]) AS keys(key)
+        CROSS JOIN LATERAL (
+            SELECT
+                features.properties ->> keys.key AS value,
+                CASE
+                    WHEN (features.properties ->> keys.key) ~ %(numeric_pattern)s
+                    THEN (features.properties ->> keys.key)::numeric
+                END AS number
+        ) AS property
+        WHERE property.value IS NOT NULL
+    )
+"""
+
+NUMERIC_STATISTICS_SQL = """
+    WITH {property_values}
+    SELECT
+        key,
+        count(number),
+        min(number),
+        max(number),
+        avg(number),
+        stddev_pop(number),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY number)
+    FROM property_values
+    GROUP BY key
+"""
+
+# Equal width bins between min and max. width_bucket puts max itself in an extra bucket,
+# numpy includes it in the last bin
+HISTOGRAM_SQL = """
+    WITH {property_values}
+    SELECT
+        LEAST(width_bucket(number, %(min)s, %(max)s, %(bins)s), %(bins)s) AS bucket,
+        count(*)
+    FROM property_values
+    WHERE key = %(key)s AND number IS NOT NULL
+    GROUP BY bucket
+"""
+
+VALUE_COUNTS_SQL = """
+    WITH {property_values}
+    SELECT key, value, count(*)
+    FROM property_values
+    WHERE key = ANY(%(string_keys)s)
+    GROUP BY key, value
+    ORDER BY key, value
+"""
+
+
+def property_values_sql(bbox=None, sample=False) -> str:
+    features = FEATURES_SQL + (FEATURES_BBOX_SQL if bbox else '')
+    return PROPERTY_VALUES_SQL.format(features=features.format(sample=SAMPLE_SQL if sample else ''))
+
+
+def layer_id_range(map_layer_id) -> tuple[int, int | None, int | None]:
+    """Feature count and id range of a layer, from its stored property summary when current."""
+    with connection.cursor() as cursor:
+        cursor.execute(LAYER_ID_RANGE_SQL, {'map_layer_id': map_layer_id})
+        row = cursor.fetchone()
+        if row and row[0] is not None and (row[1] is not None or not row[0]):
+            return row
+        cursor.execute(FEATURE_ID_RANGE_SQL, {'map_layer_id': map_layer_id})
+        return cursor.fetchone()
+
+
+def sample_feature_ids(map_layer_id, sample_size=APPROXIMATE_SAMPLE_SIZE):
+    """Random ids in the layer's id range, selecting about `sample_size` of its features.
+
+    Features are inserted in bulk, so a layer's ids are mostly dense within its range, and
+    enough ids are drawn for the density of the range. Returns the ids, or None when the
+    layer is small enough to aggregate whole, and the fraction of the layer they select.
+    """
+    feature_count, min_id, max_id = layer_id_range(map_layer_id)
+    if not feature_count or feature_count <= sample_size:
+        return None, 1.0
+    id_count = max_id - min_id + 1
+    size = min(id_count, MAX_SAMPLE_IDS, math.ceil(sample_size * id_count / feature_count))
+    ids = min_id + np.random.default_rng(SAMPLE_SEED).choice(id_count, size, replace=False)
+    return sorted(ids.tolist()), size / id_count
+
+
+def proportion_standard_error(counts, size, fraction) -> float:
+    """Largest standard error of the proportions in `counts`, estimated from a sample."""
+    if size <= 1:
+        return None
+    correction = math.sqrt(1 - fraction)
+    return max(math.sqrt(count / size * (1 - count / size) / size) * correction for count in counts)
+
+
+def histogram(cursor, sql, params, key, bins, count, min_value, max_value):
+    """Histogram counts and edges matching numpy's, counted by the database."""
+    counts = [0] * bins
+    if min_value == max_value:
+        # numpy widens an empty range by 0.5 on each side, the values land in the middle bin
+        counts[bins // 2] = count
+        return counts, np.linspace(min_value - 0.5, max_value + 0.5, bins + 1).tolist()
+
+    cursor.execute(
+        HISTOGRAM_SQL.format(property_values=sql),
+        {**params, 'key': key, 'min': min_value, 'max': max_value, 'bins': bins},
+    )
+    for bucket, bucket_count in cursor.fetchall():
+        counts[bucket - 1] = bucket_count
+    return counts, np.linspace(min_value, max_value, bins + 1).tolist()
+
+
+def compute_property_statistics(
+    map_layer_id,
+    property_keys,
+    bins=10,
+    bbox=None,
+    approximate=False,
+    sample_size=APPROXIMATE_SAMPLE_SIZE,
+):
+    """Numeric statistics and histograms, or string value counts, per property key.
+
+    Only aggregates leave the database. Returns None when no features match.
+
+    Approximate statistics are aggregated over a random sample of about `sample_size` of
+    the layer's features, so they take about as long for any layer size. Each key then
+    reports its sample size and the standard errors of its estimates. Values are aggregated
+    whole when the sample holds none of them, e.g. within a small bbox.
+    """
+    params = {
+        'map_layer_id': map_layer_id,
+        'property_keys': list(property_keys),
+        'numeric_pattern': NUMERIC_PATTERN,
+    }
+    if bbox:
+        params.update(zip(['xmin', 'ymin', 'xmax', 'ymax'], bbox))
+
+    sample_ids, fraction = (
+        sample_feature_ids(map_layer_id, sample_size) if approximate else (None, 1.0)
+    )
+    # Small layers are cheap to aggregate exactly
+    params['sample_ids'] = sample_ids
+    sql = property_values_sql(bbox, sample=sample_ids is not None)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT EXISTS ('
+            + (FEATURES_SQL + (FEATURES_BBOX_SQL if bbox else '')).format(sample='')
+            + ')',
+            params,
+        )
+        if not cursor.fetchone()[0]:
+            return None
+
+        cursor.execute(NUMERIC_STATISTICS_SQL.format(property_values=sql), params)
+        numeric_rows = cursor.fetchall()
+        if not numeric_rows and sample_ids is not None:
+            # The sample can miss every feature of a bbox or holding the keys, their values
+            # are aggregated whole
+            sample_ids, fraction = None, 1.0
+            params['sample_ids'] = None
+            sql = property_values_sql(bbox)
+            cursor.execute(NUMERIC_STATISTICS_SQL.format(property_values=sql), params)
+            numeric_rows = cursor.fetchall()
+
+        final_result = {}
+        string_keys = []
+        for key, count, min_value, max_value, mean, std_dev, median in numeric_rows:
+            if not count:
+                string_keys.append(key)
+                continue
+            counts, bin_edges = histogram(
+                cursor, sql, params, key, bins, count, min_value, max_value
+            )
+            final_result[key] = {
+                'type': 'number',
+                'mean': mean,
+                'min': min_value,
+                'max': max_value,
+                'median': median,
+                'std_dev': std_dev,
+                'histogram': {
+                    'bins': bins,
+                    'bin_edges': bin_edges,
+                    'counts': counts,
+                },
+            }
+            if approximate:
+                correction = math.sqrt(1 - fraction)
+                final_result[key]['sample'] = {
+                    'size': count,
+                    'fraction': fraction,
+                    'standard_error': {
+                        'mean': std_dev / math.sqrt(count) * correction,
+                        # Normal approximation of the sampling error of the median
+                        'median': math.sqrt(math.pi / 2) * std_dev / math.sqrt(count) * correction,
+                        'bin_proportion': proportion_standard_error(counts, count, fraction),
+                    },
+                }
+
+        if string_keys:
+            cursor.execute(
+                VALUE_COUNTS_SQL.format(property_values=sql), {**params, 'string_keys': string_keys}
+            )
+            for key, value, count in cursor.fetchall():
+                if key not in final_result:
+                    final_result[key] = {'type': 'string', 'unique_values': 0, 'values': []}
+                final_result[key]['unique_values'] += 1
+                final_result[key]['values'].append({'value': value, 'count': count})
+
+            if approximate:
+                for key in string_keys:
+                    if key not in final_result:
+                        continue
+                    value_counts = [item['count'] for item in final_result[key]['values']]
+                    size = sum(value_counts)
+                    final_result[key]['sample'] = {
+                        'size': size,
+                        'fraction': fraction,
+                        'standard_error': {
+                            'value_proportion': proportion_standard_error(
+                                value_counts, size, fraction
+                            ),
+                        },
+                    }
+
+    # Keep the order the keys were requested in
+    return {key: final_result[key] for key in property_keys if key in final_result}
+
+
+@app.task(bind=True)
+def compute_exact_property_statistics(self, map_layer_id, property_keys, bins=10, bbox=None):
+    """Compute exact statistics in the background, e.g. after approximate ones were shown."""
+    processing_task = ProcessingTask.objects.filter(celery_id=self.request.id)
+    processing_task.update(status=ProcessingTask.Status.RUNNING)
+    try:
+        statistics = compute_property_statistics(map_layer_id, property_keys, bins, bbox)
+    except Exception as e:
+        processing_task.update(status=ProcessingTask.Status.ERROR, error=str(e))
+        raise e
+    processing_task.update(
+        status=ProcessingTask.Status.COMPLETE,
+        output_metadata={
+            'vector_map_layer': map_layer_id,
+            'property_keys': property_keys,
+            'bins': bins,
+            'bbox': bbox,
+            'statistics': statistics,
+        },
+    )
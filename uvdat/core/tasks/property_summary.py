@@ -0,0 +1,228 @@
+from django.core.cache import cache
+from django.db import connection
+
+from uvdat.celery import app
+from uvdat.core.models import VectorMapLayer
+from uvdat.core.tasks.property_statistics import (
+    APPROXIMATE_SAMPLE_SIZE,
+    SAMPLE_SQL,
+    sample_feature_ids,
+)
+
+# Distinct string values kept per property, summaries can be served for limits up to this
+SUMMARY_VALUE_LIMIT = 1000
+SUMMARY_TYPES = {'boolean': 'bool', 'number': 'number', 'string': 'string'}
+# Longer string values are left out of the autocomplete values
+PROPERTY_VALUE_MAX_LENGTH = 256
+# A summary is queued once per data version within this time
+SUMMARY_QUEUED_SECONDS = 60 * 60
+
+PROPERTY_AGGREGATES_SQL = """
+    WITH property_values AS (
+        SELECT p.key, p.value #>> '{{}}' AS value, jsonb_typeof(p.value) AS value_type
+        FROM core_vectorfeature vf
+        CROSS JOIN LATERAL jsonb_each(vf.properties) AS p
+        WHERE vf.map_layer_id = %(map_layer_id)s
+        AND jsonb_typeof(vf.properties) = 'object'
+        {sample}
+    ),
+    first_values AS (
+        SELECT key, array_agg(value ORDER BY value) AS values
+        FROM (
+            SELECT key, value, row_number() OVER (PARTITION BY key ORDER BY value) AS position
+            FROM (
+                SELECT DISTINCT key, value FROM property_values WHERE value_type = 'string'
+            ) AS distinct_values
+        ) AS ranked_values
+        WHERE position <= %(value_limit)s
+        GROUP BY key
+    )
+    SELECT
+        aggregates.key,
+        aggregates.value_type,
+        aggregates.value_count,
+        aggregates.min,
+        aggregates.max,
+        aggregates.unique_count,
+        first_values.values
+    FROM (
+        SELECT
+            key,
+            value_type,
+            count(*) AS value_count,
+            min(CASE WHEN value_type = 'number' THEN value::double precision END) AS min,
+            max(CASE WHEN value_type = 'number' THEN value::double precision END) AS max,
+            count(DISTINCT value) FILTER (WHERE value_type = 'string') AS unique_count
+        FROM property_values
+        WHERE value_type IN ('boolean', 'number', 'string')
+        GROUP BY key, value_type
+    ) AS aggregates
+    LEFT JOIN first_values
+        ON first_values.key = aggregates.key AND aggregates.value_type = 'string'
+"""
+
+# Distinct string values and their feature counts
+PROPERTY_VALUES_SQL = """
+    INSERT INTO core_vectorpropertyvalue (map_layer_id, key, value, count)
+    SELECT %(map_layer_id)s, p.key, p.value #>> '{}', count(*)
+    FROM core_vectorfeature vf
+    CROSS JOIN LATERAL jsonb_each(vf.properties) AS p
+    WHERE vf.map_layer_id = %(map_layer_id)s
+    AND jsonb_typeof(vf.properties) = 'object'
+    AND jsonb_typeof(p.value) = 'string'
+    AND length(p.key) <= %(max_length)s
+    AND length(p.value #>> '{}') <= %(max_length)s
+    GROUP BY p.key, p.value #>> '{}'
+"""
+
+FEATURE_RANGE_SQL = """
+    SELECT count(*), min(id), max(id)
+    FROM core_vectorfeature
+    WHERE map_layer_id = %(map_layer_id)s
+"""
+
+
+def as_json_number(value: float):
+    """Keep whole numbers as ints, as they were in the feature properties."""
+    return int(value) if value is not None and value.is_integer() else value
+
+
+def compute_property_summary(map_layer_id, value_limit=SUMMARY_VALUE_LIMIT, sample_ids=None):
+    """Aggregate the property types and values of a layer's features in the database.
+
+    Only the first `value_limit` distinct string values of each property are aggregated
+    into its list of values. With `sample_ids`, only those features are aggregated, and the
+    counts are those of the sample.
+    """
+    params = {'map_layer_id': map_layer_id, 'value_limit': value_limit, 'sample_ids': sample_ids}
+    sample = SAMPLE_SQL if sample_ids is not None else ''
+    with connection.cursor() as cursor:
+        cursor.execute(FEATURE_RANGE_SQL, params)
+        feature_count, min_feature_id, max_feature_id = cursor.fetchone()
+        cursor.execute(PROPERTY_AGGREGATES_SQL.format(sample=sample), params)
+        rows = cursor.fetchall()
+
+    properties = {}
+    for key, value_type, value_count, min_value, max_value, unique_count, values in rows:
+        aggregate = {'value_count': value_count}
+        if value_type == 'number':
+            aggregate.update(min=as_json_number(min_value), max=as_json_number(max_value))
+        elif value_type == 'string':
+            aggregate.update(unique=unique_count, values=values or [])
+        properties.setdefault(key, {})[value_type] = aggregate
+
+    return {
+        'feature_count': feature_count,
+        'min_feature_id': min_feature_id,
+        'max_feature_id': max_feature_id,
+        'value_limit': value_limit,
+        'properties': properties,
+    }
+
+
+def update_property_values(map_layer_id) -> int:
+    """Rebuild the counts of the layer's distinct string property values."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM core_vectorpropertyvalue WHERE map_layer_id = %s', [map_layer_id]
+        )
+        cursor.execute(
+            PROPERTY_VALUES_SQL,
+            {'map_layer_id': map_layer_id, 'max_length': PROPERTY_VALUE_MAX_LENGTH},
+        )
+        return cursor.rowcount
+
+
+def update_property_summary(map_layer: VectorMapLayer) -> dict:
+    """Aggregate and store the layer's property summary, for its current data version.
+
+    The layer's autocomplete property values are rebuilt along with it.
+    """
+    summary = compute_property_summary(map_layer.pk)
+    # Changes to the features while aggregating leave the summary out of date
+    summary['data_version'] = map_layer.data_version
+    update_property_values(map_layer.pk)
+
+    map_layer.property_summary = summary
+    map_layer.save(update_fields=['property_summary'])
+    return summary
+
+
+def is_current_summary(summary: dict | None, data_version: int) -> bool:
+    """Whether a stored summary was aggregated from the layer's current features."""
+    return bool(summary) and summary.get('data_version') == data_version
+
+
+def format_property_summary(summary: dict, limit: int = 100, fraction: float = None) -> dict:
+    """Build the property-summary response from stored aggregates.
+
+    Summaries of a sample pass its `fraction`, each property then reports its sample size.
+    """
+    output = {}
+    for key, types in sorted(summary['properties'].items()):
+        # Keys holding several value types are reported as their most common type
+        value_type = max(types, key=lambda name: types[name]['value_count'])
+        aggregate = types[value_type]
+        result = {
+            'type': SUMMARY_TYPES[value_type],
+            'value_count': sum(item['value_count'] for item in types.values()),
+        }
+        if value_type == 'number':
+            if result['value_count'] == 1:
+                result['values'] = aggregate['min']
+            elif aggregate['min'] == aggregate['max']:
+                result['static'] = True
+                result['value'] = aggregate['min']
+            else:
+                result['min'] = aggregate['min']
+                result['max'] = aggregate['max']
+        elif value_type == 'string':
+            if aggregate['unique'] >= limit:
+                result['searchable'] = True
+                result['unique'] = aggregate['unique']
+            else:
+                result['values'] = sorted(aggregate['values'])
+        if fraction is not None:
+            result['sample'] = {'size': result['value_count'], 'fraction': fraction}
+        output[key] = result
+    return output
+
+
+def queue_property_summary(map_layer: VectorMapLayer):
+    """Queue the layer's summary to be stored, once per data version."""
+    queued_key = f'property-summary-queued:{map_layer.pk}:{map_layer.data_version}'
+    if cache.add(queued_key, True, SUMMARY_QUEUED_SECONDS):
+        summarize_vector_map_layer.delay(map_layer.pk)
+
+
+def get_property_summary(
+    map_layer: VectorMapLayer,
+    limit: int = 100,
+    approximate: bool = False,
+    sample_size: int = APPROXIMATE_SAMPLE_SIZE,
+) -> dict:
+    """Format the stored summary, or aggregate the features while it is being stored.
+
+    Summaries are stored at ingest. A missing or out of date summary is stored by a
+    background task, and until then every feature is aggregated, or with `approximate` a
+    sample of about `sample_size` features.
+    """
+    if limit > SUMMARY_VALUE_LIMIT:
+        # More distinct values are requested than are stored
+        return format_property_summary(
+            compute_property_summary(map_layer.pk, value_limit=limit), limit
+        )
+    if is_current_summary(map_layer.property_summary, map_layer.data_version):
+        return format_property_summary(map_layer.property_summary, limit)
+
+    queue_property_summary(map_layer)
+    if not approximate:
+        return format_property_summary(compute_property_summary(map_layer.pk), limit)
+    sample_ids, fraction = sample_feature_ids(map_layer.pk, sample_size)
+    summary = compute_property_summary(map_layer.pk, sample_ids=sample_ids)
+    return format_property_summary(summary, limit, fraction if sample_ids is not None else None)
+
+
+@app.task
+def summarize_vector_map_layer(map_layer_id):
+    update_property_summary(VectorMapLayer.objects.get(pk=map_layer_id))
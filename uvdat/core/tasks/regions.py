@@ -78,11 +78,11 @@ def create_derived_region(name: str, context: Context, region_ids: List[int], op
 
 def create_source_regions(vector_map_layer, region_options):
     name_property = region_options.get('name_property')
-    geodata = vector_map_layer.read_geojson_data()
+    geodata = vector_map_layer.read_geodata()
 
     region_count = 0
     new_feature_set = []
-    for feature in geodata['features']:
+    for feature in geodata.iterfeatures(na='drop'):
         properties = feature['properties']
         geometry = feature['geometry']
 
@@ -99,7 +99,7 @@ def create_source_regions(vector_map_layer, region_options):
         # Create region with properties and MultiPolygon
         region = SourceRegion(
             name=name,
-            boundary=GEOSGeometry(str(geometry)),
+            boundary=GEOSGeometry(json.dumps(geometry)),
             metadata=properties,
             dataset=vector_map_layer.dataset,
         )
@@ -119,8 +119,7 @@ def create_source_regions(vector_map_layer, region_options):
         )
 
     # Save updated features to layer
-    new_geodata = geopandas.GeoDataFrame.from_features(new_feature_set).set_crs(3857)
-    new_geodata.to_crs(4326)
-    vector_map_layer.write_geojson_data(new_geodata.to_json())
+    new_geodata = geopandas.GeoDataFrame.from_features(new_feature_set, crs=4326)
+    vector_map_layer.write_geodata(new_geodata)
     vector_map_layer.save()
     print('\t', f'{region_count} regions created.')
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import time
+
+from django.db import connection
+
+from uvdat.celery import app
+from uvdat.core.models import ProcessingTask, VectorMapLayer
+from uvdat.core.models.map_layers import SEARCH_INDEX_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Index definitions by kind. The feature search filters with the same expressions, so the
+# planner can match them to these indexes
+SEARCH_INDEX_DEFINITIONS = {
+    # properties @> '{"key": value}', for boolean and exact number filters
+    'path': 'USING gin (properties jsonb_path_ops)',
+    # Case insensitive substring search, for string filters
+    'text': 'USING gin (upper(properties ->> %(key)s) gin_trgm_ops)',
+    # Range filters and sorting, jsonb orders numbers numerically. The id orders ties for
+    # keyset pagination
+    'sort': 'USING btree ((properties -> %(key)s), id)',
+}
+
+CREATE_SEARCH_INDEX_SQL = """
+    CREATE INDEX {concurrently} IF NOT EXISTS "{name}" ON core_vectorfeature {definition}
+    WHERE map_layer_id = {map_layer_id}
+"""
+
+
+def search_index_name(map_layer_id: int, kind: str, key: str | None = None) -> str:
+    # Property keys can be long or contain any character, names use a digest of them
+    digest = hashlib.md5(key.encode()).hexdigest()[:10] if key else 'properties'
+    return f'{SEARCH_INDEX_PREFIX}{map_layer_id}_{kind}_{digest}'
+
+
+def search_index_keys(map_layer: VectorMapLayer) -> dict[str, set]:
+    """Property keys to index by kind, from the layer's search configuration."""
+    config = (map_layer.default_style or {}).get('searchableVectorFeatureData')
+    if not config:
+        return {}
+
+    # Text search fields are matched through the features' search_text instead
+    keys = {'path': set(), 'text': set(), 'sort': set()}
+
+    display = config.get('display') or {}
+    if display.get('sortable') and display.get('titleKey'):
+        keys['sort'].add(display['titleKey'])
+
+    # Filters are typed by the values the layer's features hold
+    property_types = (map_layer.property_summary or {}).get('properties', {})
+    for key in config.get('configurableFilters') or []:
+        types = property_types.get(key, {})
+        if 'string' in types:
+            keys['text'].add(key)
+        if 'number' in types:
+            keys['sort'].add(key)
+            keys['path'].add(key)
+        if 'boolean' in types:
+            keys['path'].add(key)
+    return keys
+
+
+def search_index_statements(map_layer: VectorMapLayer) -> dict[str, tuple[str, dict]]:
+    statements = {}
+    for kind, keys in search_index_keys(map_layer).items():
+        if kind == 'path':
+            # A single index on the whole properties object serves every key
+            if keys:
+                statements[search_index_name(map_layer.pk, kind)] = (
+                    SEARCH_INDEX_DEFINITIONS[kind],
+                    {},
+                )
+            continue
+        for key in keys:
+            statements[search_index_name(map_layer.pk, kind, key)] = (
+                SEARCH_INDEX_DEFINITIONS[kind],
+                {'key': key},
+            )
+    return statements
+
+
+def sync_search_indexes(map_layer: VectorMapLayer) -> dict:
+    """Create the indexes the layer's search configuration uses and drop the unused ones."""
+    statements = search_index_statements(map_layer)
+    existing = set(map_layer.search_index_names())
+    dropped = sorted(existing - set(statements))
+    map_layer.drop_search_indexes(dropped)
+
+    # Building concurrently keeps feature ingest and edits unblocked, but cannot run in a
+    # transaction
+    concurrently = '' if connection.in_atomic_block else 'CONCURRENTLY'
+    created = {}
+    with connection.cursor() as cursor:
+        for name, (definition, params) in statements.items():
+            if name in existing:
+                continue
+            start = time.perf_counter()
+            try:
+                cursor.execute(
+                    CREATE_SEARCH_INDEX_SQL.format(
+                        concurrently=concurrently,
+                        name=name,
+                        definition=definition,
+                        map_layer_id=int(map_layer.pk),
+                    ),
+                    params,
+                )
+            except Exception:
+                # A failed concurrent build leaves an invalid index behind
+                map_layer.drop_search_indexes([name])
+                raise
+            created[name] = time.perf_counter() - start
+            logger.info(
+                f'Created search index {name} for VectorMapLayer {map_layer.pk} '
+                f'in {created[name]:.2f}s'
+            )
+
+    return {'created': list(created), 'dropped': dropped}
+
+
+@app.task(bind=True)
+def sync_vector_search_indexes(self, map_layer_id):
+    processing_task = ProcessingTask.objects.filter(celery_id=self.request.id)
+    processing_task.update(status=ProcessingTask.Status.RUNNING)
+    try:
+        map_layer = VectorMapLayer.objects.get(pk=map_layer_id)
+        result = sync_search_indexes(map_layer)
+        # The text search fields may have changed as well
+        result['search_text_updated'] = map_layer.update_search_text()
+    except Exception as e:
+        processing_task.update(status=ProcessingTask.Status.ERROR, error=str(e))
+        raise e
+    processing_task.update(
+        status=ProcessingTask.Status.COMPLETE,
+        output_metadata={'vector_map_layer': map_layer_id, **result},
+    )
@@ -62,10 +62,7 @@ def flood_scenario_1(simulation_result_id, network, elevation_data, flood_area):
 
     node_failures = []
     network_nodes = network.nodes.all()
-    flood_geodata = flood_area.read_geojson_data()
-    flood_areas = [
-        shapely.geometry.shape(feature['geometry']) for feature in flood_geodata['features']
-    ]
+    flood_areas = list(flood_area.read_geodata(columns=[]).geometry)
     for network_node in network_nodes:
         node_point = shapely.geometry.Point(*network_node.location)
         if any(flood_area.contains(node_point) for flood_area in flood_areas):
@@ -0,0 +1,653 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import gzip
+from itertools import islice
+import json
+import logging
+import math
+import os
+from pathlib import Path
+import shutil
+import sqlite3
+import tempfile
+import threading
+import uuid
+
+from django.contrib.gis.db.models import Extent
+from django.core.files import File
+from django.db import connection
+
+from uvdat.celery import app
+from uvdat.core.models import ProcessingTask, VectorFeature, VectorMapLayer
+
+logger = logging.getLogger(__name__)
+
+TILE_BOUNDS_SQL = """
+ WITH tile_bounds AS (
+    SELECT ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4326) AS te
+),
+tilenvbounds as (
+    SELECT
+        ST_XMin(te) as xmin,
+        ST_YMin(te) as ymin,
+        ST_XMax(te) as xmax,
+        ST_YMax(te) as ymax,
+        (ST_XMax(te) - ST_XMin(te)) / 4 as segsize
+    FROM tile_bounds
+),
+env as (
+    SELECT ST_Segmentize(
+        ST_MakeEnvelope(
+            xmin,
+            ymin,
+            xmax,
+            ymax,
+            4326
+        ),
+        segsize
+    ) as seg
+    FROM tilenvbounds
+),
+bounds as (
+    SELECT
+        seg as geom,
+        seg::box2d as b2d
+    FROM env
+)"""
+
+# The features of a map layer intersecting the tile. Large features are read from their
+# subdivided pieces near the tile instead, so only local vertices are tested and clipped.
+# {filters} holds property predicates from compile_feature_filters
+TILE_LAYER_GEOMETRY_SQL = """(
+        SELECT vf.id, vf.map_layer_id, vf.properties, vf.geometry
+        FROM core_vectorfeature vf
+        WHERE vf.map_layer_id = %({map_layer_param})s{filters}
+        AND vf.geometry && (SELECT geom from bounds)
+        AND CASE
+            WHEN EXISTS (
+                SELECT 1 FROM core_vectorfeaturesubdivision piece
+                WHERE piece.vector_feature_id = vf.id
+            ) THEN false
+            ELSE ST_Intersects(vf.geometry, (SELECT geom from bounds))
+        END
+        UNION ALL
+        SELECT vf.id, vf.map_layer_id, vf.properties, ST_Union(piece.geometry) as geometry
+        FROM core_vectorfeaturesubdivision piece
+        JOIN core_vectorfeature vf ON vf.id = piece.vector_feature_id
+        WHERE piece.map_layer_id = %({map_layer_param})s{filters}
+        AND ST_Intersects(piece.geometry, (SELECT geom from bounds))
+        GROUP BY vf.id
+    )"""
+
+# A feature CTE for one map layer, all layers of a tile share the bounds CTE above
+LAYER_FEATURES_SQL = (
+    """
+{name} AS (
+    SELECT
+        ST_AsMVTGeom(
+            ST_Transform(geometry, 3857),
+            ST_Transform((SELECT geom from bounds), 3857)
+        ) as geom,
+        map_layer_id,
+        id as vectorfeatureid,
+        {properties} as properties
+    FROM """
+    + TILE_LAYER_GEOMETRY_SQL
+    + """ AS layer_features
+)"""
+)
+
+# Restricts a feature's properties to the keys in an array parameter
+PROPERTY_SUBSET_SQL = """(
+        SELECT COALESCE(jsonb_object_agg(key, value), '{{}}'::jsonb)
+        FROM jsonb_each(properties)
+        WHERE key = ANY(%({properties_param})s)
+    )"""
+
+
+def vector_tile_sql(filters: str = '') -> str:
+    return (
+        TILE_BOUNDS_SQL
+        + ','
+        + LAYER_FEATURES_SQL.format(
+            name='vector_features',
+            properties='properties',
+            map_layer_param='map_layer_id',
+            filters=filters,
+        )
+        + """
+SELECT ST_AsMVT(vector_features.*) AS mvt FROM vector_features
+;
+"""
+    )
+
+
+VECTOR_TILE_SQL = vector_tile_sql()
+
+# Features with the row of a table type at a step; the latest row at or before the step is
+# found through the (vector_feature_table, x_value) index instead of scanning all rows.
+# A feature with several tables of the type uses the first, so it is drawn once
+TABLE_STEP_TILE_SQL = (
+    TILE_BOUNDS_SQL
+    + """,
+vector_features AS (
+    SELECT
+        ST_AsMVTGeom(
+            ST_Transform(vf.geometry, 3857),
+            ST_Transform((SELECT geom from bounds), 3857)
+        ) as geom,
+        vf.map_layer_id,
+        vf.id as vectorfeatureid,
+        vf.properties || jsonb_build_object(
+            'row_value', step_row.value,
+            'row_step', step_row.x_value
+        ) as properties
+    FROM """
+    + TILE_LAYER_GEOMETRY_SQL.format(map_layer_param='map_layer_id', filters='')
+    + """ AS vf
+    JOIN LATERAL (
+        SELECT id, columns
+        FROM core_vectorfeaturetabledata
+        WHERE vector_feature_id = vf.id AND type = %(table_type)s
+        ORDER BY id
+        LIMIT 1
+    ) vft ON true
+    LEFT JOIN LATERAL (
+        SELECT
+            vfrd.x_value,
+            vfrd.row_data -> (
+                SELECT (c.ordinal - 1)::int
+                FROM jsonb_array_elements_text(vft.columns) WITH ORDINALITY AS c(name, ordinal)
+                WHERE c.name = %(value_column)s
+            ) as value
+        FROM core_vectorfeaturerowdata vfrd
+        WHERE vfrd.vector_feature_table_id = vft.id
+        AND vfrd.x_value <= %(step)s
+        ORDER BY vfrd.x_value DESC
+        LIMIT 1
+    ) step_row ON true
+)
+SELECT ST_AsMVT(vector_features.*) AS mvt FROM vector_features
+;
+"""
+)
+
+# Upper limit on the layers combined into a single composite tile
+MAX_COMPOSITE_LAYERS = 50
+TILE_ARCHIVE_FORMATS = ['mbtiles', 'pmtiles']
+# Highest zoom that may be pre-rendered, each zoom level quadruples the tiles to render
+MAX_SEED_ZOOM = 16
+# Web mercator cannot represent the poles, clamp latitudes before computing tile rows
+MAX_LATITUDE = 85.0511287798066
+TILE_ARCHIVE_CACHE_DIR = Path(tempfile.gettempdir(), 'uvdat-tile-archives')
+# Tile batches rendered or queued per rendering thread while seeding
+TILE_BATCHES_PER_WORKER = 2
+
+# Archives are downloaded to the local cache off the request path, one at a time
+_archive_downloads = ThreadPoolExecutor(max_workers=1)
+_archive_downloads_pending: set[Path] = set()
+_archive_downloads_lock = threading.Lock()
+
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def parse_bool_filter(key: str, value) -> bool:
+    """Read a bool filter value, a JSON bool or the strings 'true' and 'false'."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    raise ValueError(f'Invalid bool filter for {key}, expected true or false')
+
+
+def compile_feature_filters(filters: dict | None) -> tuple[str, dict]:
+    """Compile search panel filters into SQL predicates on `vf.properties`.
+
+    Filters map property keys to {'type': 'bool' | 'number' | 'string', 'value': ...}, as
+    in the feature search. Values are passed as parameters, and the predicates use the
+    expressions of the layer's search indexes, see uvdat.core.tasks.search_indexes.
+    Raises ValueError for invalid filters.
+    """
+    if not filters:
+        return '', {}
+    if not isinstance(filters, dict):
+        raise ValueError('filters must be an object of property keys')
+
+    predicates = []
+    params = {}
+    for index, (key, filter_data) in enumerate(sorted(filters.items())):
+        param = f'filter_{index}'
+        filter_type = filter_data.get('type') if isinstance(filter_data, dict) else None
+        value = filter_data.get('value') if isinstance(filter_data, dict) else None
+        params[f'{param}_key'] = key
+
+        if filter_type == 'bool':
+            params[param] = json.dumps({key: parse_bool_filter(key, value)})
+            predicates.append(f'vf.properties @> %({param})s::text::jsonb')
+        elif filter_type == 'number':
+            if isinstance(value, list) and len(value) == 2:
+                try:
+                    minimum, maximum = float(value[0]), float(value[1])
+                except TypeError:
+                    raise ValueError(f'Invalid number filter for {key}')
+                if not (math.isfinite(minimum) and math.isfinite(maximum)):
+                    raise ValueError(f'Invalid number filter for {key}')
+                # jsonb comparisons only match numbers against numbers
+                params[f'{param}_min'] = json.dumps(minimum)
+                params[f'{param}_max'] = json.dumps(maximum)
+                predicates.append(
+                    f'(vf.properties -> %({param}_key)s) >= %({param}_min)s::text::jsonb'
+                    f' AND (vf.properties -> %({param}_key)s) <= %({param}_max)s::text::jsonb'
+                )
+            elif (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and math.isfinite(value)
+            ):
+                params[param] = json.dumps({key: value})
+                predicates.append(f'vf.properties @> %({param})s::text::jsonb')
+            else:
+                raise ValueError(f'Invalid number filter for {key}')
+        elif filter_type == 'string':
+            params[param] = f'%{escape_like(str(value).upper())}%'
+            predicates.append(f'upper(vf.properties ->> %({param}_key)s) LIKE %({param})s')
+        else:
+            raise ValueError(f'Invalid filter type for {key}')
+
+    return ''.join(f'\n        AND {predicate}' for predicate in predicates), params
+
+
+def get_vector_tile(map_layer_id, z, x, y, filters: dict | None = None) -> bytes:
+    """Render a single MVT for a VectorMapLayer using PostGIS.
+
+    Only features matching the optional `filters` are included, see compile_feature_filters.
+    """
+    filter_sql, filter_params = compile_feature_filters(filters)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            vector_tile_sql(filter_sql) if filter_sql else VECTOR_TILE_SQL,
+            {
+                'z': z,
+                'x': x,
+                'y': y,
+                'map_layer_id': map_layer_id,
+                **filter_params,
+            },
+        )
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b''
+
+
+def get_composite_vector_tile(layers, z, x, y) -> bytes:
+    """Render several VectorMapLayers into one MVT with a single statement.
+
+    `layers` is a list of (map_layer_id, property_keys) pairs. When property_keys is None all
+    properties are included. Each map layer becomes a named layer "layer_<id>" in the tile.
+    """
+    params = {'z': z, 'x': x, 'y': y}
+    feature_ctes = []
+    layer_tiles = []
+    for index, (map_layer_id, property_keys) in enumerate(layers):
+        params[f'map_layer_id_{index}'] = map_layer_id
+        params[f'layer_name_{index}'] = f'layer_{map_layer_id}'
+        properties = 'properties'
+        if property_keys is not None:
+            params[f'properties_{index}'] = list(property_keys)
+            properties = PROPERTY_SUBSET_SQL.format(properties_param=f'properties_{index}')
+        feature_ctes.append(
+            LAYER_FEATURES_SQL.format(
+                name=f'layer_features_{index}',
+                properties=properties,
+                map_layer_param=f'map_layer_id_{index}',
+                filters='',
+            )
+        )
+        layer_tiles.append(f"""COALESCE((
+                SELECT ST_AsMVT(layer_features_{index}.*, %(layer_name_{index})s)
+                FROM layer_features_{index}
+            ), ''::bytea)""")
+
+    # Concatenated single-layer MVTs form a valid multi-layer MVT
+    sql = TILE_BOUNDS_SQL + ',' + ','.join(feature_ctes) + '\nSELECT ' + ' || '.join(layer_tiles)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b''
+
+
+def get_table_step_vector_tile(map_layer_id, table_type, value_column, step, z, x, y) -> bytes:
+    """Render an MVT whose features carry the value of a table column at a step.
+
+    Each feature gets the `row_value` and `row_step` of the latest row of its `table_type`
+    table whose x column is at or before `step`. Features with several tables of the type
+    use the first one created.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            TABLE_STEP_TILE_SQL,
+            {
+                'z': z,
+                'x': x,
+                'y': y,
+                'map_layer_id': map_layer_id,
+                'table_type': table_type,
+                'value_column': value_column,
+                'step': step,
+            },
+        )
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b''
+
+
+def lonlat_to_tile(lon: float, lat: float, z: int) -> tuple[int, int]:
+    """Return the x/y of the tile containing a lon/lat at a zoom level."""
+    n = 2**z
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bbox(bbox, min_zoom: int, max_zoom: int):
+    """Yield every (z, x, y) tile covering the (xmin, ymin, xmax, ymax) bbox."""
+    xmin, ymin, xmax, ymax = bbox
+    for z in range(min_zoom, max_zoom + 1):
+        x0, y0 = lonlat_to_tile(xmin, ymax, z)
+        x1, y1 = lonlat_to_tile(xmax, ymin, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+def get_layer_extent(map_layer: VectorMapLayer):
+    if map_layer.bounds:
+        return map_layer.bounds.extent
+    return VectorFeature.objects.filter(map_layer=map_layer).aggregate(Extent('geometry'))[
+        'geometry__extent'
+    ]
+
+
+def _render_tile_batch(map_layer_id, batch):
+    """Render a batch of tiles on this thread's own database connection."""
+    try:
+        rendered = []
+        for z, x, y in batch:
+            tile = get_vector_tile(map_layer_id, z, x, y)
+            if tile:
+                rendered.append((z, x, y, gzip.compress(tile)))
+        return rendered
+    finally:
+        # Each pool thread opens its own connection, close it before the thread is reused
+        connection.close()
+
+
+def render_vector_tiles(map_layer_id, tiles, workers=4, batch_size=256):
+    """Render tiles across a pool of DB connections, yielding gzipped non-empty tiles.
+
+    Batches are taken from the `tiles` iterable as earlier ones complete, with at most
+    TILE_BATCHES_PER_WORKER per worker in flight, so memory does not grow with the number
+    of tiles.
+    """
+    tiles = iter(tiles)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        while True:
+            while len(pending) < workers * TILE_BATCHES_PER_WORKER:
+                batch = list(islice(tiles, batch_size))
+                if not batch:
+                    break
+                pending.add(executor.submit(_render_tile_batch, map_layer_id, batch))
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def write_mbtiles(path, rendered_tiles, metadata: dict) -> int:
+    """Write gzipped tiles into an MBTiles (SQLite) archive. Returns the tile count."""
+    count = 0
+    db = sqlite3.connect(path)
+    try:
+        db.executescript("""
+            CREATE TABLE metadata (name TEXT, value TEXT);
+            CREATE TABLE tiles (
+                zoom_level INTEGER,
+                tile_column INTEGER,
+                tile_row INTEGER,
+                tile_data BLOB
+            );
+            CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+            """)
+        db.executemany(
+            'INSERT INTO metadata (name, value) VALUES (?, ?)',
+            [(key, str(value)) for key, value in metadata.items()],
+        )
+        for z, x, y, data in rendered_tiles:
+            # MBTiles uses TMS row numbering, flipped from XYZ
+            db.execute(
+                'INSERT INTO tiles VALUES (?, ?, ?, ?)',
+                (z, x, (2**z - 1) - y, sqlite3.Binary(data)),
+            )
+            count += 1
+        db.commit()
+    finally:
+        db.close()
+    return count
+
+
+def write_pmtiles(path, rendered_tiles, metadata: dict, min_zoom, max_zoom, bbox) -> int:
+    """Write gzipped tiles into a PMTiles archive. Returns the tile count."""
+    from pmtiles.tile import Compression, TileType, zxy_to_tileid
+    from pmtiles.writer import Writer
+
+    count = 0
+    with open(path, 'wb') as archive:
+        writer = Writer(archive)
+        # The writer clusters out-of-order tiles itself when finalizing
+        for z, x, y, data in rendered_tiles:
+            writer.write_tile(zxy_to_tileid(z, x, y), data)
+            count += 1
+        writer.finalize(
+            {
+                'tile_type': TileType.MVT,
+                'tile_compression': Compression.GZIP,
+                'min_zoom': min_zoom,
+                'max_zoom': max_zoom,
+                'min_lon_e7': int(bbox[0] * 10_000_000),
+                'min_lat_e7': int(bbox[1] * 10_000_000),
+                'max_lon_e7': int(bbox[2] * 10_000_000),
+                'max_lat_e7': int(bbox[3] * 10_000_000),
+                'center_zoom': min_zoom,
+                'center_lon_e7': int((bbox[0] + bbox[2]) / 2 * 10_000_000),
+                'center_lat_e7': int((bbox[1] + bbox[3]) / 2 * 10_000_000),
+            },
+            metadata,
+        )
+    return count
+
+
+def seed_vector_tile_archive(
+    map_layer: VectorMapLayer,
+    min_zoom=0,
+    max_zoom=12,
+    bbox=None,
+    archive_format='mbtiles',
+    workers=4,
+):
+    """Pre-render a VectorMapLayer's tiles and store them as a single archive on the layer."""
+    if archive_format not in TILE_ARCHIVE_FORMATS:
+        raise ValueError(f'Unsupported tile archive format: {archive_format}')
+    bbox = bbox or get_layer_extent(map_layer)
+    if not bbox:
+        raise ValueError(f'VectorMapLayer {map_layer.pk} has no features to render')
+
+    # Archives are only served while the layer's features are those they were rendered from
+    data_version = map_layer.data_version
+    tiles = tiles_in_bbox(bbox, min_zoom, max_zoom)
+    rendered = render_vector_tiles(map_layer.pk, tiles, workers=workers)
+    metadata = {
+        'name': map_layer.name or f'Layer {map_layer.pk}',
+        'format': 'pbf',
+        'minzoom': min_zoom,
+        'maxzoom': max_zoom,
+        'bounds': ','.join(str(v) for v in bbox),
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        archive_path = Path(temp_dir, f'tiles.{archive_format}')
+        if archive_format == 'mbtiles':
+            tile_count = write_mbtiles(archive_path, rendered, metadata)
+        else:
+            tile_count = write_pmtiles(archive_path, rendered, metadata, min_zoom, max_zoom, bbox)
+
+        if map_layer.tile_archive:
+            map_layer.tile_archive.delete(save=False)
+        with open(archive_path, 'rb') as archive_file:
+            map_layer.tile_archive.save(archive_path.name, File(archive_file), save=False)
+
+        map_layer.tile_archive_metadata = {
+            'format': archive_format,
+            'min_zoom': min_zoom,
+            'max_zoom': max_zoom,
+            'bounds': list(bbox),
+            'tile_count': tile_count,
+            'data_version': data_version,
+            # Names the local copies of this archive, see tile_archive_cache_path
+            'archive_id': uuid.uuid4().hex,
+        }
+        # Servers on this host read the archive without downloading it
+        cache_tile_archive(map_layer, archive_path)
+
+    # Only the archive is saved, other fields may have changed while rendering
+    map_layer.save(update_fields=['tile_archive', 'tile_archive_metadata', 'modified'])
+    logger.info(f'Stored {tile_count} tiles for VectorMapLayer {map_layer.pk} in {archive_format}')
+    return tile_count
+
+
+def tile_archive_cache_path(map_layer: VectorMapLayer) -> Path:
+    archive_metadata = map_layer.tile_archive_metadata
+    return Path(
+        TILE_ARCHIVE_CACHE_DIR,
+        f'{map_layer.pk}-{archive_metadata["archive_id"]}.{archive_metadata["format"]}',
+    )
+
+
+def _write_cached_archive(local_path: Path, write):
+    """Write a local archive copy through a temporary file of its own, then move it in place.
+
+    Concurrent writers of the same archive each write their own file, and readers only see
+    complete archives.
+    """
+    TILE_ARCHIVE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=TILE_ARCHIVE_CACHE_DIR, suffix='.partial', delete=False
+    ) as target:
+        try:
+            write(target)
+        except BaseException:
+            os.unlink(target.name)
+            raise
+    os.replace(target.name, local_path)
+
+
+def cache_tile_archive(map_layer: VectorMapLayer, archive_path: Path):
+    """Copy a just written tile archive of the layer into the local archive cache."""
+
+    def write(target):
+        with open(archive_path, 'rb') as source:
+            shutil.copyfileobj(source, target)
+
+    _write_cached_archive(tile_archive_cache_path(map_layer), write)
+
+
+def _download_tile_archive(map_layer: VectorMapLayer, local_path: Path):
+    def write(target):
+        with map_layer.tile_archive.open('rb') as source:
+            shutil.copyfileobj(source, target)
+
+    try:
+        _write_cached_archive(local_path, write)
+    except Exception:
+        logger.exception(f'Could not download the tile archive of VectorMapLayer {map_layer.pk}')
+    finally:
+        with _archive_downloads_lock:
+            _archive_downloads_pending.discard(local_path)
+
+
+def _local_tile_archive(map_layer: VectorMapLayer) -> Path | None:
+    """Return the local copy of the layer's tile archive, or None if it is not local yet.
+
+    A missing copy is downloaded in the background, once per archive, so requests never
+    wait on the download.
+    """
+    local_path = tile_archive_cache_path(map_layer)
+    if local_path.exists():
+        return local_path
+    with _archive_downloads_lock:
+        if local_path not in _archive_downloads_pending:
+            _archive_downloads_pending.add(local_path)
+            _archive_downloads.submit(_download_tile_archive, map_layer, local_path)
+    return None
+
+
+def read_archived_tile(map_layer: VectorMapLayer, z: int, x: int, y: int):
+    """Look up a gzipped tile in the layer's tile archive.
+
+    Returns (covered, data). `covered` is False when the archive does not include the tile's
+    zoom/extent and the tile should be generated live instead. `data` is None for tiles that
+    are covered but contain no features. Archives that are out of date or not yet local do
+    not cover any tile.
+    """
+    archive_metadata = map_layer.tile_archive_metadata or {}
+    if not map_layer.tile_archive or not archive_metadata:
+        return False, None
+    if archive_metadata.get('data_version') != map_layer.data_version:
+        # Rendered from earlier features, or before archives recorded their version
+        return False, None
+    if not archive_metadata['min_zoom'] <= z <= archive_metadata['max_zoom']:
+        return False, None
+    xmin, ymin, xmax, ymax = archive_metadata['bounds']
+    x0, y0 = lonlat_to_tile(xmin, ymax, z)
+    x1, y1 = lonlat_to_tile(xmax, ymin, z)
+    if not (x0 <= x <= x1 and y0 <= y <= y1):
+        return False, None
+
+    archive_path = _local_tile_archive(map_layer)
+    if archive_path is None:
+        return False, None
+    if archive_metadata['format'] == 'pmtiles':
+        from pmtiles.reader import MmapSource, Reader
+
+        with open(archive_path, 'rb') as archive:
+            return True, Reader(MmapSource(archive)).get(z, x, y)
+
+    db = sqlite3.connect(f'file:{archive_path}?mode=ro', uri=True)
+    try:
+        row = db.execute(
+            'SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+            (z, x, (2**z - 1) - y),
+        ).fetchone()
+    finally:
+        db.close()
+    return True, row[0] if row else None
+
+
+@app.task(bind=True)
+def seed_vector_tiles(
+    self, map_layer_id, min_zoom=0, max_zoom=12, bbox=None, archive_format='mbtiles', workers=4
+):
+    processing_task = ProcessingTask.objects.filter(celery_id=self.request.id)
+    processing_task.update(status=ProcessingTask.Status.RUNNING)
+    try:
+        map_layer = VectorMapLayer.objects.get(pk=map_layer_id)
+        tile_count = seed_vector_tile_archive(
+            map_layer, min_zoom, max_zoom, bbox, archive_format, workers
+        )
+    except Exception as e:
+        processing_task.update(status=ProcessingTask.Status.ERROR, error=str(e))
+        raise e
+    processing_task.update(
+        status=ProcessingTask.Status.COMPLETE,
+        output_metadata={'vector_map_layer': map_layer_id, 'tile_count': tile_count},
+    )
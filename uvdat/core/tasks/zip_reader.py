@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import os
+from pathlib import Path, PurePosixPath
+import time
+from typing import Iterator
+import zipfile
+
+import geopandas
+import ijson
+
+from uvdat.core.geodata import GEOJSON_SEQ_EXTS, GeoJSONFeatureReader
+
+logger = logging.getLogger(__name__)
+
+# Archive members are read by up to this many threads
+ZIP_MEMBER_WORKERS = min(os.cpu_count() or 1, 8)
+GEOJSON_EXTS = ['.geojson', '.json', *GEOJSON_SEQ_EXTS]
+# Encodings tried in order for GeoJSON members that are not UTF-8
+GEOJSON_ENCODINGS = ['utf-8', 'iso-8859-1', 'windows-1252']
+
+
+def is_macos_metadata(filename: str) -> bool:
+    return filename.startswith('__MACOSX/') or PurePosixPath(filename).name.startswith('._')
+
+
+def zip_layer_members(archive_path: str | Path) -> list[dict]:
+    """List the GeoJSON files and shapefiles of a zip archive, each read as a layer."""
+    with zipfile.ZipFile(archive_path) as zip_archive:
+        filenames = [name for name in zip_archive.namelist() if not name.endswith('/')]
+    lower_filenames = {filename.lower() for filename in filenames}
+
+    members = []
+    for filename in filenames:
+        if filename.lower().endswith(tuple(GEOJSON_EXTS)):
+            if is_macos_metadata(filename):
+                logger.info(f'Skipping macOS metadata file: {filename}')
+                continue
+            members.append(
+                {'kind': 'geojson', 'path': filename, 'name': PurePosixPath(filename).stem}
+            )
+    for filename in filenames:
+        path = PurePosixPath(filename)
+        if path.suffix.lower() != '.shp' or is_macos_metadata(filename):
+            continue
+        if str(path.with_suffix('.dbf')).lower() not in lower_filenames:
+            logger.warning(f'DBF file {path.stem}.dbf is missing, skipping.')
+            continue
+        members.append({'kind': 'shapefile', 'path': filename, 'name': path.stem})
+    return members
+
+
+def is_geojson_seq(filename: str) -> bool | None:
+    # GeoJSONSeq files are told apart by their content unless named as such
+    return filename.lower().endswith(tuple(GEOJSON_SEQ_EXTS)) or None
+
+
+def read_geojson_member(archive_path: str, filename: str) -> geopandas.GeoDataFrame | None:
+    with zipfile.ZipFile(archive_path) as zip_archive:
+        # Members are parsed as they are decompressed, trying UTF-8 first
+        for encoding in GEOJSON_ENCODINGS:
+            try:
+                with zip_archive.open(filename) as geojson_file:
+                    return GeoJSONFeatureReader(
+                        geojson_file, encoding=encoding, sequence=is_geojson_seq(filename)
+                    ).read_frame()
+            except (UnicodeDecodeError, ijson.JSONError) as e:
+                logger.warning(f'Failed to parse {filename} with {encoding}, trying next: {e}')
+            except ValueError as e:
+                logger.error(f'Error reading {filename}: {e}')
+                return None
+    logger.error(f'Could not parse {filename} with any common encoding, skipping.')
+    return None
+
+
+def geojson_member_batches(
+    archive_path: str | Path, filename: str, encoding: str = 'utf-8'
+) -> Iterator[geopandas.GeoDataFrame]:
+    """Yield the features of a GeoJSON member of a zip archive in batches, in EPSG:4326.
+
+    The member is parsed as it is decompressed, see GeoJSONFeatureReader.batches.
+    """
+    with zipfile.ZipFile(archive_path) as zip_archive, zip_archive.open(filename) as geojson_file:
+        yield from GeoJSONFeatureReader(
+            geojson_file, encoding=encoding, sequence=is_geojson_seq(filename)
+        ).batches()
+
+
+def read_shapefile_member(archive_path: str, filename: str) -> geopandas.GeoDataFrame | None:
+    # Read in place by GDAL, which finds the sidecar files and encoding next to the shapefile
+    geodata = geopandas.read_file(f'/vsizip/{archive_path}/{filename}')
+    if not geodata.geometry.notna().any():
+        logger.warning(f'Shapefile {filename} has no valid geometries, skipping.')
+        return None
+    if geodata.crs is None:
+        geodata = geodata.set_crs(4326)
+    return geodata.to_crs(4326)
+
+
+def read_zip_member(
+    archive_path: str, member: dict
+) -> tuple[dict, geopandas.GeoDataFrame | None, float]:
+    """Read a member of a zip archive in EPSG:4326, returning it with the seconds taken.
+
+    The frame is None if the member has no features or could not be read.
+    """
+    start = time.perf_counter()
+    try:
+        if member['kind'] == 'geojson':
+            geodata = read_geojson_member(archive_path, member['path'])
+        else:
+            geodata = read_shapefile_member(archive_path, member['path'])
+    except Exception as e:
+        logger.error(f'Error processing {member["path"]}: {e}')
+        geodata = None
+    return member, geodata, time.perf_counter() - start
+
+
+def read_zip_members(
+    archive_path: str | Path, members: list[dict], workers: int = ZIP_MEMBER_WORKERS
+) -> Iterator[tuple[dict, geopandas.GeoDataFrame | None, float]]:
+    """Yield the results of read_zip_member for members of an archive as they complete.
+
+    Members are read by a pool of threads, each opening the archive itself. Decompression
+    and GDAL reads release the GIL, and threads can be started from the daemonic worker
+    processes of Celery, which cannot start processes of their own.
+    """
+    workers = min(workers, len(members))
+    if workers <= 1:
+        for member in members:
+            yield read_zip_member(str(archive_path), member)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(read_zip_member, str(archive_path), member) for member in members
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -2,7 +2,7 @@ import pytest
 from pytest_factoryboy import register
 from rest_framework.test import APIClient
 
-from .factories import UserFactory
+from .factories import DatasetFactory, UserFactory, VectorMapLayerFactory
 
 
 @pytest.fixture
@@ -17,4 +17,6 @@ def authenticated_api_client(user) -> APIClient:
     return client
 
 
+register(DatasetFactory)
 register(UserFactory)
+register(VectorMapLayerFactory)
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User
 import factory.django
 
+from uvdat.core.models import Dataset, VectorMapLayer
+
 
 class UserFactory(factory.django.DjangoModelFactory):
     class Meta:
@@ -10,3 +12,19 @@ class UserFactory(factory.django.DjangoModelFactory):
     email = factory.Faker('safe_email')
     first_name = factory.Faker('first_name')
     last_name = factory.Faker('last_name')
+
+
+class DatasetFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Dataset
+
+    name = factory.Sequence(lambda n: f'Dataset {n}')
+    category = 'test'
+
+
+class VectorMapLayerFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = VectorMapLayer
+
+    dataset = factory.SubFactory(DatasetFactory)
+    name = factory.Faker('word')
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
+import pytest
+
+# Invalid filters are rejected after the request is authorized, before any tile query
+TILE_URL = '/api/v1/async/vectors/1/tiles/0/0/0/?filters=invalid'
+
+
+@pytest.mark.django_db
+def test_async_view_anonymous(client):
+    assert client.get(TILE_URL).status_code == 401
+
+
+@pytest.mark.django_db
+def test_async_view_token(client, user):
+    token = AccessToken.objects.create(
+        user=user, token='async-token', expires=timezone.now() + timedelta(hours=1)
+    )
+    headers = {'Authorization': 'Bearer async-token'}
+    assert client.get(TILE_URL, headers=headers).status_code == 400
+
+    # Revoked tokens are rejected by the next request
+    token.delete()
+    assert client.get(TILE_URL, headers=headers).status_code == 401
@@ -0,0 +1,97 @@
+import gzip
+
+import brotli
+from django.contrib.gis.geos import Point
+import pytest
+
+from uvdat.core.models import VectorFeature
+from uvdat.core.rest.caching import MIN_COMPRESS_SIZE, compressed_response, etag_matches, make_etag
+
+
+@pytest.fixture
+def tile_url(vector_map_layer):
+    # Enough features for the tile to be compressed
+    VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(
+                map_layer=vector_map_layer,
+                geometry=Point(i % 90, i // 90),
+                properties={'name': f'Feature {i}'},
+            )
+            for i in range(200)
+        ]
+    )
+    return f'/api/v1/vectors/{vector_map_layer.pk}/tiles/0/0/0/'
+
+
+@pytest.mark.parametrize(
+    'if_none_match,matches',
+    [
+        (None, False),
+        ('*', True),
+        ('W/"other"', False),
+        ('W/"other", W/"{digest}"', True),
+        # Weak and strong forms of a tag compare equal
+        ('"{digest}"', True),
+    ],
+)
+def test_etag_matches(rf, if_none_match, matches):
+    etag = make_etag('tile', 1, 2)
+    digest = etag.removeprefix('W/"').removesuffix('"')
+    headers = {}
+    if if_none_match:
+        headers['HTTP_IF_NONE_MATCH'] = if_none_match.format(digest=digest)
+    assert etag_matches(rf.get('/', **headers), etag) is matches
+
+
+@pytest.mark.parametrize(
+    'accept_encoding,encoding',
+    [('', None), ('gzip', 'gzip'), ('gzip, br', 'br'), ('br;q=0, gzip', 'gzip')],
+)
+def test_compressed_response(rf, accept_encoding, encoding):
+    content = b'x' * MIN_COMPRESS_SIZE
+    response = compressed_response(
+        rf.get('/', HTTP_ACCEPT_ENCODING=accept_encoding), content, 'text/plain'
+    )
+    assert response.get('Content-Encoding') == encoding
+    decompress = {None: bytes, 'gzip': gzip.decompress, 'br': brotli.decompress}[encoding]
+    assert decompress(response.content) == content
+
+    # Small responses are not compressed
+    response = compressed_response(
+        rf.get('/', HTTP_ACCEPT_ENCODING=accept_encoding), b'x', 'text/plain'
+    )
+    assert 'Content-Encoding' not in response
+
+
+@pytest.mark.django_db
+def test_tile_not_modified(authenticated_api_client, vector_map_layer, tile_url):
+    response = authenticated_api_client.get(tile_url)
+    assert response.status_code == 200
+    etag = response['ETag']
+
+    response = authenticated_api_client.get(tile_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response['ETag'] == etag
+
+    # Changed features change the version of the tile
+    vector_map_layer.features_changed()
+    response = authenticated_api_client.get(tile_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'accept_encoding,decompress', [('br', brotli.decompress), ('gzip', gzip.decompress)]
+)
+def test_tile_encoding(authenticated_api_client, tile_url, accept_encoding, decompress):
+    tile = authenticated_api_client.get(tile_url).content
+    assert len(tile) >= MIN_COMPRESS_SIZE
+
+    response = authenticated_api_client.get(tile_url, HTTP_ACCEPT_ENCODING=accept_encoding)
+    assert response.status_code == 200
+    assert response['Content-Encoding'] == accept_encoding
+    assert 'Accept-Encoding' in response['Vary']
+    assert decompress(response.content) == tile
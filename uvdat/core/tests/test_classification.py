@@ -0,0 +1,13 @@
+from uvdat.core.tasks.classification import jenks_breaks
+
+
+def test_jenks_breaks():
+    values = [22, 1, 11, 2, 20, 3, 10, 21, 12]
+    assert jenks_breaks(values, 3) == [1, 3, 12, 22]
+    assert jenks_breaks(values, 1) == [1, 22]
+
+
+def test_jenks_breaks_few_values():
+    assert jenks_breaks([], 3) == []
+    assert jenks_breaks([4], 3) == [4, 4]
+    assert jenks_breaks([1, 2, 3, 4], 4) == [1, 1, 2, 3, 4]
@@ -0,0 +1,66 @@
+from django.contrib.gis.geos import Point
+import mapbox_vector_tile
+import pytest
+
+from uvdat.core.models import VectorFeature
+
+COMPOSITE_TILE_URL = '/api/v1/vectors/composite-tiles/0/0/0/'
+
+
+@pytest.fixture
+def composite_layers(vector_map_layer, vector_map_layer_factory):
+    buildings = vector_map_layer
+    roads = vector_map_layer_factory()
+    VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(
+                map_layer=buildings,
+                geometry=Point(10, 10),
+                properties={'name': 'Library', 'height': 12},
+            ),
+            VectorFeature(
+                map_layer=roads,
+                geometry=Point(-20, 30),
+                properties={'name': 'Main Street', 'lanes': 2},
+            ),
+        ]
+    )
+    return buildings, roads
+
+
+@pytest.mark.django_db
+def test_composite_tile(authenticated_api_client, composite_layers):
+    buildings, roads = composite_layers
+    response = authenticated_api_client.get(
+        COMPOSITE_TILE_URL,
+        {'layerIds': f'{buildings.pk},{roads.pk}', f'properties_{roads.pk}': 'name'},
+    )
+    assert response.status_code == 200
+
+    tile = mapbox_vector_tile.decode(response.content)
+    assert set(tile) == {f'layer_{buildings.pk}', f'layer_{roads.pk}'}
+    [building] = tile[f'layer_{buildings.pk}']['features']
+    assert building['properties'] == {
+        'map_layer_id': buildings.pk,
+        'vectorfeatureid': VectorFeature.objects.get(map_layer=buildings).pk,
+        'name': 'Library',
+        'height': 12,
+    }
+    # Only the requested properties of a layer are included
+    [road] = tile[f'layer_{roads.pk}']['features']
+    assert road['properties'] == {
+        'map_layer_id': roads.pk,
+        'vectorfeatureid': VectorFeature.objects.get(map_layer=roads).pk,
+        'name': 'Main Street',
+    }
+
+
+@pytest.mark.django_db
+def test_composite_tile_missing_layer(authenticated_api_client, composite_layers):
+    buildings, roads = composite_layers
+    missing_id = roads.pk + 1
+    response = authenticated_api_client.get(
+        COMPOSITE_TILE_URL, {'layerIds': [buildings.pk, missing_id]}
+    )
+    assert response.status_code == 404
+    assert str(missing_id) in response.data['error']
@@ -0,0 +1,69 @@
+from django.db import connection
+import geopandas
+import numpy as np
+import pytest
+import shapely
+
+from uvdat.core.models import VectorFeature
+from uvdat.core.tasks import map_layers
+from uvdat.core.tasks.map_layers import copy_vector_features, deferred_vector_feature_indexes
+
+
+@pytest.mark.django_db
+def test_copy_vector_features(mocker, vector_map_layer):
+    mocker.patch.object(map_layers, 'COPY_BATCH_SIZE', 2)
+    geodata = geopandas.GeoDataFrame(
+        {
+            'name': ['a, "quoted"', 'multi\nline', 'Ünïcode', 'no geometry'],
+            'height': [1, 2, 3, 4],
+            'width': [1.5, np.nan, 3.25, 4.0],
+            # Floats keep their full precision
+            'ratio': [1 / 3, 1e-12, 123456.78901234567, 2.5e-300],
+        },
+        geometry=[
+            shapely.Point(1, 2, 3),
+            shapely.Polygon([(0, 0), (1, 0), (1, 1), (0, 0)]),
+            shapely.LineString([(0, 0), (2, 2)]),
+            None,
+        ],
+        crs=4326,
+    )
+
+    # Features without a geometry are skipped
+    assert copy_vector_features(vector_map_layer, geodata) == 3
+
+    features = VectorFeature.objects.filter(map_layer=vector_map_layer).order_by('id')
+    assert [feature.properties for feature in features] == [
+        {'name': 'a, "quoted"', 'height': 1, 'width': 1.5, 'ratio': 1 / 3},
+        {'name': 'multi\nline', 'height': 2, 'width': None, 'ratio': 1e-12},
+        {'name': 'Ünïcode', 'height': 3, 'width': 3.25, 'ratio': 123456.78901234567},
+    ]
+    # Geometries are stored in 2D
+    assert [feature.geometry.srid for feature in features] == [4326] * 3
+    assert [feature.geometry.wkt for feature in features] == [
+        'POINT (1 2)',
+        'POLYGON ((0 0, 1 0, 1 1, 0 0))',
+        'LINESTRING (0 0, 2 2)',
+    ]
+
+
+def feature_index_names() -> set[str]:
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(cursor, 'core_vectorfeature'))
+
+
+@pytest.mark.django_db
+def test_deferred_vector_feature_indexes():
+    indexes = feature_index_names()
+    deferred = {'core_vf_text_vector_idx', 'core_vf_text_trgm_idx'}
+    assert deferred <= indexes
+
+    with deferred_vector_feature_indexes():
+        assert not deferred & feature_index_names()
+    assert feature_index_names() == indexes
+
+    # A failed load restores the indexes along with the features
+    with pytest.raises(ValueError):
+        with deferred_vector_feature_indexes():
+            raise ValueError
+    assert feature_index_names() == indexes
@@ -0,0 +1,48 @@
+import json
+
+from django.core.files.base import ContentFile
+import pytest
+
+from uvdat.core.models import FileItem, ProcessingTask, VectorFeature, VectorMapLayer
+from uvdat.core.tasks.dataset import convert_dataset
+
+POINTS = {
+    'type': 'FeatureCollection',
+    'features': [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [i, i]},
+            'properties': {'name': f'point {i}'},
+        }
+        for i in range(3)
+    ],
+}
+
+
+def create_file_item(dataset, name, content):
+    file_item = FileItem(name=name, dataset=dataset, file_type=name.rsplit('.', 1)[-1])
+    file_item.file.save(name, ContentFile(content), save=False)
+    file_item.save()
+    return file_item
+
+
+@pytest.mark.django_db
+def test_convert_dataset(dataset):
+    points = create_file_item(dataset, 'points.geojson', json.dumps(POINTS).encode())
+    unsupported = create_file_item(dataset, 'notes.txt', b'notes')
+
+    convert_dataset(dataset.id, asynchronous=False)
+
+    # Each file is converted by its own task, a failed file does not stop the others
+    map_layer = VectorMapLayer.objects.get(dataset=dataset)
+    assert VectorFeature.objects.filter(map_layer=map_layer).count() == 3
+    file_tasks = ProcessingTask.objects.filter(metadata__type='file conversion')
+    assert file_tasks.get(file_items=points).status == ProcessingTask.Status.COMPLETE
+    assert file_tasks.get(file_items=unsupported).status == ProcessingTask.Status.ERROR
+
+    dataset_task = ProcessingTask.objects.get(metadata__type='dataset conversion')
+    assert dataset_task.status == ProcessingTask.Status.ERROR
+    assert dataset_task.output_metadata['output_layers']['vector_map_layers'] == [map_layer.id]
+    assert list(dataset_task.output_metadata['errors']) == [str(unsupported.id)]
+    dataset.refresh_from_db()
+    assert not dataset.processing
@@ -0,0 +1,80 @@
+import json
+
+from django.contrib.gis.geos import Point
+from django.db import connection
+import pytest
+
+from uvdat.core.models import VectorFeature
+from uvdat.core.tasks.vector_tiles import compile_feature_filters, get_vector_tile
+
+
+@pytest.mark.parametrize(
+    'value,expected',
+    [(True, True), (False, False), ('true', True), ('false', False), ('False', False)],
+)
+def test_bool_filter(value, expected):
+    _, params = compile_feature_filters({'open': {'type': 'bool', 'value': value}})
+    assert json.loads(params['filter_0']) == {'open': expected}
+
+
+@pytest.mark.parametrize('value', ['yes', '', 0, None])
+def test_bool_filter_invalid(value):
+    with pytest.raises(ValueError):
+        compile_feature_filters({'open': {'type': 'bool', 'value': value}})
+
+
+@pytest.fixture
+def filtered_features(vector_map_layer):
+    properties = [
+        {'name': 'a', 'height': 1, 'open': True, 'kind': 'Oak 50%'},
+        {'name': 'b', 'height': 5, 'open': False, 'kind': 'Red oak'},
+        {'name': 'c', 'height': 10, 'open': True, 'kind': 'Maple'},
+        {'name': 'd', 'height': '5', 'kind': 'Pine'},
+    ]
+    VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(map_layer=vector_map_layer, geometry=Point(i, i), properties=p)
+            for i, p in enumerate(properties)
+        ]
+    )
+    return vector_map_layer
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'filters,expected',
+    [
+        ({'open': {'type': 'bool', 'value': 'true'}}, ['a', 'c']),
+        ({'height': {'type': 'number', 'value': 5}}, ['b']),
+        # Numeric strings are not numbers in jsonb comparisons
+        ({'height': {'type': 'number', 'value': [2, 10]}}, ['b', 'c']),
+        ({'kind': {'type': 'string', 'value': 'oak'}}, ['a', 'b']),
+        # LIKE wildcards in values are matched literally
+        ({'kind': {'type': 'string', 'value': '0%'}}, ['a']),
+        (
+            {'kind': {'type': 'string', 'value': 'oak'}, 'open': {'type': 'bool', 'value': True}},
+            ['a'],
+        ),
+    ],
+)
+def test_feature_filters_query(filtered_features, filters, expected):
+    filter_sql, params = compile_feature_filters(filters)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT vf.properties ->> 'name' FROM core_vectorfeature vf"
+            f' WHERE vf.map_layer_id = %(map_layer_id)s{filter_sql} ORDER BY 1',
+            {'map_layer_id': filtered_features.pk, **params},
+        )
+        assert [row[0] for row in cursor.fetchall()] == expected
+
+
+@pytest.mark.django_db
+def test_filtered_vector_tile(filtered_features):
+    assert get_vector_tile(filtered_features.pk, 0, 0, 0)
+    assert get_vector_tile(
+        filtered_features.pk, 0, 0, 0, {'kind': {'type': 'string', 'value': 'oak'}}
+    )
+    tile = get_vector_tile(
+        filtered_features.pk, 0, 0, 0, {'kind': {'type': 'string', 'value': 'birch'}}
+    )
+    assert tile == b''
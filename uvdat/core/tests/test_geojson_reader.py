@@ -0,0 +1,56 @@
+import io
+import json
+
+import pytest
+
+from uvdat.core.geodata.geojson_reader import GeoJSONFeatureReader
+
+FEATURES = [
+    {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [index, 0.5]},
+        'properties': {'index': index},
+    }
+    for index in range(3)
+]
+
+
+def test_feature_collection():
+    collection = {
+        'type': 'FeatureCollection',
+        'crs': {'type': 'name', 'properties': {'name': 'EPSG:3857'}},
+        'features': FEATURES,
+    }
+    reader = GeoJSONFeatureReader(io.BytesIO(json.dumps(collection, indent=2).encode()))
+    assert not reader.sequence
+    assert list(reader) == FEATURES
+    assert reader.crs == 'EPSG:3857'
+
+
+def test_feature_sequence():
+    lines = b''.join(json.dumps(feature).encode() + b'\n' for feature in FEATURES)
+    reader = GeoJSONFeatureReader(io.BytesIO(lines))
+    assert reader.sequence
+    assert list(reader) == FEATURES
+    assert reader.crs is None
+
+    # RFC 8142 text sequences prefix each feature with a record separator
+    records = b''.join(b'\x1e' + json.dumps(feature).encode() + b'\n' for feature in FEATURES)
+    assert list(GeoJSONFeatureReader(io.BytesIO(records))) == FEATURES
+
+
+def test_crs_after_features():
+    features = json.dumps(FEATURES)
+    collection = (
+        '{"type": "FeatureCollection", "features": %s, '
+        '"crs": {"type": "name", "properties": {"name": "EPSG:3857"}}}' % features
+    ).encode()
+
+    # Features read in a single batch are reprojected once the crs is read
+    [frame] = GeoJSONFeatureReader(io.BytesIO(collection)).batches()
+    assert frame.crs == 'EPSG:4326'
+    assert frame.geometry.x.tolist() == pytest.approx([0, 8.98e-06, 1.797e-05], rel=1e-3)
+
+    # Batches already yielded could not be reprojected
+    with pytest.raises(ValueError, match='crs'):
+        list(GeoJSONFeatureReader(io.BytesIO(collection)).batches(size=2))
@@ -0,0 +1,39 @@
+from django.core.files.base import ContentFile
+import geopandas
+import pytest
+import shapely
+
+from uvdat.core.models import FileItem, VectorFeature
+from uvdat.core.tasks.map_layers import process_geopackage
+
+
+@pytest.fixture
+def geopackage_file_item(dataset, tmp_path):
+    gpkg_path = tmp_path / 'layers.gpkg'
+    geopandas.GeoDataFrame(
+        {'name': ['a', 'b']}, geometry=[shapely.Point(0, 0), shapely.Point(1, 1)], crs=4326
+    ).to_file(gpkg_path, layer='points', engine='pyogrio')
+    # Layers in other CRSs are reprojected to EPSG:4326
+    geopandas.GeoDataFrame(
+        {'length': [10]}, geometry=[shapely.LineString([(0, 0), (1000, 1000)])], crs=3857
+    ).to_file(gpkg_path, layer='lines', engine='pyogrio')
+
+    file_item = FileItem(name='layers.gpkg', dataset=dataset, file_type='gpkg')
+    file_item.file.save('layers.gpkg', ContentFile(gpkg_path.read_bytes()), save=False)
+    file_item.save()
+    return file_item
+
+
+@pytest.mark.django_db
+def test_process_geopackage(geopackage_file_item):
+    raster_map_layers, vector_map_layers = process_geopackage(geopackage_file_item, None)
+
+    assert raster_map_layers == []
+    # Layers are returned in the order of the file
+    assert [layer.name for layer in vector_map_layers] == ['points', 'lines']
+    points, lines = vector_map_layers
+    features = VectorFeature.objects.filter(map_layer=points).order_by('id')
+    assert [feature.properties for feature in features] == [{'name': 'a'}, {'name': 'b'}]
+    line = VectorFeature.objects.get(map_layer=lines)
+    assert line.properties == {'length': 10}
+    assert line.geometry.extent == pytest.approx((0, 0, 0.008983, 0.008983), abs=1e-6)
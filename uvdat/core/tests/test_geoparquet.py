@@ -0,0 +1,38 @@
+import geopandas
+from shapely.geometry import LineString, Point
+
+from uvdat.core.geodata.geoparquet import GeoParquetReader, GeoParquetWriter
+
+
+def test_geoparquet_batches(tmp_path):
+    path = tmp_path / 'vectordata.parquet'
+    writer = GeoParquetWriter(path)
+    writer.write(
+        geopandas.GeoDataFrame(
+            {'name': ['a', 'b'], 'count': [1, 2], 'nested': [{'x': 1}, None]},
+            geometry=[Point(0, 0), Point(10, 10)],
+            crs=4326,
+        )
+    )
+    writer.write(
+        geopandas.GeoDataFrame(
+            {'name': ['c'], 'count': [2.5], 'nested': ['text']},
+            geometry=[LineString([(50, 50), (51, 51)])],
+            crs=4326,
+        )
+    )
+    writer.close()
+
+    reader = GeoParquetReader(path)
+    geodata = reader.read()
+    assert list(geodata['name']) == ['a', 'b', 'c']
+    assert list(geodata['count']) == [1.0, 2.0, 2.5]
+    # Properties of mixed types are stored as JSON
+    assert list(geodata['nested'].fillna('')) == [{'x': 1}, '', 'text']
+    assert geodata.crs.to_epsg() == 4326
+
+    geodata = reader.read(columns=['name'], bbox=(-1, -1, 1, 1))
+    assert list(geodata.columns) == ['name', 'geometry']
+    assert list(geodata['name']) == ['a']
+    assert not len(reader.read(bbox=(100, 100, 101, 101)))
+    assert [len(batch) for batch in reader.batches(2)] == [2, 1]
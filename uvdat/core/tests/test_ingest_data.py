@@ -20,6 +20,7 @@ from uvdat.core.models import (
     VectorFeatureTableData,
     VectorMapLayer,
 )
+from uvdat.core.tasks.property_summary import is_current_summary
 
 
 @pytest.mark.django_db
@@ -50,3 +51,13 @@ def test_ingest_data():
     assert NetCDFImage.objects.count() == 1330
     assert VectorFeatureTableData.objects.count() == 230
     assert VectorFeatureRowData.objects.count() == 69341
+
+    # Data derived from the features is stored along with them
+    assert not VectorFeature.objects.filter(centroid__isnull=True).exists()
+    assert not VectorMapLayer.objects.filter(
+        bounds__isnull=True, vectorfeature__isnull=False
+    ).exists()
+    for vector_map_layer in VectorMapLayer.objects.all():
+        summary = vector_map_layer.property_summary
+        assert is_current_summary(summary, vector_map_layer.data_version)
+        assert summary['feature_count'] == vector_map_layer.vectorfeature_set.count()
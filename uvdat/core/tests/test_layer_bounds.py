@@ -0,0 +1,41 @@
+from django.contrib.gis.geos import LineString, Point, Polygon
+import geopandas
+import pytest
+import shapely
+
+from uvdat.core.models import VectorFeature, VectorMapLayer
+from uvdat.core.tasks.map_layers import set_bounds_from_geodata
+
+
+@pytest.mark.django_db
+def test_set_bounds(vector_map_layer):
+    VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(map_layer=vector_map_layer, geometry=geometry, properties={})
+            for geometry in [
+                Point(-3, 4, srid=4326),
+                LineString((0, 0), (5, -1), srid=4326),
+                Polygon(((1, 1), (2, 6), (3, 1), (1, 1)), srid=4326),
+            ]
+        ]
+    )
+    vector_map_layer.set_bounds()
+    vector_map_layer.refresh_from_db()
+    assert vector_map_layer.bounds.extent == (-3, -1, 5, 6)
+
+
+@pytest.mark.django_db
+def test_set_bounds_empty(vector_map_layer):
+    # Layers without features keep their bounds
+    vector_map_layer.set_bounds()
+    vector_map_layer.refresh_from_db()
+    assert vector_map_layer.bounds is None
+
+
+def test_set_bounds_from_geodata():
+    vector_map_layer = VectorMapLayer()
+    geodata = geopandas.GeoDataFrame(
+        geometry=[shapely.Point(-3, 4), shapely.LineString([(0, 0), (5, -1)]), None], crs=4326
+    )
+    set_bounds_from_geodata(vector_map_layer, geodata)
+    assert vector_map_layer.bounds.extent == (-3, -1, 5, 4)
@@ -0,0 +1,62 @@
+from django.contrib.gis.geos import Point
+import numpy as np
+import pytest
+
+from uvdat.core.models import VectorFeature
+from uvdat.core.tasks.property_statistics import compute_property_statistics
+
+HEIGHTS = [3, 1.5, 4, 1, 5, 9, 2.5, 6, 5, 3]
+
+
+@pytest.fixture
+def statistics_features(vector_map_layer):
+    properties = [
+        {'height': height, 'kind': 'tall' if height > 4 else 'short'} for height in HEIGHTS
+    ]
+    # Numeric strings are numbers, other strings and values out of the double range are not
+    properties += [{'height': '7'}, {'height': 'unknown'}, {'height': '1e999'}]
+    VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(map_layer=vector_map_layer, geometry=Point(i, i), properties=p)
+            for i, p in enumerate(properties)
+        ]
+    )
+    return vector_map_layer
+
+
+@pytest.mark.django_db
+def test_property_statistics(statistics_features):
+    result = compute_property_statistics(statistics_features.pk, ['height', 'kind'], bins=4)
+
+    values = np.array([*HEIGHTS, 7])
+    counts, bin_edges = np.histogram(values, bins=4)
+    height = result['height']
+    assert height['type'] == 'number'
+    assert height['min'] == values.min()
+    assert height['max'] == values.max()
+    assert height['mean'] == pytest.approx(values.mean())
+    assert height['median'] == pytest.approx(np.median(values))
+    assert height['std_dev'] == pytest.approx(values.std())
+    assert height['histogram']['counts'] == counts.tolist()
+    assert height['histogram']['bin_edges'] == pytest.approx(bin_edges.tolist())
+
+    assert result['kind'] == {
+        'type': 'string',
+        'unique_values': 2,
+        'values': [{'value': 'short', 'count': 6}, {'value': 'tall', 'count': 4}],
+    }
+
+
+@pytest.mark.django_db
+def test_property_statistics_bbox(statistics_features):
+    bbox = (1.5, 1.5, 2.5, 2.5)
+    result = compute_property_statistics(statistics_features.pk, ['height'], bbox=bbox)
+    assert result['height']['mean'] == pytest.approx(4)
+    # A sample missing the bbox features falls back to all of them
+    result = compute_property_statistics(
+        statistics_features.pk, ['height'], bbox=bbox, approximate=True, sample_size=1
+    )
+    assert result['height']['mean'] == pytest.approx(4)
+
+    empty_bbox = (50, 50, 60, 60)
+    assert compute_property_statistics(statistics_features.pk, ['height'], bbox=empty_bbox) is None
@@ -0,0 +1,85 @@
+from django.contrib.gis.geos import Point
+import pytest
+
+from uvdat.core.models import VectorFeature, VectorPropertyValue
+from uvdat.core.tasks.property_summary import (
+    compute_property_summary,
+    get_property_summary,
+    is_current_summary,
+    update_property_summary,
+)
+
+
+@pytest.fixture
+def summarized_features(vector_map_layer):
+    VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(
+                map_layer=vector_map_layer,
+                geometry=Point(i, i),
+                properties={'height': i, 'kind': 'even' if i % 2 == 0 else 'odd'},
+            )
+            for i in range(10)
+        ]
+    )
+    return vector_map_layer
+
+
+@pytest.mark.django_db
+def test_property_summary_exact(mocker, summarized_features):
+    queue = mocker.patch('uvdat.core.tasks.property_summary.queue_property_summary')
+    # Without a stored summary, every feature is aggregated unless a sample is requested
+    summary = get_property_summary(summarized_features, sample_size=2)
+    queue.assert_called_once_with(summarized_features)
+    assert summary == {
+        'height': {'type': 'number', 'value_count': 10, 'min': 0, 'max': 9},
+        'kind': {'type': 'string', 'value_count': 10, 'values': ['even', 'odd']},
+    }
+
+
+@pytest.mark.django_db
+def test_property_summary_approximate(mocker, summarized_features):
+    mocker.patch('uvdat.core.tasks.property_summary.queue_property_summary')
+    summary = get_property_summary(summarized_features, approximate=True, sample_size=2)
+    for key in ['height', 'kind']:
+        assert 0 < summary[key]['sample']['fraction'] < 1
+        assert summary[key]['value_count'] == summary[key]['sample']['size']
+
+
+@pytest.mark.django_db
+def test_compute_property_summary(summarized_features):
+    VectorFeature.objects.create(
+        map_layer=summarized_features,
+        geometry=Point(0, 0),
+        properties={'height': 'unknown', 'open': True, 'note': None},
+    )
+    features = VectorFeature.objects.filter(map_layer=summarized_features).order_by('id')
+
+    summary = compute_property_summary(summarized_features.pk, value_limit=1)
+    assert summary['feature_count'] == 11
+    assert summary['min_feature_id'] == features.first().id
+    assert summary['max_feature_id'] == features.last().id
+    # Keys holding several types are aggregated by type, null values are left out
+    assert summary['properties'] == {
+        'height': {
+            'number': {'value_count': 10, 'min': 0, 'max': 9},
+            'string': {'value_count': 1, 'unique': 1, 'values': ['unknown']},
+        },
+        'kind': {'string': {'value_count': 10, 'unique': 2, 'values': ['even']}},
+        'open': {'boolean': {'value_count': 1}},
+    }
+
+
+@pytest.mark.django_db
+def test_update_property_summary(summarized_features):
+    summary = update_property_summary(summarized_features)
+    assert summary['data_version'] == summarized_features.data_version
+    assert is_current_summary(
+        summarized_features.property_summary, summarized_features.data_version
+    )
+    assert VectorPropertyValue.objects.filter(map_layer=summarized_features).count() == 2
+
+    summarized_features.features_changed()
+    assert not is_current_summary(
+        summarized_features.property_summary, summarized_features.data_version
+    )
@@ -0,0 +1,53 @@
+from django.contrib.gis.geos import Point
+import pytest
+
+from uvdat.core.models import VectorFeature
+from uvdat.core.tasks.property_summary import update_property_summary
+
+
+@pytest.fixture
+def property_values_layer(vector_map_layer):
+    kinds = ['Maple', 'Oak', 'Oak', 'Maple', 'Oak', 'Red Oak', 'Pine']
+    VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(map_layer=vector_map_layer, geometry=Point(i, i), properties={'kind': k})
+            for i, k in enumerate(kinds)
+        ]
+    )
+    # The autocomplete values are counted along with the summary
+    update_property_summary(vector_map_layer)
+    return vector_map_layer
+
+
+def property_values(client, map_layer, **params):
+    return client.get(f'/api/v1/vectors/{map_layer.pk}/property-values/', params)
+
+
+@pytest.mark.django_db
+def test_property_values(authenticated_api_client, property_values_layer):
+    response = property_values(authenticated_api_client, property_values_layer, key='kind')
+    assert response.status_code == 200
+    # Most common first, ties by value
+    assert response.data == [
+        {'value': 'Oak', 'count': 3},
+        {'value': 'Maple', 'count': 2},
+        {'value': 'Pine', 'count': 1},
+        {'value': 'Red Oak', 'count': 1},
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('match,expected', [('prefix', ['Oak']), ('contains', ['Oak', 'Red Oak'])])
+def test_property_values_search(authenticated_api_client, property_values_layer, match, expected):
+    response = property_values(
+        authenticated_api_client, property_values_layer, key='kind', search='oa', match=match
+    )
+    assert [item['value'] for item in response.data] == expected
+
+
+@pytest.mark.django_db
+def test_property_values_limit(authenticated_api_client, property_values_layer):
+    response = property_values(authenticated_api_client, property_values_layer, key='kind', limit=1)
+    assert [item['value'] for item in response.data] == ['Oak']
+    response = property_values(authenticated_api_client, property_values_layer, key='kind', limit=0)
+    assert response.status_code == 400
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.enums import Resampling
+import rasterio.shutil
+from rasterio.transform import from_bounds
+
+from uvdat.core.models import FileItem
+from uvdat.core.tasks.map_layers import create_raster_map_layer_from_file, is_cloud_optimized
+
+
+def write_geotiff(path, **profile):
+    data = np.arange(512 * 512, dtype='float32').reshape(1, 512, 512)
+    with rasterio.open(
+        path,
+        'w',
+        driver='GTiff',
+        width=512,
+        height=512,
+        count=1,
+        dtype='float32',
+        crs='EPSG:4326',
+        transform=from_bounds(-10, -5, 10, 5, 512, 512),
+        **profile,
+    ) as dst:
+        dst.write(data)
+        if profile.get('tiled'):
+            dst.build_overviews([2, 4], Resampling.average)
+    return path
+
+
+def write_cog(source, path):
+    rasterio.shutil.copy(source, path, driver='COG')
+    return path
+
+
+def test_is_cloud_optimized(tmp_path):
+    plain = write_geotiff(tmp_path / 'plain.tif')
+    # Tiled with overviews, but not laid out as a COG
+    tiled = write_geotiff(tmp_path / 'tiled.tif', tiled=True, blockxsize=256, blockysize=256)
+    cog = write_cog(plain, tmp_path / 'cog.tif')
+
+    assert not is_cloud_optimized(plain)
+    assert not is_cloud_optimized(tiled)
+    assert is_cloud_optimized(cog)
+    assert not is_cloud_optimized(tmp_path / 'missing.tif')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('cloud_optimized', [False, True])
+def test_create_raster_map_layer(mocker, tmp_path, dataset, cloud_optimized):
+    convert = mocker.patch(
+        'large_image_converter.convert',
+        side_effect=lambda source, destination, **kwargs: write_cog(source, destination),
+    )
+    raster_path = write_geotiff(tmp_path / 'raster.tif')
+    if cloud_optimized:
+        raster_path = write_cog(raster_path, tmp_path / 'cog.tif')
+    file_item = FileItem.objects.create(name='raster', dataset=dataset, file_type='tif')
+
+    raster_map_layer = create_raster_map_layer_from_file(file_item, raster_path, None)
+
+    # COGs are stored without conversion
+    assert convert.called != cloud_optimized
+    raster_map_layer.set_bounds()
+    raster_map_layer.refresh_from_db()
+    assert raster_map_layer.bounds.extent == pytest.approx((-10, -5, 10, 5))
+    # Styled by the band statistics of the stored COG
+    band = raster_map_layer.default_style['largeImageStyle']['bands'][0]
+    assert band['enabled']
@@ -0,0 +1,119 @@
+import json
+
+from django.contrib.gis.geos import Point
+import pytest
+
+from uvdat.core.models import VectorFeature
+
+SEARCH_URL = '/api/v1/map-layers/search-features/'
+
+
+@pytest.fixture
+def ranked_features(vector_map_layer):
+    # JSON null values are ordered first and features without the key last, ties by id
+    properties = [
+        {'name': 'a', 'rank': 2},
+        {'name': 'b', 'rank': None},
+        {'name': 'c'},
+        {'name': 'd', 'rank': 1},
+        {'name': 'e', 'rank': None},
+        {'name': 'f'},
+        {'name': 'g', 'rank': 1},
+    ]
+    features = VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(map_layer=vector_map_layer, geometry=Point(i, i), properties=p)
+            for i, p in enumerate(properties)
+        ]
+    )
+    vector_map_layer.update_feature_centroids()
+    return [feature.properties['name'] for feature in features]
+
+
+def search(client, map_layer, **data):
+    return client.post(
+        SEARCH_URL,
+        {'mapLayerId': map_layer.pk, 'titleKey': 'name', **data},
+        format='json',
+    )
+
+
+@pytest.mark.django_db
+def test_search_features_array(authenticated_api_client, vector_map_layer, ranked_features):
+    response = search(authenticated_api_client, vector_map_layer)
+    assert response.status_code == 200
+    results = json.loads(b''.join(response.streaming_content))
+    assert [result['title'] for result in results] == ranked_features
+    assert results[0]['center'] == {'lat': 0.0, 'lon': 0.0}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', [1, 2, 3])
+def test_search_features_pages(authenticated_api_client, vector_map_layer, ranked_features, limit):
+    titles = []
+    cursor = None
+    while True:
+        response = search(
+            authenticated_api_client,
+            vector_map_layer,
+            sortKey='rank',
+            limit=limit,
+            **({'cursor': cursor} if cursor else {}),
+        )
+        assert response.status_code == 200
+        assert len(response.data['results']) <= limit
+        titles += [result['title'] for result in response.data['results']]
+        cursor = response.data['next']
+        if cursor is None:
+            break
+
+    assert titles == ['b', 'e', 'd', 'g', 'a', 'c', 'f']
+
+
+@pytest.mark.django_db
+def test_search_features_invalid_cursor(authenticated_api_client, vector_map_layer):
+    response = search(authenticated_api_client, vector_map_layer, limit=10, cursor='invalid')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_search_features_text(authenticated_api_client, vector_map_layer):
+    search_fields = [{'value': 'name'}, {'value': 'street'}]
+    vector_map_layer.default_style = {
+        'searchableVectorFeatureData': {'mainTextSearchFields': search_fields}
+    }
+    vector_map_layer.save()
+    properties = [
+        {'name': 'Central Library', 'street': 'Main Street'},
+        {'name': 'City Hall', 'street': 'Maine Avenue'},
+        {'name': 'Fire Station', 'street': 'Oak Street'},
+    ]
+    VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(map_layer=vector_map_layer, geometry=Point(i, i), properties=p)
+            for i, p in enumerate(properties)
+        ]
+    )
+    assert vector_map_layer.update_search_text() == 3
+
+    # Words are matched by prefix, the closest match is ranked first
+    response = search(
+        authenticated_api_client,
+        vector_map_layer,
+        search='main',
+        mainTextSearchFields=search_fields,
+        limit=10,
+    )
+    assert [result['title'] for result in response.data['results']] == [
+        'Central Library',
+        'City Hall',
+    ]
+
+    response = search(
+        authenticated_api_client,
+        vector_map_layer,
+        search='station oak',
+        mainTextSearchFields=search_fields,
+        limit=10,
+    )
+    assert [result['title'] for result in response.data['results']] == ['Fire Station']
@@ -0,0 +1,40 @@
+from django.contrib.gis.geos import Point
+import pytest
+
+from uvdat.core.models import VectorFeature
+from uvdat.core.tasks.property_summary import update_property_summary
+from uvdat.core.tasks.search_indexes import search_index_name, sync_search_indexes
+
+
+@pytest.mark.django_db
+def test_sync_search_indexes(vector_map_layer):
+    VectorFeature.objects.create(
+        map_layer=vector_map_layer,
+        geometry=Point(0, 0),
+        properties={'name': 'a', 'height': 1, 'kind': 'tree', 'open': True},
+    )
+    update_property_summary(vector_map_layer)
+    vector_map_layer.default_style = {
+        'searchableVectorFeatureData': {
+            'display': {'titleKey': 'name', 'sortable': True},
+            'configurableFilters': ['height', 'kind', 'open'],
+        }
+    }
+
+    pk = vector_map_layer.pk
+    expected = {
+        search_index_name(pk, 'path'),
+        search_index_name(pk, 'sort', 'name'),
+        search_index_name(pk, 'sort', 'height'),
+        search_index_name(pk, 'text', 'kind'),
+    }
+    result = sync_search_indexes(vector_map_layer)
+    assert set(result['created']) == expected
+    assert set(vector_map_layer.search_index_names()) == expected
+
+    # Indexes no longer used by the configuration are dropped
+    vector_map_layer.default_style['searchableVectorFeatureData']['configurableFilters'] = []
+    result = sync_search_indexes(vector_map_layer)
+    assert result['created'] == []
+    assert set(result['dropped']) == expected - {search_index_name(pk, 'sort', 'name')}
+    assert vector_map_layer.search_index_names() == [search_index_name(pk, 'sort', 'name')]
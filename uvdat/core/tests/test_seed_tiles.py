@@ -0,0 +1,48 @@
+import pytest
+
+from uvdat.core.models import ProcessingTask
+from uvdat.core.tasks.vector_tiles import MAX_SEED_ZOOM
+
+
+@pytest.fixture
+def admin_api_client(authenticated_api_client, user):
+    user.is_staff = True
+    user.save()
+    return authenticated_api_client
+
+
+def seed(client, map_layer, **data):
+    return client.post(f'/api/v1/vectors/{map_layer.pk}/seed-tiles/', data, format='json')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'zooms',
+    [
+        {'minZoom': 'a'},
+        {'maxZoom': '1.5'},
+        {'maxZoom': None},
+        {'minZoom': 4, 'maxZoom': 2},
+        {'maxZoom': MAX_SEED_ZOOM + 1},
+    ],
+)
+def test_seed_tiles_invalid_zooms(admin_api_client, vector_map_layer, mocker, zooms):
+    delay = mocker.patch('uvdat.core.rest.map_layers.seed_vector_tiles.delay')
+    assert seed(admin_api_client, vector_map_layer, **zooms).status_code == 400
+    delay.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_seed_tiles(admin_api_client, vector_map_layer, mocker):
+    delay = mocker.patch('uvdat.core.rest.map_layers.seed_vector_tiles.delay')
+    delay.return_value.id = 'seed-task'
+    response = seed(admin_api_client, vector_map_layer, minZoom='2', maxZoom=MAX_SEED_ZOOM)
+    assert response.status_code == 201
+    delay.assert_called_once_with(
+        vector_map_layer.pk,
+        min_zoom=2,
+        max_zoom=MAX_SEED_ZOOM,
+        bbox=None,
+        archive_format='mbtiles',
+    )
+    assert ProcessingTask.objects.get(celery_id='seed-task').status == ProcessingTask.Status.QUEUED
@@ -0,0 +1,24 @@
+import pytest
+
+from uvdat.core.models.vector_feature_table_data import to_step_value
+
+
+@pytest.mark.parametrize(
+    'value,expected',
+    [
+        (1990, 1990.0),
+        ('2.5', 2.5),
+        ('2020-01-01', 1577836800.0),
+        ('2020-01-01T00:00:00Z', 1577836800.0),
+        ('2020-01-01T02:00:00.500+02:00', 1577836800.5),
+        ('2020-01-01T00:00:00.123456789+00:00', 1577836800.123456),
+    ],
+)
+def test_to_step_value(value, expected):
+    assert to_step_value(value) == pytest.approx(expected)
+
+
+def test_to_step_value_invalid():
+    assert to_step_value(None) is None
+    assert to_step_value(True) is None
+    assert to_step_value('not a date') is None
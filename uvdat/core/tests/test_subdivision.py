@@ -0,0 +1,66 @@
+from django.contrib.gis.geos import LineString
+import mapbox_vector_tile
+import pytest
+
+from uvdat.core.models import VectorFeature
+from uvdat.core.models.map_layers import SUBDIVIDE_MIN_POINTS
+from uvdat.core.tasks.vector_tiles import get_vector_tile
+
+# Tile 2/2/1 spans longitudes 0 to 90 and latitudes 0 to 66.5
+TILE = (2, 2, 1)
+TILE_EXTENT = 4096
+TILE_BUFFER = 256
+
+
+def tile_points(coordinates):
+    if isinstance(coordinates[0], (int, float)):
+        yield coordinates
+    else:
+        for item in coordinates:
+            yield from tile_points(item)
+
+
+@pytest.fixture
+def subdivided_feature(vector_map_layer):
+    # A zigzag around the world with more vertices than are read whole
+    count = SUBDIVIDE_MIN_POINTS * 2
+    line = LineString(
+        [(-170 + 340 * i / (count - 1), 10 + (i % 2)) for i in range(count)], srid=4326
+    )
+    feature = VectorFeature.objects.create(
+        map_layer=vector_map_layer, geometry=line, properties={'name': 'Equator road'}
+    )
+    vector_map_layer.update_feature_centroids()
+    assert vector_map_layer.subdivide_features() > 1
+    return feature
+
+
+@pytest.mark.django_db
+def test_subdivided_feature_tile(vector_map_layer, subdivided_feature):
+    z, x, y = TILE
+    tile = mapbox_vector_tile.decode(get_vector_tile(vector_map_layer.pk, z, x, y))
+
+    # The pieces in the tile are drawn as a single feature, clipped to the tile
+    [feature] = tile['default']['features']
+    assert feature['properties']['vectorfeatureid'] == subdivided_feature.pk
+    points = list(tile_points(feature['geometry']['coordinates']))
+    assert points
+    for point in points:
+        assert all(-TILE_BUFFER <= value <= TILE_EXTENT + TILE_BUFFER for value in point)
+
+
+@pytest.mark.django_db
+def test_subdivided_feature_bbox_search(
+    authenticated_api_client, vector_map_layer, subdivided_feature
+):
+    def search_bbox(bbox):
+        response = authenticated_api_client.post(
+            '/api/v1/map-layers/search-features/',
+            {'mapLayerId': vector_map_layer.pk, 'titleKey': 'name', 'bbox': bbox, 'limit': 10},
+            format='json',
+        )
+        assert response.status_code == 200
+        return [result['id'] for result in response.data['results']]
+
+    # A box touching one piece of the feature finds it once
+    assert search_bbox('10,5,11,15') == [subdivided_feature.pk]
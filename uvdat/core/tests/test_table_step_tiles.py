@@ -0,0 +1,50 @@
+from django.contrib.gis.geos import Point
+import mapbox_vector_tile
+import pytest
+
+from uvdat.core.models import VectorFeature, VectorFeatureRowData, VectorFeatureTableData
+from uvdat.core.tasks.vector_tiles import get_table_step_vector_tile
+
+
+def create_table(feature, table_type, rows):
+    table = VectorFeatureTableData.objects.create(
+        vector_feature=feature,
+        map_layer=feature.map_layer,
+        name=table_type,
+        type=table_type,
+        columns=['year', 'flow'],
+        x_column='year',
+    )
+    VectorFeatureRowData.objects.bulk_create(
+        [
+            VectorFeatureRowData(vector_feature_table=table, row_data=row, x_value=row[0])
+            for row in rows
+        ]
+    )
+
+
+@pytest.mark.django_db
+def test_table_step_vector_tile(vector_map_layer):
+    gauge, duplicated, other = VectorFeature.objects.bulk_create(
+        [
+            VectorFeature(map_layer=vector_map_layer, geometry=Point(i, i), properties={'i': i})
+            for i in range(3)
+        ]
+    )
+    create_table(gauge, 'flow', [[2000, 1.5], [2010, 2.5], [2020, 3.5]])
+    # A feature with two tables of the type is drawn once, with the first table's rows
+    create_table(duplicated, 'flow', [[2000, 10.0]])
+    create_table(duplicated, 'flow', [[2000, 20.0]])
+    # Features without a table of the type are not drawn
+    create_table(other, 'level', [[2000, 5.0]])
+
+    tile = get_table_step_vector_tile(vector_map_layer.pk, 'flow', 'flow', 2015, 0, 0, 0)
+
+    [layer] = mapbox_vector_tile.decode(tile).values()
+    properties = sorted(
+        (feature['properties'] for feature in layer['features']), key=lambda p: p['i']
+    )
+    assert [(p['i'], p['row_value'], p['row_step']) for p in properties] == [
+        (0, 2.5, 2010),
+        (1, 10.0, 2000),
+    ]
@@ -0,0 +1,93 @@
+import json
+import multiprocessing
+import zipfile
+
+from django.core.files.base import ContentFile
+import geopandas
+import pytest
+import shapely
+
+from uvdat.core.models import FileItem, VectorFeature, VectorMapLayer
+from uvdat.core.tasks import map_layers
+from uvdat.core.tasks.map_layers import create_vector_map_layer
+from uvdat.core.tasks.zip_reader import read_zip_members, zip_layer_members
+
+
+def read_feature_counts(archive_path, results):
+    members = zip_layer_members(archive_path)
+    results.put(
+        sorted(
+            (member['name'], len(geodata))
+            for member, geodata, _ in read_zip_members(archive_path, members, workers=2)
+        )
+    )
+
+
+def test_read_zip_members_in_daemon_process(tmp_path):
+    archive_path = tmp_path / 'layers.zip'
+    with zipfile.ZipFile(archive_path, 'w') as zip_archive:
+        for name, count in [('points', 3), ('more_points', 2)]:
+            features = [
+                {
+                    'type': 'Feature',
+                    'geometry': {'type': 'Point', 'coordinates': [index, 0]},
+                    'properties': {'index': index},
+                }
+                for index in range(count)
+            ]
+            zip_archive.writestr(
+                f'{name}.geojson', json.dumps({'type': 'FeatureCollection', 'features': features})
+            )
+
+    # Celery's prefork workers are daemonic processes, which cannot start child processes
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=read_feature_counts, args=(str(archive_path), results), daemon=True
+    )
+    process.start()
+    assert results.get(timeout=60) == [('more_points', 2), ('points', 3)]
+    process.join()
+
+
+@pytest.mark.django_db
+def test_create_vector_maps_from_zip(dataset, tmp_path, mocker):
+    archive_path = tmp_path / 'layers.zip'
+    collection = {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [1, 2]},
+                'properties': {'name': 'Café'},
+            }
+        ],
+    }
+    shapefile_dir = tmp_path / 'shapefile'
+    shapefile_dir.mkdir()
+    geopandas.GeoDataFrame(
+        {'length': [10]}, geometry=[shapely.LineString([(0, 0), (1, 1)])], crs=4326
+    ).to_file(shapefile_dir / 'lines.shp')
+    with zipfile.ZipFile(archive_path, 'w') as zip_archive:
+        zip_archive.writestr('utf8.geojson', json.dumps(collection, ensure_ascii=False))
+        # Members that are not UTF-8 are read with the next encoding that parses
+        zip_archive.writestr(
+            'latin1.geojson', json.dumps(collection, ensure_ascii=False).encode('iso-8859-1')
+        )
+        for path in shapefile_dir.iterdir():
+            zip_archive.write(path, path.name)
+    file_item = FileItem(name='layers.zip', dataset=dataset, file_type='zip')
+    file_item.file.save('layers.zip', ContentFile(archive_path.read_bytes()), save=False)
+    file_item.save()
+    stream = mocker.spy(map_layers, 'create_vector_map_from_stream')
+
+    layers = create_vector_map_layer(file_item, {}, save_features=True)
+
+    # GeoJSON members are streamed into their layers, shapefiles are read whole
+    assert [layer.name for layer in layers] == ['utf8', 'latin1', 'lines']
+    assert stream.call_count == 3
+    assert VectorMapLayer.objects.filter(dataset=dataset).count() == 3
+    for layer in layers[:2]:
+        feature = VectorFeature.objects.get(map_layer=layer)
+        assert feature.properties == {'name': 'Café'}
+        assert layer.bounds.extent == (1, 2, 1, 2)
+    assert VectorFeature.objects.get(map_layer=layers[2]).properties == {'length': 10}
@@ -31,6 +31,14 @@ class UvdatMixin(ConfigMixin):
     ACCOUNT_EMAIL_VERIFICATION = 'none'
     ACCOUNT_LOGOUT_REDIRECT_URL = '/accounts/login/'
 
+    # HTTP caching of tiles, raster data and bounding boxes
+    UVDAT_PUBLIC_CACHE = os.getenv('DJANGO_UVDAT_PUBLIC_CACHE', 'false').lower() == 'true'
+    UVDAT_CACHE_MAX_AGE = int(os.getenv('DJANGO_UVDAT_CACHE_MAX_AGE', 3600))
+
+    # Connection pool of the async read endpoints, per worker process
+    UVDAT_ASYNC_DB_POOL_MIN_SIZE = int(os.getenv('DJANGO_UVDAT_ASYNC_DB_POOL_MIN_SIZE', 2))
+    UVDAT_ASYNC_DB_POOL_MAX_SIZE = int(os.getenv('DJANGO_UVDAT_ASYNC_DB_POOL_MAX_SIZE', 20))
+
     @staticmethod
     def mutate_configuration(configuration: ComposedConfiguration) -> None:
         # Install local apps first, to ensure any overridden resources are found first
@@ -42,6 +50,7 @@ class UvdatMixin(ConfigMixin):
 
         # Install additional apps
         configuration.INSTALLED_APPS += [
+            'django.contrib.postgres',
             's3_file_field',
         ]
 
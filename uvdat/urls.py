@@ -28,6 +28,7 @@ from uvdat.core.rest import (
     UserViewSet,
     VectorFeatureTableDataViewSet,
     VectorMapLayerViewSet,
+    async_views,
 )
 
 router = routers.SimpleRouter()
@@ -75,6 +76,23 @@ urlpatterns = [
         ),
     ),
     path('api/v1/s3-upload/', include('s3_file_field.urls')),
+    path(
+        'api/v1/async/vectors/<int:pk>/tiles/<int:z>/<int:x>/<int:y>/',
+        async_views.vector_tile,
+        name='async-vector-tiles',
+    ),
+    path('api/v1/async/vectors/<int:pk>/bbox/', async_views.vector_bbox, name='async-vector-bbox'),
+    path(
+        'api/v1/async/vectors/<int:pk>/property-summary/',
+        async_views.property_summary,
+        name='async-vector-property-summary',
+    ),
+    path('api/v1/async/rasters/<int:pk>/bbox/', async_views.raster_bbox, name='async-raster-bbox'),
+    path(
+        'api/v1/async/netcdf/layer/<int:netcdf_layer_id>/images/',
+        async_views.netcdf_images,
+        name='async-netcdf-images',
+    ),
     path('api/v1/', include(router.urls)),
     path('api/docs/redoc/', schema_view.with_ui('redoc'), name='docs-redoc'),
     path('api/docs/swagger/', schema_view.with_ui('swagger'), name='docs-swagger'),